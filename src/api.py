@@ -3,26 +3,54 @@
 An audio file is loaded and transcribed to text. All the resultant transcribed test will be
 included in a single block.
 """
+import dataclasses
 import json
 import logging
 import pathlib
-from typing import Type, Union
+import tempfile
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, Union
+from urllib.parse import urlparse
 
 import toml
-from steamship import SteamshipError
+from steamship import Block, SteamshipError
 from steamship.base import TaskState
 from steamship.base.mime_types import MimeTypes
-from steamship.invocable import Config, InvocableResponse, create_handler
+from steamship.invocable import Config, InvocableResponse, create_handler, get
 from steamship.plugin.blockifier import Blockifier
 from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
 from steamship.plugin.outputs.block_and_tag_plugin_output import BlockAndTagPluginOutput
 from steamship.plugin.request import PluginRequest
 
+import assembly
+import banana_dev
+import batching
+import blobs
 import block
+import cache
+import coalesce
+import metrics
+import polling
+import scheduler
 import steamship_response
+import stitch
 import tag
 import whisper.response as whisper_response
+from audio import duration as audio_duration
+from audio import probe as audio_probe
+from audio import windows as audio_windows
 from whisper.client import WhisperClient
+from whisper.pool import DeploymentPool, get_shared_pool
+from whisper.warm import parse_windows
+
+if TYPE_CHECKING:
+    import fingerprints
+
+# counts plugin invocations, labelled with the phase ("blockify" or "status_check") and the resulting task state.
+TRANSCRIPTIONS = "whisper_transcriptions_total"
+# time from a transcription being submitted to its result being collected: backend queueing plus processing.
+TRANSCRIPTION_SECONDS = "whisper_transcription_seconds"
 
 
 class WhisperBlockifierConfig(Config):
@@ -31,10 +59,156 @@ class WhisperBlockifierConfig(Config):
     banana_dev_api_key: str
     banana_dev_whisper_model_key: str
 
+    # collect latency, payload, and outcome metrics in process memory, served in the Prometheus format at GET /metrics.
+    # the trace id of each transcription is carried through its status checks.
+    collect_metrics: bool = False
+
+    # base URL of the banana.dev API. point it at a proxy, or at a local stand-in for testing.
+    banana_dev_endpoint: str = banana_dev.ENDPOINT
+
+    # spread transcriptions across several deployments instead of using `banana_dev_whisper_model_key`: a
+    # comma-separated list of model keys, each optionally followed by a weight and an endpoint URL (e.g.
+    # "key-a 3, key-b 1 https://eu.example.com/"). each transcription goes to the deployment with the fewest in flight
+    # for its weight ("least_outstanding") or the fastest recent transcriptions ("latency"). a deployment whose calls
+    # fail `model_key_failure_threshold` times in a row with connection errors or 5xx responses gets no new
+    # transcriptions for `model_key_drain_seconds`.
+    banana_dev_whisper_model_keys: str = ""
+    model_key_strategy: str = "least_outstanding"
+    model_key_failure_threshold: int = 3
+    model_key_drain_seconds: float = 60.0
+
     # configuration that will be used to select configurable whisper model.
     get_segments: bool
     whisper_model: str
 
+    # with `get_segments`, also request word timing and tag every word with its start and end time.
+    word_timestamps: bool = False
+
+    # with `get_segments`, the transcript is split at segment boundaries into blocks of at most `block_max_chars`
+    # characters and `block_max_seconds` of audio, preferring to break at pauses of at least `block_pause_seconds`.
+    split_blocks: bool = False
+    block_max_chars: int = 20000
+    block_max_seconds: float = 10 * 60
+    block_pause_seconds: float = 2.0
+
+    # audio at least this large is base64-encoded in chunks while it is streamed to the backend.
+    streaming_upload_threshold_bytes: int = 8 * 1024 * 1024
+
+    # audio at least this large is uploaded to a blob store (an `http(s)://` server that accepts PUT uploads, which is
+    # required with `reference_upload`) and the backend is sent its URL instead of its bytes.
+    reference_upload: bool = False
+    reference_threshold_bytes: int = 4 * 1024 * 1024
+    blob_store_url: str = ""
+    # sent as the `Authorization` header of every request to an `http(s)://` blob store.
+    blob_store_authorization: str = ""
+    # once a transcription completes, blobs last stored longer ago than this are deleted. zero keeps every blob.
+    blob_ttl_seconds: int = 24 * 60 * 60
+
+    # estimate completion from audio duration and model: wait in-process when it is imminent, otherwise return a hint.
+    adaptive_polling: bool = False
+    polling_max_inline_wait_seconds: float = 5.0
+    polling_min_interval_seconds: float = 2.0
+    polling_max_interval_seconds: float = 60.0
+
+    # audio headers are read before anything is uploaded: unreadable, empty, or overlong audio is rejected right away.
+    probe_audio: bool = False
+    max_audio_seconds: float = 4 * 60 * 60
+
+    # PCM WAV audio is downmixed to mono and resampled to 16 kHz before upload, as Whisper works on that internally.
+    normalize_audio: bool = False
+
+    # long silent spans are cut from PCM WAV audio before upload, and timestamps are mapped back onto the original.
+    trim_silence: bool = False
+    silence_threshold_db: float = -45.0
+    silence_min_seconds: float = 1.0
+    silence_padding_seconds: float = 0.25
+
+    # ZIP archives of audio files are transcribed in as few backend requests as the budgets allow, one block per file.
+    batch_mode: bool = False
+    batch_max_bytes: int = 25 * 1024 * 1024
+    batch_max_seconds: float = 600.0
+    batch_max_items: int = 64
+
+    # long audio is split into overlapping windows that are transcribed in parallel and stitched back together.
+    split_long_audio: bool = False
+    long_audio_window_seconds: int = 600
+    long_audio_overlap_seconds: int = 5
+    long_audio_max_parallel: int = 8
+
+    # pick the most accurate model, from `routing_quality_floor` up to `whisper_model`, that is expected to finish
+    # within the latency budget given the audio duration.
+    route_models: bool = False
+    routing_latency_budget_seconds: float = 60.0
+    routing_quality_floor: str = "tiny"
+
+    # a status check that runs past this percentile of recent check latencies is sent again; the first answer is used.
+    hedge_checks: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_delay_seconds: float = 1.0
+
+    # after this many consecutive backend failures, new transcriptions fail fast until a trial request succeeds.
+    circuit_breaker: bool = False
+    circuit_failure_threshold: int = 5
+    circuit_reset_seconds: float = 30.0
+
+    # while the backend is idle, it is sent a fraction of a second of silence every `keep_warm_interval_seconds`, within
+    # the daily UTC traffic windows (e.g. "08:00-18:00,20:00-22:00"; empty means always). pings stop at idle times
+    # where the cold-start penalty learned from earlier pings is below `keep_warm_min_penalty_seconds`.
+    keep_warm: bool = False
+    keep_warm_interval_seconds: float = 240.0
+    keep_warm_windows: str = ""
+    keep_warm_min_penalty_seconds: float = 5.0
+
+    # configuration for the content-addressed cache of finished transcriptions.
+    cache_results: bool = False
+    cache_dir: str = str(pathlib.Path(tempfile.gettempdir()) / "whisper-s2t-blockifier" / "results")
+    cache_max_bytes: int = 256 * 1024 * 1024
+    cache_ttl_seconds: int = 7 * 24 * 60 * 60
+    cache_memory_entries: int = 32
+
+    # PCM WAV audio that is a near-duplicate of audio transcribed earlier (resampled, re-encoded, or with its start or
+    # end trimmed) reuses that transcript, retimed by the detected offset, instead of being transcribed again. audio is
+    # matched by spectral fingerprint, in an index shared by every worker process on this node.
+    fingerprint_cache: bool = False
+    fingerprint_min_similarity: float = 0.75
+    fingerprint_db_path: str = str(
+        pathlib.Path(tempfile.gettempdir()) / "whisper-s2t-blockifier" / "fingerprints.sqlite3"
+    )
+    fingerprint_max_entries: int = 10000
+    fingerprint_ttl_seconds: int = 7 * 24 * 60 * 60
+
+    # finished results are kept by transcription id, so repeated status checks of a finished task skip the backend.
+    store_completed: bool = False
+    completed_dir: str = str(
+        pathlib.Path(tempfile.gettempdir()) / "whisper-s2t-blockifier" / "completed"
+    )
+    completed_max_bytes: int = 64 * 1024 * 1024
+    completed_ttl_seconds: int = 24 * 60 * 60
+    completed_memory_entries: int = 64
+
+    # identical submissions (the same audio after preprocessing, with the same model options) share one backend
+    # transcription while it is in flight, across every worker process on this node.
+    coalesce_submissions: bool = False
+    coalesce_db_path: str = str(
+        pathlib.Path(tempfile.gettempdir()) / "whisper-s2t-blockifier" / "inflight.sqlite3"
+    )
+    coalesce_ttl_seconds: int = 60 * 60
+    coalesce_wait_seconds: float = 10.0
+
+    # backend submissions from every worker process on this node share a token bucket, and are admitted in priority
+    # order. a submission that is not admitted within `submission_max_wait_seconds` stays queued, and its task reports a
+    # running status until a later status check gets it admitted.
+    schedule_submissions: bool = False
+    submission_priority: str = "interactive"
+    submission_rate_per_second: float = 5.0
+    submission_burst: int = 10
+    submission_bulk_reserve: int = 2
+    submission_max_wait_seconds: float = 5.0
+    submission_queue_ttl_seconds: int = 10 * 60
+    scheduler_db_path: str = str(
+        pathlib.Path(tempfile.gettempdir()) / "whisper-s2t-blockifier" / "scheduler.sqlite3"
+    )
+
 
 class WhisperBlockifier(Blockifier):
     """Blockifier that transcribes audio files into blocks.
@@ -45,6 +219,20 @@ class WhisperBlockifier(Blockifier):
         The required configuration used to instantiate a whisper-s2t-blockifier
     _client : whisper.client.WhisperClient
         Client for backend whisper model
+    _cache : Optional[cache.ResultCache]
+        Cache of finished transcriptions, keyed on audio content and model options (if enabled)
+    _completed : Optional[cache.ResultCache]
+        Finished results by transcription id (if enabled)
+    _polling : Optional[polling.PollingPolicy]
+        Duration-aware status polling policy (if enabled)
+    _inflight : Optional[coalesce.InflightRegistry]
+        Registry of in-flight transcriptions that identical submissions join (if enabled)
+    _scheduler : Optional[scheduler.SubmissionScheduler]
+        Rate limiter and priority queue for backend submissions (if enabled)
+    _fingerprints : Optional[fingerprints.FingerprintIndex]
+        Fingerprints and transcripts of earlier audio, reused for near-duplicates (if enabled)
+    _blob_store : Optional[blobs.BlobStore]
+        Where large audio is uploaded for the backend to fetch (if reference uploads are enabled)
     """
 
     config: WhisperBlockifierConfig
@@ -60,9 +248,23 @@ class WhisperBlockifier(Blockifier):
         "audio/mp4a-latm",
         "audio/mpeg",
     )
+    # the types whose containers `audio.probe` reads. others are probed too, but may hold audio it cannot parse.
+    PROBED_MIME_TYPES = (
+        MimeTypes.MP3,
+        MimeTypes.WAV,
+        MimeTypes.MP4_VIDEO,
+        MimeTypes.MP4_AUDIO,
+        "audio/webm",
+        "video/webm",
+        "audio/mpeg",
+    )
 
     def __init__(self, **kwargs):
-        """Initialize Blockifier."""
+        """Initialize Blockifier.
+
+        A blockifier is created for every request, including every status check, so the configuration and backend
+        client are shared by all blockifiers in the process with the same effective configuration.
+        """
         # todo: handle load errors?
         secret_kwargs = toml.load(
             str(pathlib.Path(__file__).parent / ".steamship" / "secrets.toml")
@@ -74,16 +276,83 @@ class WhisperBlockifier(Blockifier):
         }
 
         super().__init__(**kwargs)
+        self.config = _shared_config(self.config.json(sort_keys=True))
+        self._blob_store = _reference_store(self.config)
         try:
-            self._client = WhisperClient(
-                api_key=self.config.banana_dev_api_key,
-                model_key=self.config.banana_dev_whisper_model_key,
-                whisper_model=self.config.whisper_model,
+            self._client = _shared_client(
+                self.config.banana_dev_api_key,
+                self.config.banana_dev_whisper_model_key,
+                self.config.whisper_model,
+                self.config.streaming_upload_threshold_bytes,
+                self.config.long_audio_max_parallel,
+                self.config.banana_dev_endpoint,
+                self.config.hedge_quantile if self.config.hedge_checks else None,
+                self.config.hedge_min_delay_seconds,
+                self.config.circuit_failure_threshold if self.config.circuit_breaker else None,
+                self.config.circuit_reset_seconds,
+                self.config.routing_latency_budget_seconds if self.config.route_models else None,
+                self.config.routing_quality_floor,
+                self._blob_store,
+                self.config.reference_threshold_bytes,
+                _deployment_pool(self.config),
             )
         except ValueError as ve:
             raise SteamshipError(
                 message=f"A valid whisper model type must be supplied in configuration: {ve}"
             )
+        _start_keep_warm(self._client, self.config)
+
+        self._cache: Optional[cache.ResultCache] = None
+        if self.config.cache_results:
+            self._cache = cache.get_shared_cache(
+                self.config.cache_dir,
+                self.config.cache_max_bytes,
+                self.config.cache_ttl_seconds,
+                self.config.cache_memory_entries,
+            )
+
+        self._completed: Optional[cache.ResultCache] = None
+        if self.config.store_completed:
+            self._completed = cache.get_shared_cache(
+                self.config.completed_dir,
+                self.config.completed_max_bytes,
+                self.config.completed_ttl_seconds,
+                self.config.completed_memory_entries,
+                True,
+            )
+
+        self._polling: Optional[polling.PollingPolicy] = None
+        if self.config.adaptive_polling:
+            self._polling = polling.PollingPolicy(
+                max_inline_wait_seconds=self.config.polling_max_inline_wait_seconds,
+                min_interval_seconds=self.config.polling_min_interval_seconds,
+                max_interval_seconds=self.config.polling_max_interval_seconds,
+            )
+
+        self._inflight: Optional[coalesce.InflightRegistry] = None
+        if self.config.coalesce_submissions:
+            self._inflight = coalesce.get_shared_registry(
+                self.config.coalesce_db_path,
+                self.config.coalesce_ttl_seconds,
+                self.config.coalesce_wait_seconds,
+            )
+
+        self._scheduler = _submission_scheduler(self.config)
+
+        self._fingerprints: Optional["fingerprints.FingerprintIndex"] = None
+        if self.config.fingerprint_cache:
+            # imported on first use, like the other numpy-based stages.
+            import fingerprints
+
+            self._fingerprints = fingerprints.get_shared_index(
+                self.config.fingerprint_db_path,
+                self.config.fingerprint_min_similarity,
+                self.config.fingerprint_max_entries,
+                self.config.fingerprint_ttl_seconds,
+            )
+
+        if self.config.collect_metrics and isinstance(metrics.get_sink(), metrics.NullSink):
+            metrics.set_sink(metrics.shared_memory_sink())
 
     def config_cls(self) -> Type[Config]:
         """Return the Configuration class."""
@@ -94,10 +363,33 @@ class WhisperBlockifier(Blockifier):
     ) -> Union[InvocableResponse, InvocableResponse[BlockAndTagPluginOutput]]:
         """Transcribe the audio file, store the transcription results in blocks and tag.py."""
         logging.debug("received request")
-        if request.is_status_check:
-            return self._check_status(request)
+        phase = "status_check" if request.is_status_check else "blockify"
+        status_input = (request.status.remote_status_input if request.status else None) or {}
+        with metrics.span(
+            phase,
+            trace_id=status_input.get("trace_id"),
+            transcription_id=status_input.get("transcription_id"),
+        ):
+            try:
+                if request.is_status_check:
+                    response = self._check_status(request)
+                else:
+                    response = self._start_work(request)
+            except Exception:
+                metrics.get_sink().increment(
+                    TRANSCRIPTIONS, labels={"phase": phase, "outcome": "failed"}
+                )
+                raise
+        state = response.status.state if response.status and response.status.state else "succeeded"
+        metrics.get_sink().increment(TRANSCRIPTIONS, labels={"phase": phase, "outcome": str(state)})
+        return response
 
-        return self._start_work(request)
+    @get("metrics")
+    def get_metrics(self) -> InvocableResponse:
+        """Return the metrics collected by this process, in the Prometheus text format (see `collect_metrics`)."""
+        sink = metrics.get_sink()
+        text = metrics.render(sink) if isinstance(sink, metrics.MemorySink) else ""
+        return InvocableResponse(string=text, mime_type=metrics.prometheus.CONTENT_TYPE)
 
     def _check_status(
         self, request: PluginRequest[RawDataPluginInput]
@@ -110,92 +402,772 @@ class WhisperBlockifier(Blockifier):
                 message="Status check requests must provide a valid 'transcription_id'."
             )
 
-        transcription_id = request.status.remote_status_input.get("transcription_id")
+        status_input = request.status.remote_status_input
+        if "queued" in status_input:
+            return self._resume(status_input)
+        transcription_id = status_input.get("transcription_id")
+        if self._completed is not None:
+            completed = self._completed.get(self._completed_key(transcription_id))
+            if completed is not None:
+                logging.info(f"transcription already complete id={json.dumps(transcription_id)}")
+                return steamship_response.with_output(completed)
         try:
-            return self._check_transcription_status(transcription_id)
+            return self._check_transcription_status(transcription_id, status_input)
         except Exception as exc:
-            self._handle_check_error(str(exc), transcription_id)
+            return self._handle_check_error(str(exc), transcription_id, status_input)
 
     def _check_transcription_status(
-        self, transcription_id: str
+        self, transcription_id: str, status_input: Optional[Dict[str, Any]] = None
     ) -> Union[InvocableResponse, InvocableResponse[BlockAndTagPluginOutput]]:
-        logging.info(f"checking transcription status id={json.dumps(transcription_id)}")
-        out = self._client.check_transcription_request(transcription_id)
-        if whisper_response.is_success(out):
-            logging.info(f"transcription complete id={json.dumps(transcription_id)}")
-            if self.config.get_segments:
-                logging.info(f"getting segments id={json.dumps(transcription_id)}")
-                tags = []
-                transcription_text = ""
-                for segment in whisper_response.get_segments(out):
-                    segment_text = segment["text"].strip()
-                    transcription_text = f"{transcription_text} {segment_text}".strip()
-                    tags.append(
-                        tag.create_timestamp(
-                            len(transcription_text) - len(segment_text),
-                            segment["start"],
-                            segment["end"],
-                            segment_text,
-                        )
-                    )
-                logging.info(f"returning blocks with tags: {len(tags)}")
-                return steamship_response.with_blocks(
-                    [block.create_from_text(transcription_text, tags)]
+        if status_input and "windows" in status_input:
+            return self._check_windowed_status(transcription_id, status_input)
+        if status_input and "batches" in status_input:
+            return self._check_batch_status(transcription_id, status_input)
+
+        waited = False
+        while True:
+            logging.info(f"checking transcription status id={json.dumps(transcription_id)}")
+            out = self._client.check_transcription_request(transcription_id)
+            if whisper_response.is_success(out):
+                logging.info(f"transcription complete id={json.dumps(transcription_id)}")
+                response = steamship_response.with_blocks(
+                    self._build_blocks(transcription_id, out, status_input)
+                )
+                return self._complete(
+                    transcription_id,
+                    response,
+                    status_input,
+                    whisper_response.get_completed_at(out),
                 )
 
-            logging.info("returning blocks without tags")
-            return steamship_response.with_blocks(
-                [block.create_from_text(whisper_response.get_transcription(out))]
-            )
+            plan = self._polling.plan(status_input or {}) if self._polling is not None else None
+            if plan is None or waited or plan.wait_seconds <= 0:
+                break
+            logging.info(f"transcription imminent, waiting {plan.wait_seconds:.1f}s")
+            self._polling.sleep(plan.wait_seconds)
+            waited = True
 
         logging.info(f"transcription in-progress id={json.dumps(transcription_id)}")
+        return self._running("Transcription job ongoing.", transcription_id, status_input)
+
+    def _running(
+        self, message: str, transcription_id: str, status_input: Optional[Dict[str, Any]]
+    ) -> InvocableResponse:
+        if self._polling is None and status_input:
+            status_input = polling.checked(status_input, time.time())
+        if self._polling is not None and status_input:
+            status_input = self._polling.checked(status_input)
+            plan = self._polling.plan(status_input)
+            if plan is not None:
+                status_input = {**status_input, **plan.status_input()}
+                message = f"{message} Estimated completion in {plan.eta_seconds:.0f}s."
         return steamship_response.with_status(
-            TaskState.running, "Transcription job ongoing.", transcription_id
+            TaskState.running, message, transcription_id, status_input
+        )
+
+    def _check_windowed_status(
+        self, transcription_id: str, status_input: Dict[str, Any]
+    ) -> Union[InvocableResponse, InvocableResponse[BlockAndTagPluginOutput]]:
+        windows = status_input["windows"]
+        pending = [window for window in windows if "segments" not in window]
+        logging.info(
+            f"checking windowed transcription status id={json.dumps(transcription_id)} pending={len(pending)}"
+        )
+        outs = self._client.check_transcription_requests([w["transcription_id"] for w in pending])
+        for window, out in zip(pending, outs):
+            if isinstance(out, Exception):
+                if not str(out).lower().startswith("server error:"):
+                    raise out
+                logging.warning(
+                    f"could not get status of window id={json.dumps(window['transcription_id'])} error={out}"
+                )
+                continue
+            if whisper_response.is_success(out):
+                window["segments"] = [
+                    stitch.compact_segment(segment)
+                    for segment in whisper_response.get_segments(out)
+                ]
+
+        done = sum(1 for window in windows if "segments" in window)
+        if done < len(windows):
+            logging.info(f"transcription in-progress id={json.dumps(transcription_id)}")
+            return self._running(
+                f"Transcription job ongoing ({done} of {len(windows)} windows complete).",
+                transcription_id,
+                status_input,
+            )
+
+        logging.info(f"all windows complete id={json.dumps(transcription_id)}")
+        segments = stitch.merge_windows(windows)
+        if self.config.get_segments:
+            response = steamship_response.with_blocks(
+                self._segments_blocks(segments, status_input.get("silences"))
+            )
+        else:
+            text = " ".join(s["text"].strip() for s in segments if s["text"].strip())
+            response = steamship_response.with_blocks([block.create_from_text(text)])
+        status_input = {k: v for k, v in status_input.items() if k != "windows"}
+        return self._complete(transcription_id, response, status_input)
+
+    def _complete(
+        self,
+        transcription_id: str,
+        response: InvocableResponse[BlockAndTagPluginOutput],
+        status_input: Optional[Dict[str, Any]],
+        completed_at: Optional[float] = None,
+    ) -> InvocableResponse[BlockAndTagPluginOutput]:
+        # `completed_at` is when the backend reports the transcription completed, if it does.
+        if self._polling is not None:
+            self._polling.completed(status_input or {}, completed_at)
+        elif self.config.route_models and "started_at" in (status_input or {}):
+            self._client.record_completion(
+                status_input["model"],
+                status_input["audio_seconds"],
+                polling.elapsed_seconds(status_input, time.time(), completed_at),
+            )
+        submitted_at = (status_input or {}).get("submitted_at")
+        if submitted_at is not None:
+            metrics.get_sink().observe(
+                TRANSCRIPTION_SECONDS,
+                time.time() - submitted_at,
+                {"model": status_input.get("model", self.config.whisper_model.lower())},
+            )
+        cache_key = (status_input or {}).get("cache_key")
+        if self._cache is not None and cache_key:
+            logging.info(f"caching transcription key={json.dumps(cache_key)}")
+            self._cache.put(cache_key, response.data)
+        if self._completed is not None:
+            self._completed.put(self._completed_key(transcription_id), response.data)
+        entry = (status_input or {}).get("fingerprint")
+        if self._fingerprints is not None and entry is not None:
+            import fingerprints
+
+            self._fingerprints.complete(entry, fingerprints.transcript_of(response.data))
+        if self._blob_store is not None and self.config.blob_ttl_seconds > 0:
+            self._expire_blobs()
+        return response
+
+    def _expire_blobs(self) -> None:
+        # cleanup is best-effort: a store that cannot delete must not fail a finished transcription.
+        try:
+            expired = self._blob_store.expire(self.config.blob_ttl_seconds)
+        except Exception as e:
+            logging.warning(f"could not expire blobs: {e}")
+            return
+        if expired:
+            logging.info(f"expired blobs count={expired}")
+
+    def _completed_key(self, transcription_id: str) -> str:
+        return cache.transcription_key(transcription_id, self._output_mode())
+
+    def _build_blocks(
+        self,
+        transcription_id: str,
+        out: Dict[str, Any],
+        status_input: Optional[Dict[str, Any]] = None,
+    ) -> List[Block.CreateRequest]:
+        if self.config.get_segments:
+            logging.info(f"getting segments id={json.dumps(transcription_id)}")
+            return self._segments_blocks(
+                whisper_response.get_segment_table(out), (status_input or {}).get("silences")
+            )
+
+        logging.info("returning blocks without tags")
+        return [block.create_from_text(whisper_response.get_transcription(out))]
+
+    def _segments_blocks(
+        self,
+        segments: Union[List[Dict[str, Any]], whisper_response.SegmentTable],
+        silences: Optional[List[List[float]]] = None,
+    ) -> List[Block.CreateRequest]:
+        if silences:
+            segments = stitch.restore_silences(segments, silences)
+        with metrics.span("assembly"):
+            transcripts = [assembly.assemble(segments, words=self.config.word_timestamps)]
+            if self.config.split_blocks:
+                transcripts = assembly.split(
+                    transcripts[0],
+                    self.config.block_max_chars,
+                    self.config.block_max_seconds,
+                    self.config.block_pause_seconds,
+                )
+            blocks = [block.create_from_text(t.text, t.tags()) for t in transcripts]
+        logging.info(
+            f"returning blocks: {len(blocks)} with tags: {sum(len(b.tags) for b in blocks)}"
+        )
+        return blocks
+
+    def _check_batch_status(
+        self, transcription_id: str, status_input: Dict[str, Any]
+    ) -> Union[InvocableResponse, InvocableResponse[BlockAndTagPluginOutput]]:
+        batches = status_input["batches"]
+        pending = [batch for batch in batches if "results" not in batch]
+        logging.info(
+            f"checking batch transcription status id={json.dumps(transcription_id)} pending={len(pending)}"
+        )
+        outs = self._client.check_transcription_requests([b["transcription_id"] for b in pending])
+        for batch, out in zip(pending, outs):
+            if isinstance(out, Exception):
+                if str(out).lower().startswith("server error:"):
+                    continue
+                # a failed batch only fails its own files.
+                logging.error(
+                    f"batch failed id={json.dumps(batch['transcription_id'])} error={out}"
+                )
+                batch["results"] = [{"error": str(out)}] * len(batch["items"])
+            elif whisper_response.is_success(out):
+                items = whisper_response.get_batch_items(out)
+                items += [{"message": "error: missing from batch response"}] * (
+                    len(batch["items"]) - len(items)
+                )
+                batch["results"] = [self._compact_item(item) for item in items]
+
+        done = sum(1 for batch in batches if "results" in batch)
+        if done < len(batches):
+            logging.info(f"transcription in-progress id={json.dumps(transcription_id)}")
+            return self._running(
+                f"Transcription job ongoing ({done} of {len(batches)} batches complete).",
+                transcription_id,
+                status_input,
+            )
+
+        logging.info(f"all batches complete id={json.dumps(transcription_id)}")
+        blocks = [
+            item_block
+            for batch in batches
+            for name, result in zip(batch["items"], batch["results"])
+            for item_block in self._item_blocks(name, result)
+        ]
+        status_input = {k: v for k, v in status_input.items() if k != "batches"}
+        return self._complete(
+            transcription_id, steamship_response.with_blocks(blocks), status_input
         )
 
-    def _handle_check_error(self, message, transcription_id: str) -> InvocableResponse:
+    def _compact_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        if not whisper_response.is_success(item):
+            return {"error": item["message"]}
+        if self.config.get_segments:
+            return {
+                "segments": [
+                    stitch.compact_segment(segment)
+                    for segment in whisper_response.get_segments(item)
+                ]
+            }
+        return {"text": whisper_response.get_transcription(item)}
+
+    def _item_blocks(self, name: str, result: Dict[str, Any]) -> List[Block.CreateRequest]:
+        if "error" in result:
+            return [
+                block.create_from_text(
+                    "",
+                    [tag.create_source_file(name), tag.create_transcription_error(result["error"])],
+                )
+            ]
+        if "segments" in result:
+            item_blocks = self._segments_blocks(
+                [stitch.expand_segment(s) for s in result["segments"]]
+            )
+        else:
+            item_blocks = [block.create_from_text(result["text"])]
+        for item_block in item_blocks:
+            item_block.tags.append(tag.create_source_file(name))
+        return item_blocks
+
+    def _handle_check_error(
+        self, message, transcription_id: str, status_input: Optional[Dict[str, Any]] = None
+    ) -> InvocableResponse:
         msg = message.lower()
         if msg.startswith("server error:"):
             logging.warning(
                 f"could not get status of transcription id={json.dumps(transcription_id)} error={json.dumps(msg)}"
             )
             return steamship_response.with_status(
-                TaskState.running, "Transcription job ongoing.", transcription_id
+                TaskState.running, "Transcription job ongoing.", transcription_id, status_input
             )
 
         logging.error(
             f"transcription failed id={json.dumps(transcription_id)} error={json.dumps(msg)}"
         )
+        inflight_key = (status_input or {}).get("inflight_key")
+        if self._inflight is not None and inflight_key:
+            # identical submissions must start a new transcription rather than join the failed one.
+            self._inflight.release(inflight_key, transcription_id)
         raise SteamshipError(message=f"Transcription failed: {json.dumps(msg)}")
 
     def _start_work(
         self, request: PluginRequest
     ) -> Union[InvocableResponse, InvocableResponse[BlockAndTagPluginOutput]]:
-        self._check_mime_type(request)
+        with metrics.span("mime_check"):
+            self._check_mime_type(request)
+
+        status_input = {}
+        if self.config.collect_metrics:
+            status_input["trace_id"] = metrics.current_span().trace_id
+        if self._cache is not None:
+            with metrics.span("cache_lookup"):
+                cache_key = cache.content_key(
+                    request.data.data, self._cache_model(), self._output_mode()
+                )
+                cached = self._cache.get(cache_key)
+            logging.info(f"transcription cache hit={cached is not None} stats={self._cache.stats}")
+            if cached is not None:
+                return steamship_response.with_output(cached)
+            status_input["cache_key"] = cache_key
+        if self._fingerprints is not None:
+            reused = self._reuse_near_duplicate(request.data.data, status_input)
+            if reused is not None:
+                return reused
+
+        if self.config.batch_mode and request.data.default_mime_type == batching.ZIP_MIME_TYPE:
+            return self._start_batch(request.data.data, status_input)
+
+        with metrics.span("preprocess"):
+            raw_audio = self._trim_silence(self._normalize(request.data.data), status_input)
+            windows = self._windows(raw_audio)
+        return self._launch(raw_audio, windows, status_input)
+
+    def _reuse_near_duplicate(
+        self, raw_audio: bytes, status_input: Dict[str, Any]
+    ) -> Optional[InvocableResponse[BlockAndTagPluginOutput]]:
+        # answers with the retimed transcript of earlier, near-identical audio; otherwise indexes this audio, so that
+        # its transcript is recorded once it completes.
+        import fingerprints
+        from audio import fingerprint as audio_fingerprint
+
+        with metrics.span("fingerprint"):
+            fp = audio_fingerprint.from_wav(raw_audio)
+            if fp is None:
+                return None
+            options = f"{self._cache_model()}-{self._transcript_mode()}"
+            hit = self._fingerprints.lookup(fp, options)
+        if hit is None:
+            status_input["fingerprint"] = self._fingerprints.add(fp, options)
+            return None
+
+        logging.info(
+            f"reusing transcript of near-duplicate audio entry={hit.entry} "
+            f"offset={hit.offset_seconds:.2f}s similarity={hit.similarity:.3f}"
+        )
+        if "segments" in hit.transcript:
+            segments = fingerprints.shift(
+                hit.transcript["segments"],
+                hit.offset_seconds,
+                audio_duration.estimate(raw_audio),
+            )
+            blocks = self._segments_blocks(segments)
+        else:
+            blocks = [block.create_from_text(hit.transcript["text"])]
+        response = steamship_response.with_blocks(blocks)
+        if self._cache is not None and "cache_key" in status_input:
+            self._cache.put(status_input["cache_key"], response.data)
+        return response
+
+    def _transcript_mode(self) -> str:
+        if not self.config.get_segments:
+            return "text"
+        return "words" if self.config.word_timestamps else "segments"
+
+    def _output_mode(self) -> str:
+        # the transcript mode, plus the block-splitting options, which shape the blocks built from segments.
+        mode = self._transcript_mode()
+        if not self.config.get_segments or not self.config.split_blocks:
+            return mode
+        return (
+            f"{mode}-blocks-{self.config.block_max_chars}-{self.config.block_max_seconds:g}"
+            f"-{self.config.block_pause_seconds:g}"
+        )
+
+    def _launch(
+        self,
+        raw_audio: bytes,
+        windows: Optional[List[audio_windows.Window]],
+        status_input: Dict[str, Any],
+    ) -> Union[InvocableResponse, InvocableResponse[BlockAndTagPluginOutput]]:
+        queued = self._schedule(raw_audio, len(windows) if windows else 1, "audio", status_input)
+        if queued is not None:
+            return queued
+
+        self._track(raw_audio, windows, status_input)
+
         logging.debug("starting transcription...")
+        with metrics.span("submit"):
+            transcription_id = self._submit(raw_audio, windows, status_input)
+        metrics.annotate(transcription_id=transcription_id)
+        if self.config.collect_metrics:
+            status_input["submitted_at"] = time.time()
 
         try:
-            transcription_id = self._client.start_transcription(
-                request.data.data, self.config.get_segments
+            return self._check_transcription_status(transcription_id, status_input)
+        except Exception as exc:
+            return self._handle_check_error(str(exc), transcription_id, status_input)
+
+    def _windows(self, raw_audio: bytes) -> Optional[List[audio_windows.Window]]:
+        if not self.config.split_long_audio:
+            return None
+        return audio_windows.split(
+            raw_audio,
+            self.config.long_audio_window_seconds,
+            self.config.long_audio_overlap_seconds,
+        )
+
+    def _schedule(
+        self, data: bytes, requests: int, kind: str, status_input: Dict[str, Any]
+    ) -> Optional[InvocableResponse]:
+        # waits for the scheduler to admit `requests` backend requests. returns a running status, and keeps `data` until
+        # a later status check, when the submission is still queued.
+        if self._scheduler is None:
+            return None
+        queued = status_input.pop("queued", None)
+        ticket = queued["ticket"] if queued else None
+        with metrics.span("schedule"):
+            admission = self._scheduler.acquire(self.config.submission_priority, requests, ticket)
+        if admission.admitted:
+            logging.info(f"submission admitted waited={admission.waited_seconds:.1f}s")
+            if ticket is not None:
+                self._scheduler.discard(ticket)
+            return None
+
+        if ticket is None:
+            self._scheduler.park(admission.ticket, data)
+        status_input["queued"] = {"ticket": admission.ticket, "kind": kind}
+        return steamship_response.with_status(
+            TaskState.running,
+            f"Transcription queued behind {admission.position} other submissions.",
+            admission.ticket,
+            status_input,
+        )
+
+    def _resume(
+        self, status_input: Dict[str, Any]
+    ) -> Union[InvocableResponse, InvocableResponse[BlockAndTagPluginOutput]]:
+        # a status check of a submission that is still queued: tries again to get it admitted and submitted.
+        status_input = dict(status_input)
+        ticket, kind = status_input["queued"]["ticket"], status_input["queued"]["kind"]
+        if self._scheduler is None:
+            raise SteamshipError(
+                message="The transcription was queued, but submission scheduling is not enabled."
             )
-            logging.info(f"started transcription: id={json.dumps(transcription_id)}")
+        data = self._scheduler.unpark(ticket)
+        if data is None:
+            self._scheduler.discard(ticket)
+            raise SteamshipError(
+                message="The queued audio is no longer available. Please submit the file again."
+            )
+        if kind == "batch":
+            return self._start_batch(data, status_input)
+        with metrics.span("preprocess"):
+            windows = self._windows(data)
+        return self._launch(data, windows, status_input)
+
+    def _track(
+        self,
+        raw_audio: bytes,
+        windows: Optional[List[audio_windows.Window]],
+        status_input: Dict[str, Any],
+    ) -> None:
+        # records the model and audio duration with the task, choosing the model in routing mode.
+        if self._polling is None and not self.config.route_models:
+            return
+        # windows are transcribed in parallel, so a single window bounds completion time.
+        audio_seconds = (
+            self.config.long_audio_window_seconds if windows else audio_duration.estimate(raw_audio)
+        )
+        model = self.config.whisper_model.lower()
+        if self.config.route_models:
+            model = self._client.route(raw_audio, audio_seconds)
+            logging.info(f"routed transcription model={model} audio_seconds={audio_seconds:.1f}")
+        if self._polling is not None:
+            status_input.update(self._polling.started(model, audio_seconds))
+        else:
+            status_input.update(
+                {
+                    "started_at": time.time(),
+                    "audio_seconds": round(audio_seconds, 3),
+                    "model": model,
+                }
+            )
+
+    def _cache_model(self) -> str:
+        # routed results may come from any model in range, so they never answer requests for one specific model.
+        if self.config.route_models:
+            return f"{self.config.routing_quality_floor}-to-{self.config.whisper_model}"
+        return self.config.whisper_model
+
+    def _normalize(self, raw_audio: bytes) -> bytes:
+        if not self.config.normalize_audio:
+            return raw_audio
+        # imported on first use: numpy adds ~100ms to every cold start.
+        from audio import normalize as audio_normalize
+
+        started = time.perf_counter()
+        normalized = audio_normalize.normalize(raw_audio)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if normalized is None:
+            logging.info(f"audio normalization skipped bytes={len(raw_audio)} ms={elapsed_ms:.1f}")
+            return raw_audio
+        logging.info(
+            f"audio normalized bytes={len(raw_audio)}->{len(normalized)} "
+            f"saved={len(raw_audio) - len(normalized)} ms={elapsed_ms:.1f}"
+        )
+        return normalized
+
+    def _trim_silence(self, raw_audio: bytes, status_input: Dict[str, Any]) -> bytes:
+        if not self.config.trim_silence:
+            return raw_audio
+        from audio import silence as audio_silence
+
+        trimmed = audio_silence.trim(
+            raw_audio,
+            self.config.silence_threshold_db,
+            self.config.silence_min_seconds,
+            self.config.silence_padding_seconds,
+        )
+        if trimmed is None:
+            logging.info("no silence trimmed")
+            return raw_audio
+        raw_audio, silences = trimmed
+        removed = sum(end - start for start, end in silences)
+        logging.info(f"trimmed silence spans={len(silences)} seconds={removed:.1f}")
+        status_input["silences"] = [[start, end] for start, end in silences]
+        return raw_audio
+
+    def _start_batch(
+        self, archive: bytes, status_input: Dict[str, Any]
+    ) -> Union[InvocableResponse, InvocableResponse[BlockAndTagPluginOutput]]:
+        try:
+            files = batching.read_archive(archive)
         except Exception as e:
-            raise SteamshipError(f"could not schedule work: {json.dumps(e)}")
+            raise SteamshipError(message=f"Could not read audio archive: {e}")
+        if not files:
+            raise SteamshipError(message="Audio archive does not contain any files.")
 
+        items = []
+        for name, data in files:
+            data = self._normalize(data)
+            items.append(batching.BatchItem(name, data, audio_duration.estimate(data)))
+        groups = batching.pack(
+            items,
+            self.config.batch_max_bytes,
+            self.config.batch_max_seconds,
+            self.config.batch_max_items,
+        )
+        queued = self._schedule(archive, len(groups), "batch", status_input)
+        if queued is not None:
+            return queued
+
+        logging.info(f"starting batch transcription files={len(items)} batches={len(groups)}")
         try:
-            return self._check_transcription_status(transcription_id)
+            transcription_ids = self._client.start_batch_transcriptions(
+                [[items[i].data for i in group] for group in groups],
+                self.config.get_segments,
+                self.config.get_segments and self.config.word_timestamps,
+            )
+        except Exception as e:
+            raise SteamshipError(f"could not schedule work: {json.dumps(str(e))}")
+
+        status_input["batches"] = [
+            {"transcription_id": t_id, "items": [items[i].name for i in group]}
+            for t_id, group in zip(transcription_ids, groups)
+        ]
+        transcription_id = transcription_ids[0]
+        logging.info(f"started batch transcription: ids={json.dumps(transcription_ids)}")
+        try:
+            return self._check_transcription_status(transcription_id, status_input)
         except Exception as exc:
-            self._handle_check_error(str(exc), transcription_id)
+            return self._handle_check_error(str(exc), transcription_id, status_input)
+
+    def _submit(
+        self,
+        raw_audio: bytes,
+        windows: Optional[List[audio_windows.Window]],
+        status_input: Dict[str, Any],
+    ) -> str:
+        # the model chosen by routing, if any. recorded with the task so that results stay reproducible.
+        model = status_input.get("model")
+        word_timestamps = self.config.get_segments and self.config.word_timestamps
+        try:
+            if windows:
+                # segments are always requested, as they are needed to stitch the windows back together.
+                transcription_ids = self._client.start_transcriptions(
+                    [w.data for w in windows], True, word_timestamps, model
+                )
+                status_input["windows"] = [
+                    {"transcription_id": t_id, "offset": w.offset, "start": w.start, "end": w.end}
+                    for t_id, w in zip(transcription_ids, windows)
+                ]
+                logging.info(f"started windowed transcription: ids={json.dumps(transcription_ids)}")
+                return transcription_ids[0]
+
+            def start() -> str:
+                return self._client.start_transcription(
+                    raw_audio, self.config.get_segments, word_timestamps, model
+                )
+
+            if self._inflight is None:
+                transcription_id = start()
+            else:
+                key = cache.content_key(
+                    raw_audio, model or self.config.whisper_model, self._transcript_mode()
+                )
+                transcription_id, _ = self._inflight.start(key, start)
+                status_input["inflight_key"] = key
+            logging.info(f"started transcription: id={json.dumps(transcription_id)}")
+            return transcription_id
+        except Exception as e:
+            raise SteamshipError(f"could not schedule work: {json.dumps(str(e))}")
 
     def _check_mime_type(self, request: PluginRequest) -> str:
         mime_type = request.data.default_mime_type
+        if self.config.batch_mode and mime_type == batching.ZIP_MIME_TYPE:
+            return mime_type
         if mime_type not in self.SUPPORTED_MIME_TYPES:
             raise SteamshipError(
                 f"Unsupported mime_type: {mime_type}."
                 f"The following mime_types are supported: {self.SUPPORTED_MIME_TYPES}"
             )
+        if self.config.probe_audio:
+            self._probe(request.data.data, mime_type)
 
         return mime_type
 
+    def _probe(self, raw_audio: bytes, mime_type: str) -> None:
+        if not raw_audio:
+            raise SteamshipError("The audio file is empty.")
+        info = audio_probe.probe(raw_audio)
+        if info is None and mime_type not in self.PROBED_MIME_TYPES:
+            logging.info(f"could not probe {mime_type} audio, sending it unchecked")
+            return
+        if info is None:
+            raise SteamshipError(
+                f"Could not read the audio headers: the {mime_type} data is not a valid WAV, MP3, MP4 or WebM file."
+            )
+        logging.info(f"probed audio {json.dumps(dataclasses.asdict(info))}")
+        if info.duration is not None and info.duration <= 0:
+            raise SteamshipError("The audio file contains no audio.")
+        if info.duration is not None and info.duration > self.config.max_audio_seconds:
+            raise SteamshipError(
+                f"The audio is too long: {info.duration:.0f}s, but at most {self.config.max_audio_seconds:.0f}s "
+                "may be transcribed."
+            )
+
+
+@lru_cache(maxsize=32)
+def _shared_config(effective: str) -> WhisperBlockifierConfig:
+    # one configuration object per effective configuration, so that everything derived from it is shared too.
+    return WhisperBlockifierConfig.parse_raw(effective)
+
+
+def _reference_store(config: WhisperBlockifierConfig) -> Optional[blobs.BlobStore]:
+    # the process-wide blob store that large audio is uploaded to, when reference uploads are enabled.
+    if not config.reference_upload:
+        return None
+    # the backend fetches the audio itself, so a local directory is never a valid store here.
+    if urlparse(config.blob_store_url).scheme not in ("http", "https"):
+        raise SteamshipError(
+            message="A valid blob store URL must be supplied in configuration: reference uploads need an http(s):// "
+            f"URL the backend can fetch, not {json.dumps(config.blob_store_url)}"
+        )
+    try:
+        return blobs.get_shared_store(config.blob_store_url, config.blob_store_authorization)
+    except ValueError as ve:
+        raise SteamshipError(
+            message=f"A valid blob store URL must be supplied in configuration: {ve}"
+        )
+
+
+def _deployment_pool(config: WhisperBlockifierConfig) -> Optional[DeploymentPool]:
+    # the process-wide pool of deployments, when several model keys are configured.
+    if not config.banana_dev_whisper_model_keys:
+        return None
+    try:
+        return get_shared_pool(
+            config.banana_dev_whisper_model_keys,
+            config.model_key_strategy,
+            config.model_key_failure_threshold,
+            config.model_key_drain_seconds,
+        )
+    except ValueError as ve:
+        raise SteamshipError(message=f"Invalid model key pool configuration: {ve}")
+
+
+def _start_keep_warm(client: WhisperClient, config: WhisperBlockifierConfig) -> None:
+    # keeps the backend of the process-wide client warm, when enabled. the first configuration to enable it wins.
+    if not config.keep_warm:
+        return
+    try:
+        windows = parse_windows(config.keep_warm_windows)
+    except ValueError as ve:
+        raise SteamshipError(message=f"Invalid keep_warm_windows configuration: {ve}")
+    client.keep_warm(
+        config.keep_warm_interval_seconds, windows, config.keep_warm_min_penalty_seconds
+    )
+
+
+def _submission_scheduler(
+    config: WhisperBlockifierConfig,
+) -> Optional[scheduler.SubmissionScheduler]:
+    # the process-wide submission scheduler, when scheduling is enabled.
+    if not config.schedule_submissions:
+        return None
+    if config.submission_priority not in scheduler.PRIORITIES:
+        raise SteamshipError(
+            message=f"submission_priority must be one of {', '.join(scheduler.PRIORITIES)}: "
+            f"{config.submission_priority}"
+        )
+    try:
+        return scheduler.get_shared_scheduler(
+            config.scheduler_db_path,
+            config.submission_rate_per_second,
+            config.submission_burst,
+            config.submission_bulk_reserve,
+            config.submission_max_wait_seconds,
+            config.submission_queue_ttl_seconds,
+        )
+    except ValueError as ve:
+        raise SteamshipError(message=f"Invalid submission scheduling configuration: {ve}")
+
+
+@lru_cache(maxsize=32)
+def _shared_client(
+    api_key: str,
+    model_key: str,
+    whisper_model: str,
+    streaming_threshold_bytes: int,
+    max_parallel: int,
+    endpoint: str,
+    hedge_quantile: Optional[float] = None,
+    hedge_min_delay: float = 1.0,
+    circuit_failure_threshold: Optional[int] = None,
+    circuit_reset_seconds: float = 30.0,
+    latency_budget_seconds: Optional[float] = None,
+    quality_floor: str = "tiny",
+    blob_store: Optional[blobs.BlobStore] = None,
+    reference_threshold_bytes: int = 4 * 1024 * 1024,
+    deployments: Optional[DeploymentPool] = None,
+) -> WhisperClient:
+    # the client's pooled session keeps its connections to the backend open between requests, and its hedging
+    # statistics and circuit state persist across invocations.
+    hedger, breaker = None, None
+    if hedge_quantile is not None:
+        # up to `max_parallel` concurrent checks, each of which may be duplicated once.
+        hedger = banana_dev.Hedger(
+            quantile=hedge_quantile, min_delay=hedge_min_delay, max_workers=2 * max_parallel
+        )
+    if circuit_failure_threshold is not None:
+        breaker = banana_dev.CircuitBreaker(circuit_failure_threshold, circuit_reset_seconds)
+    return WhisperClient(
+        api_key=api_key,
+        model_key=model_key,
+        whisper_model=whisper_model,
+        streaming_threshold_bytes=streaming_threshold_bytes,
+        max_parallel=max_parallel,
+        session=banana_dev.BananaSession(endpoint=endpoint, hedger=hedger, breaker=breaker),
+        latency_budget_seconds=latency_budget_seconds,
+        quality_floor=quality_floor,
+        blob_store=blob_store,
+        reference_threshold_bytes=reference_threshold_bytes,
+        deployments=deployments,
+    )
+
 
 handler = create_handler(WhisperBlockifier)
@@ -0,0 +1,219 @@
+"""Linear-time assembly of transcript text and timestamp tags from whisper segments."""
+
+import bisect
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from steamship import Tag
+
+import tag
+from whisper.response import SegmentTable
+
+
+class TimestampTable:
+    """A compact, column-oriented list of timed spans over a transcript.
+
+    Each row is a character range of the transcript plus its start and end time, held in typed arrays rather than
+    one dict (or Tag) per span. Tags are only materialized once, in `to_tags`.
+    """
+
+    def __init__(self):
+        """Initialize an empty table."""
+        self.char_starts = array("q")
+        self.char_ends = array("q")
+        self.start_times = array("d")
+        self.end_times = array("d")
+
+    def __len__(self) -> int:
+        """Return the number of rows."""
+        return len(self.char_starts)
+
+    def append(self, char_start: int, char_end: int, start_time: float, end_time: float) -> None:
+        """Add a row."""
+        self.char_starts.append(char_start)
+        self.char_ends.append(char_end)
+        self.start_times.append(start_time)
+        self.end_times.append(end_time)
+
+    def to_tags(self, text: str, kind: str = tag.TIMESTAMP) -> List[Tag.CreateRequest]:
+        """Create a timestamp tag for every row, naming each with the text it covers."""
+        rows = zip(self.char_starts, self.char_ends, self.start_times, self.end_times)
+        return tag.create_timestamps(text, rows, kind=kind)
+
+
+@dataclass
+class Transcript:
+    """The assembled text of a transcription, with segment- and (optionally) word-level timing.
+
+    Attributes
+    ----------
+    text : str
+        the full transcript: stripped segment texts, separated by single spaces
+    segments : TimestampTable
+        where each segment falls within `text`, and when it was spoken
+    words : Optional[TimestampTable]
+        where each word falls within `text`, and when it was spoken, if word timing was requested
+    """
+
+    text: str
+    segments: TimestampTable = field(default_factory=TimestampTable)
+    words: Optional[TimestampTable] = None
+
+    def tags(self) -> List[Tag.CreateRequest]:
+        """Return the segment timestamp tags, followed by any word timestamp tags."""
+        tags = self.segments.to_tags(self.text)
+        if self.words is not None:
+            tags.extend(self.words.to_tags(self.text, kind=tag.WORD_TIMESTAMP))
+        return tags
+
+
+def assemble(
+    segments: Union[Iterable[Dict[str, Any]], SegmentTable], words: bool = False
+) -> Transcript:
+    """Join segment texts into a transcript, recording where each segment (and word) lands.
+
+    Runs in time linear in the total length of the segments. Segment text is stripped, and non-empty segments are
+    separated by a single space.
+
+    :param segments: whisper segments, each with `start`, `end`, and `text`, and, for word timing, `words`: a list
+    of dicts with `start`, `end`, and `word`; or the same columns in a `SegmentTable`
+    :param words: whether to build word-level timing as well
+    :return: the assembled transcript
+    """
+    if isinstance(segments, SegmentTable):
+        return _assemble_table(segments, words)
+
+    parts: List[str] = []
+    table = TimestampTable()
+    word_table = TimestampTable() if words else None
+    length = 0
+    for segment in segments:
+        text = segment["text"].strip()
+        if text:
+            if parts:
+                parts.append(" ")
+                length += 1
+            parts.append(text)
+        table.append(length, length + len(text), segment["start"], segment["end"])
+        if word_table is not None:
+            timed = ((w["word"], w["start"], w["end"]) for w in segment.get("words") or [])
+            _add_words(word_table, length, text, timed)
+        length += len(text)
+
+    return Transcript("".join(parts), table, word_table)
+
+
+def _assemble_table(segments: SegmentTable, words: bool) -> Transcript:
+    parts: List[str] = []
+    table = TimestampTable()
+    word_table = TimestampTable() if words else None
+    length = 0
+    for i, raw_text in enumerate(segments.texts):
+        text = raw_text.strip()
+        if text:
+            if parts:
+                parts.append(" ")
+                length += 1
+            parts.append(text)
+        table.append(length, length + len(text), segments.starts[i], segments.ends[i])
+        if word_table is not None:
+            timed = (
+                (segments.words[w], segments.word_starts[w], segments.word_ends[w])
+                for w in segments.segment_words(i)
+            )
+            _add_words(word_table, length, text, timed)
+        length += len(text)
+
+    return Transcript("".join(parts), table, word_table)
+
+
+def _add_words(
+    table: TimestampTable, offset: int, text: str, words: Iterable[Tuple[str, float, float]]
+) -> None:
+    cursor = 0
+    for word, start, end in words:
+        word_text = word.strip()
+        if not word_text:
+            continue
+        found = text.find(word_text, cursor)
+        if found < 0:
+            continue
+        cursor = found + len(word_text)
+        table.append(offset + found, offset + cursor, start, end)
+
+
+def split(
+    transcript: Transcript, max_chars: int, max_seconds: float, pause_seconds: float
+) -> List[Transcript]:
+    """Split a transcript at segment boundaries into parts bounded by character count and duration.
+
+    A part ends early at a pause of at least `pause_seconds` between segments once it is at least half full. A part
+    that would exceed a bound ends at the longest pause within its second half, or else just before the segment that
+    would exceed it. A single segment that exceeds a bound by itself becomes a part of its own. Timestamps in each part
+    are re-based onto the part's text.
+
+    :param transcript: the assembled transcript
+    :param max_chars: the most characters of text in a part
+    :param max_seconds: the most seconds from the start of a part's first segment to the end of its last
+    :param pause_seconds: the shortest silence between segments that ends a part that is at least half full
+    :return: the parts, in order
+    """
+    table = transcript.segments
+
+    def fill(first: int, end: int) -> float:
+        # how full a part made of segments [first, end) is, relative to the tighter of the two bounds.
+        chars = table.char_ends[end - 1] - table.char_starts[first]
+        seconds = table.end_times[end - 1] - table.start_times[first]
+        return max(chars / max_chars, seconds / max_seconds)
+
+    def pause(boundary: int) -> float:
+        return table.start_times[boundary] - table.end_times[boundary - 1]
+
+    firsts = [0]
+    for i in range(1, len(table)):
+        if fill(firsts[-1], i) >= 0.5 and pause(i) >= pause_seconds:
+            firsts.append(i)
+            continue
+        while i > firsts[-1] and fill(firsts[-1], i + 1) > 1.0:
+            first = firsts[-1]
+            candidates = [b for b in range(first + 1, i + 1) if fill(first, b) >= 0.5]
+            # timestamps are only meaningful to about 10ms; among similar pauses the latest, fullest part wins.
+            firsts.append(max(candidates, key=lambda b: (round(pause(b), 2), b), default=i))
+
+    ends = firsts[1:] + [len(table)]
+    return [_part(transcript, first, end) for first, end in zip(firsts, ends)]
+
+
+def _part(transcript: Transcript, first: int, end: int) -> Transcript:
+    # the segments [first, end) of a transcript, with their text and timestamps re-based onto it.
+    table = transcript.segments
+    if len(table) == 0:
+        return transcript
+    char_start, char_end = table.char_starts[first], table.char_ends[end - 1]
+    text = transcript.text[char_start:char_end]
+    # a part that starts with empty segments starts before the space that separates it from the previous part.
+    stripped = text.lstrip()
+    char_start += len(text) - len(stripped)
+
+    segments = _rebase(table, first, end, char_start)
+    words = None
+    if transcript.words is not None:
+        rows = transcript.words
+        words = _rebase(
+            rows,
+            bisect.bisect_left(rows.char_starts, char_start),
+            bisect.bisect_right(rows.char_ends, char_end),
+            char_start,
+        )
+    return Transcript(stripped, segments, words)
+
+
+def _rebase(table: TimestampTable, first: int, end: int, offset: int) -> TimestampTable:
+    # rows [first, end) of a table, with character positions moved `offset` to the left.
+    rebased = TimestampTable()
+    rebased.char_starts = array("q", [max(c - offset, 0) for c in table.char_starts[first:end]])
+    rebased.char_ends = array("q", [max(c - offset, 0) for c in table.char_ends[first:end]])
+    rebased.start_times = table.start_times[first:end]
+    rebased.end_times = table.end_times[first:end]
+    return rebased
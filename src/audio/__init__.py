@@ -0,0 +1 @@
+"""Lightweight handling of audio containers."""
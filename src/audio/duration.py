@@ -0,0 +1,17 @@
+"""Estimate the duration of an audio payload."""
+
+from . import probe
+
+# assumed bitrate for formats whose duration cannot be read: 128 kbps, a typical compressed-audio rate.
+FALLBACK_BYTES_PER_SECOND = 128_000 / 8
+
+
+def estimate(data: bytes) -> float:
+    """Return the duration of the audio, in seconds, falling back to a bitrate-based guess.
+
+    Only headers are read (see `probe`), so for MP3 files without a frame count the duration assumes a constant bitrate.
+    """
+    info = probe.probe(data)
+    if info is not None and info.duration is not None:
+        return info.duration
+    return len(data) / FALLBACK_BYTES_PER_SECOND
@@ -0,0 +1,122 @@
+"""Compact spectral fingerprints of PCM WAV audio, robust to re-encoding, resampling, gain and trimming."""
+
+import io
+import wave
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from audio.normalize import decode, resample
+
+# fingerprints are computed on 8 kHz mono audio: the bands used lie well below its 4 kHz Nyquist frequency.
+RATE = 8000
+# each analysis frame is 256 ms long, and frames start every 32 ms.
+FRAME_SIZE = 2048
+HOP = 256
+FRAME_SECONDS = HOP / RATE
+
+# 33 bands, spaced logarithmically between these frequencies (Hz), give 32 bits per frame.
+LOW_HZ = 300.0
+HIGH_HZ = 3000.0
+BITS = 32
+
+# frames transformed at once, bounding the memory used for long audio.
+_CHUNK_FRAMES = 1024
+
+
+def _band_matrix() -> np.ndarray:
+    # sums the power spectrum of a frame into each band.
+    edges = np.geomspace(LOW_HZ, HIGH_HZ, BITS + 2)
+    bins = np.fft.rfftfreq(FRAME_SIZE, 1.0 / RATE)
+    band = np.searchsorted(edges, bins, side="right") - 1
+    matrix = np.zeros((bins.size, BITS + 1), dtype=np.float32)
+    inside = (band >= 0) & (band <= BITS)
+    matrix[np.flatnonzero(inside), band[inside]] = 1.0
+    return matrix
+
+
+def compute(samples: np.ndarray) -> np.ndarray:
+    """Fingerprint a mono float signal sampled at `RATE`.
+
+    Bit `m` of frame `n` is set when the energy difference between bands `m` and `m + 1` grew since frame `n - 1`.
+    Only the signs of energy differences are kept, so gain and most coding noise do not change the bits; silent frames
+    have every bit clear.
+
+    :return: one 32-bit value per frame (after the first), as a uint32 array
+    """
+    count = 1 + (samples.size - FRAME_SIZE) // HOP if samples.size >= FRAME_SIZE else 0
+    if count < 2:
+        return np.zeros(0, dtype=np.uint32)
+    frames = sliding_window_view(samples.astype(np.float32, copy=False), FRAME_SIZE)[::HOP]
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    bands = _band_matrix()
+    energies = np.empty((count, BITS + 1), dtype=np.float32)
+    for start in range(0, count, _CHUNK_FRAMES):
+        spectrum = np.fft.rfft(frames[start : start + _CHUNK_FRAMES] * window, axis=1)
+        power = (spectrum.real * spectrum.real + spectrum.imag * spectrum.imag).astype(np.float32)
+        energies[start : start + _CHUNK_FRAMES] = power @ bands
+    slope = energies[:, :-1] - energies[:, 1:]
+    bits = (slope[1:] - slope[:-1]) > 0
+    return np.packbits(bits, axis=1).view(">u4").ravel().astype(np.uint32)
+
+
+def from_wav(data: bytes) -> Optional[np.ndarray]:
+    """Fingerprint a PCM WAV file of any sample rate, width and channel count.
+
+    :return: the fingerprint (see `compute`), or None when `data` is not PCM WAV or is too short to fingerprint
+    """
+    try:
+        with wave.open(io.BytesIO(data)) as reader:
+            channels = reader.getnchannels()
+            sample_width = reader.getsampwidth()
+            rate = reader.getframerate()
+            frames = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    mono = decode(frames, sample_width, channels).mean(axis=1)
+    fingerprint = compute(resample(mono, rate, RATE))
+    return fingerprint if fingerprint.size else None
+
+
+def similarity(query: np.ndarray, reference: np.ndarray, offset: int) -> float:
+    """Return the fraction of bits that agree where `query` overlaps `reference` starting at frame `offset` of it.
+
+    A negative `offset` means that `query` starts before `reference`. No overlap gives 0.
+    """
+    start = max(offset, 0)
+    end = min(offset + query.size, reference.size)
+    if end <= start:
+        return 0.0
+    differing = np.bitwise_xor(query[start - offset : end - offset], reference[start:end])
+    errors = np.unpackbits(differing.view(np.uint8)).sum()
+    return 1.0 - float(errors) / (BITS * (end - start))
+
+
+@dataclass
+class Match:
+    """Where a query fingerprint was found within a reference fingerprint.
+
+    Attributes
+    ----------
+    offset : int
+        the frame of the reference that the query's first frame aligns with. negative when the query starts earlier.
+    similarity : float
+        the fraction of bits that agree over the overlap
+    """
+
+    offset: int
+    similarity: float
+
+    @property
+    def offset_seconds(self) -> float:
+        """Return the offset in seconds."""
+        return self.offset * FRAME_SECONDS
+
+
+def refine(query: np.ndarray, reference: np.ndarray, offset: int, radius: int = 2) -> Match:
+    """Return the best-matching offset within `radius` frames of `offset`."""
+    candidates = range(offset - radius, offset + radius + 1)
+    best = max(candidates, key=lambda o: similarity(query, reference, o))
+    return Match(best, similarity(query, reference, best))
@@ -0,0 +1,143 @@
+"""Utility methods for MPEG audio (MP3) files, based on frame headers alone."""
+
+from bisect import bisect_left
+from typing import List, NamedTuple, Optional, Tuple
+
+# kbps, indexed by [version is MPEG-1][bitrate index]. layer III only.
+_BITRATES = {
+    True: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    False: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Hz, indexed by the two version bits, then the sample rate index.
+_SAMPLE_RATES = {
+    0b11: [44100, 48000, 32000],  # MPEG-1
+    0b10: [22050, 24000, 16000],  # MPEG-2
+    0b00: [11025, 12000, 8000],  # MPEG-2.5
+}
+
+
+class Header(NamedTuple):
+    """The fields of a layer III frame header that describe the stream."""
+
+    bitrate: int
+    sample_rate: int
+    channels: int
+    samples: int
+    length: int
+
+
+class Frame(NamedTuple):
+    """Location and timing of a single MPEG audio frame."""
+
+    offset: int
+    length: int
+    start: float
+    duration: float
+
+
+def is_mp3(data: bytes) -> bool:
+    """Determine whether `data` looks like an MP3 file (an ID3v2 tag or a layer III frame header)."""
+    return data[:3] == b"ID3" or _parse_header(data, 0) is not None
+
+
+def skip_id3(data: bytes) -> int:
+    """Return the offset of the first byte after a leading ID3v2 tag, if any."""
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def sync(data: bytes, offset: int = 0, limit: Optional[int] = None) -> Optional[int]:
+    """Return the offset of the first layer III frame at or after `offset`, skipping any padding or junk before it.
+
+    A frame header counts only if another one follows it, or its frame ends the data, so that stray sync bits in the junk
+    are not taken for a frame.
+
+    :param limit: how many bytes past `offset` to search, or None to search the rest of the data
+    """
+    end = len(data) if limit is None else min(len(data), offset + limit)
+    while True:
+        offset = data.find(b"\xff", offset, end)
+        if offset < 0:
+            return None
+        parsed = _parse_header(data, offset)
+        if parsed is not None:
+            following = offset + parsed[0]
+            if following == len(data) or _parse_header(data, following) is not None:
+                return offset
+        offset += 1
+
+
+def frames(data: bytes) -> List[Frame]:
+    """Index the layer III frames of an MP3 file, resynchronizing past any junk between frames."""
+    out = []
+    offset = skip_id3(data)
+    elapsed = 0.0
+    while offset + 4 <= len(data):
+        header = _parse_header(data, offset)
+        if header is None:
+            offset += 1
+            continue
+        length, frame_duration = header
+        out.append(Frame(offset, length, elapsed, frame_duration))
+        elapsed += frame_duration
+        offset += length
+    return out
+
+
+def duration(data: bytes) -> float:
+    """Return the duration of an MP3 file, in seconds."""
+    return sum(frame.duration for frame in frames(data))
+
+
+def cut(data: bytes, spans: List[Tuple[float, float]]) -> List[Tuple[float, bytes]]:
+    """Cut an MP3 file on frame boundaries into one piece per (start, end) span, in seconds.
+
+    :return: the exact start time, in seconds, and the MP3 bytes of each span
+    """
+    index = frames(data)
+    starts = [f.start for f in index]
+    pieces = []
+    for start, end in spans:
+        lo, hi = bisect_left(starts, start), bisect_left(starts, end)
+        if lo >= hi:
+            continue
+        first, last = index[lo], index[hi - 1]
+        pieces.append((first.start, data[first.offset : last.offset + last.length]))
+    return pieces
+
+
+def header(data: bytes, offset: int) -> Optional[Header]:
+    """Parse the layer III frame header at `offset`, or return None if there is none."""
+    parsed = _parse_header(data, offset)
+    if parsed is None:
+        return None
+    length, frame_duration = parsed
+    version = (data[offset + 1] >> 3) & 0b11
+    bitrate = _BITRATES[version == 0b11][data[offset + 2] >> 4] * 1000
+    sample_rate = _SAMPLE_RATES[version][(data[offset + 2] >> 2) & 0b11]
+    channels = 1 if data[offset + 3] >> 6 == 0b11 else 2
+    return Header(bitrate, sample_rate, channels, round(frame_duration * sample_rate), length)
+
+
+def _parse_header(data: bytes, offset: int):
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 0b11
+    layer = (data[offset + 1] >> 1) & 0b11
+    bitrate_index = data[offset + 2] >> 4
+    rate_index = (data[offset + 2] >> 2) & 0b11
+    padding = (data[offset + 2] >> 1) & 0b1
+    if version not in _SAMPLE_RATES or layer != 0b01 or rate_index == 3:
+        return None
+    if bitrate_index in (0, 15):
+        return None
+
+    mpeg1 = version == 0b11
+    bitrate = _BITRATES[mpeg1][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    samples = 1152 if mpeg1 else 576
+    length = (samples // 8) * bitrate // sample_rate + padding
+    return length, samples / sample_rate
@@ -0,0 +1,85 @@
+"""Downmix and resample PCM WAV audio to the 16 kHz mono that Whisper works on internally."""
+
+import io
+import wave
+from typing import Optional
+
+import numpy as np
+
+TARGET_RATE = 16000
+
+# taps on each side of the anti-aliasing filter's center.
+FILTER_HALF_WIDTH = 32
+
+
+def decode(frames: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """Decode interleaved little-endian PCM frames into a (samples, channels) float32 array in [-1, 1)."""
+    if sample_width == 1:
+        samples = np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0
+    elif sample_width == 3:
+        # sign-extend each 3-byte sample by placing it in the top bytes of an int32.
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        padded = np.zeros((raw.shape[0], 4), dtype=np.uint8)
+        padded[:, 1:] = raw
+        samples = padded.view("<i4").ravel().astype(np.float32) / 256.0
+    else:
+        samples = np.frombuffer(frames, dtype=f"<i{sample_width}").astype(np.float32)
+    scale = float(1 << (8 * sample_width - 1))
+    return (samples / scale).reshape(-1, channels)
+
+
+def _lowpass(rate: int, cutoff: float) -> np.ndarray:
+    """Build a Hann-windowed sinc low-pass filter for `cutoff` Hz at sample rate `rate`."""
+    taps = np.arange(-FILTER_HALF_WIDTH, FILTER_HALF_WIDTH + 1, dtype=np.float32)
+    fc = cutoff / rate
+    kernel = 2 * fc * np.sinc(2 * fc * taps) * np.hanning(taps.size).astype(np.float32)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int = TARGET_RATE) -> np.ndarray:
+    """Resample a mono float signal from `rate` to `target_rate`.
+
+    The signal is low-pass filtered below the target Nyquist frequency when downsampling, and then linearly
+    interpolated at the target sample times.
+    """
+    if rate == target_rate or samples.size == 0:
+        return samples
+    if target_rate < rate:
+        samples = np.convolve(samples, _lowpass(rate, 0.45 * target_rate), mode="same")
+    count = int(samples.size * target_rate / rate)
+    positions = np.arange(count, dtype=np.float64) * (rate / target_rate)
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+
+def normalize(data: bytes, target_rate: int = TARGET_RATE) -> Optional[bytes]:
+    """Convert a PCM WAV file into a 16-bit mono WAV file at `target_rate`.
+
+    :return: the normalized WAV bytes, or None when `data` is not PCM WAV or is already no larger than the result
+        would be (mono, 16-bit or narrower, at or below `target_rate`).
+    """
+    try:
+        with wave.open(io.BytesIO(data)) as reader:
+            channels = reader.getnchannels()
+            sample_width = reader.getsampwidth()
+            rate = reader.getframerate()
+            if channels == 1 and sample_width <= 2 and rate <= target_rate:
+                return None
+            frames = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    mono = decode(frames, sample_width, channels).mean(axis=1)
+    if rate > target_rate:
+        mono = resample(mono, rate, target_rate)
+    else:
+        # never upsample: that only adds bytes.
+        target_rate = rate
+    pcm = np.clip(np.round(mono * 32768.0), -32768, 32767).astype("<i2")
+
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(target_rate)
+        writer.writeframes(pcm.tobytes())
+    return out.getvalue()
@@ -0,0 +1,292 @@
+"""Header-only probing of audio files: container, codec, duration, sample rate and channel count, without decoding."""
+
+import struct
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from . import mp3
+
+# RIFF WAVE format tags, by codec name.
+_WAV_CODECS = {1: "pcm", 3: "float", 6: "alaw", 7: "mulaw", 0x55: "mp3"}
+_WAV_EXTENSIBLE = 0xFFFE
+
+# MP4 boxes within a track that contain other boxes, on the path to its sample description.
+_MP4_CONTAINERS = {b"mdia", b"minf", b"stbl"}
+
+# EBML element ids used by WebM (and Matroska).
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_CODEC_ID = 0x86
+_AUDIO = 0xE1
+_SAMPLING_FREQUENCY = 0xB5
+_CHANNELS = 0x9F
+_CLUSTER = 0x1F43B675
+_AUDIO_TRACK = 2
+
+# how far past any ID3 tag the first MP3 frame is searched for, so that other data is rejected quickly.
+_MP3_SYNC_BYTES = 1024 * 1024
+
+
+@dataclass
+class AudioInfo:
+    """What the headers of an audio file say about it.
+
+    Attributes
+    ----------
+    container : str
+        "wav", "mp3", "mp4" or "webm"
+    codec : Optional[str]
+        e.g. "pcm", "mp3", "mp4a" or "A_OPUS", if the headers name it
+    duration : Optional[float]
+        length in seconds, if the headers record it (or, for constant-bitrate MP3, imply it)
+    sample_rate : Optional[int]
+        samples per second, per channel
+    channels : Optional[int]
+        number of audio channels
+    """
+
+    container: str
+    codec: Optional[str] = None
+    duration: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+
+
+def probe(data: bytes) -> Optional[AudioInfo]:
+    """Read the headers of a WAV, MP3, MP4/M4A or WebM file.
+
+    Only headers are parsed: the work does not grow with the length of the audio, so it is cheap enough to run on
+    every request.
+
+    :return: what the headers describe, or None when `data` is not a recognizable file of one of those formats
+    """
+    try:
+        if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+            return _probe_wav(data)
+        if data[4:8] == b"ftyp":
+            return _probe_mp4(data)
+        if data[:4] == struct.pack(">I", _EBML):
+            return _probe_webm(data)
+        # MP3 files may have padding or junk before their first frame, so they are recognized by resynchronizing.
+        return _probe_mp3(data)
+    except (struct.error, IndexError, ValueError):
+        return None
+
+
+def _probe_wav(data: bytes) -> Optional[AudioInfo]:
+    info, byte_rate, offset = None, 0, 12
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            tag, channels, rate, byte_rate = struct.unpack_from("<HHII", data, body)
+            if tag == _WAV_EXTENSIBLE and size >= 40:
+                tag = struct.unpack_from("<H", data, body + 24)[0]
+            info = AudioInfo("wav", _WAV_CODECS.get(tag, f"0x{tag:04x}"), None, rate, channels)
+        elif chunk_id == b"data":
+            if info is None or byte_rate == 0:
+                return None
+            # streamed WAV files may leave the data size unset, or larger than the file.
+            info.duration = min(size, len(data) - body) / byte_rate
+            return info
+        offset = body + size + (size & 1)
+    return None
+
+
+def _probe_mp3(data: bytes) -> Optional[AudioInfo]:
+    offset = mp3.sync(data, mp3.skip_id3(data), _MP3_SYNC_BYTES)
+    if offset is None:
+        return None
+    header = mp3.header(data, offset)
+    info = AudioInfo("mp3", "mp3", None, header.sample_rate, header.channels)
+
+    # a Xing/Info tag, written after the side information of the first frame, counts the frames of VBR files.
+    mpeg1 = header.samples == 1152
+    side_info = (
+        (32 if header.channels == 2 else 17) if mpeg1 else (17 if header.channels == 2 else 9)
+    )
+    tag = offset + 4 + side_info
+    if data[tag : tag + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack_from(">I", data, tag + 4)[0]
+        if flags & 1:
+            frames = struct.unpack_from(">I", data, tag + 8)[0]
+            info.duration = frames * header.samples / header.sample_rate
+            return info
+    info.duration = (len(data) - offset) * 8 / header.bitrate
+    return info
+
+
+def _mp4_boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    # yields (type, body start, box end) for each box between start and end.
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield kind, offset + header, min(offset + size, end)
+        offset += size
+
+
+def _probe_mp4(data: bytes) -> Optional[AudioInfo]:
+    for kind, body, end in _mp4_boxes(data, 0, len(data)):
+        if kind != b"moov":
+            continue
+        info = AudioInfo("mp4")
+        for child, child_body, child_end in _mp4_boxes(data, body, end):
+            if child == b"mvhd":
+                info.duration = _mp4_duration(data, child_body)
+            elif child == b"trak" and info.codec is None:
+                track: Dict[str, Any] = {}
+                _read_track(data, child_body, child_end, track)
+                if track.get("handler") == b"soun":
+                    info.codec = track.get("codec")
+                    info.sample_rate = track.get("sample_rate")
+                    info.channels = track.get("channels")
+                    if info.duration is None:
+                        info.duration = track.get("duration")
+        return info
+    return None
+
+
+def _read_track(data: bytes, start: int, end: int, track: Dict[str, Any]) -> None:
+    for kind, body, box_end in _mp4_boxes(data, start, end):
+        if kind == b"mdhd":
+            track["duration"] = _mp4_duration(data, body)
+        elif kind == b"hdlr":
+            track["handler"] = data[body + 8 : body + 12]
+        elif kind == b"stsd":
+            entry = body + 8
+            size, codec = struct.unpack_from(">I4s", data, entry)
+            track["codec"] = codec.decode("latin-1").strip()
+            if size >= 36:
+                track["channels"] = struct.unpack_from(">H", data, entry + 24)[0]
+                track["sample_rate"] = struct.unpack_from(">I", data, entry + 32)[0] >> 16
+        elif kind in _MP4_CONTAINERS:
+            _read_track(data, body, box_end, track)
+
+
+def _mp4_duration(data: bytes, body: int) -> Optional[float]:
+    # the duration of an `mvhd` or `mdhd` box. fragmented files leave it zero (or all ones) and record it elsewhere.
+    if data[body] == 1:
+        timescale, duration = struct.unpack_from(">IQ", data, body + 20)
+        unknown = 0xFFFFFFFFFFFFFFFF
+    else:
+        timescale, duration = struct.unpack_from(">II", data, body + 12)
+        unknown = 0xFFFFFFFF
+    if not timescale or duration in (0, unknown):
+        return None
+    return duration / timescale
+
+
+def _ebml_id(data: bytes, offset: int) -> Tuple[int, int]:
+    first = data[offset]
+    length = 1
+    while length <= 4 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 4:
+        raise ValueError("invalid EBML element id")
+    return int.from_bytes(data[offset : offset + length], "big"), offset + length
+
+
+def _ebml_size(data: bytes, offset: int) -> Tuple[Optional[int], int]:
+    # returns None for the "unknown size" of live streams.
+    first = data[offset]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8:
+        raise ValueError("invalid EBML size")
+    value = first & (0xFF >> length)
+    for byte in data[offset + 1 : offset + length]:
+        value = (value << 8) | byte
+    if value == (1 << (7 * length)) - 1:
+        return None, offset + length
+    return value, offset + length
+
+
+def _ebml_elements(data: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    # yields (id, body start, body end) for each element between start and end.
+    offset = start
+    while offset < end:
+        element, offset = _ebml_id(data, offset)
+        size, offset = _ebml_size(data, offset)
+        body_end = end if size is None else min(offset + size, end)
+        yield element, offset, body_end
+        offset = body_end
+
+
+def _ebml_uint(data: bytes, start: int, end: int) -> int:
+    return int.from_bytes(data[start:end], "big")
+
+
+def _ebml_float(data: bytes, start: int, end: int) -> float:
+    return struct.unpack(">f" if end - start == 4 else ">d", data[start:end])[0]
+
+
+def _probe_webm(data: bytes) -> Optional[AudioInfo]:
+    for element, body, end in _ebml_elements(data, 0, len(data)):
+        if element != _SEGMENT:
+            continue
+        info = AudioInfo("webm")
+        for child, child_body, child_end in _ebml_elements(data, body, end):
+            if child == _INFO:
+                info.duration = _read_info(data, child_body, child_end)
+            elif child == _TRACKS:
+                _read_tracks(data, child_body, child_end, info)
+            elif child == _CLUSTER:
+                # media data follows; every header element comes before it.
+                break
+        return info
+    return None
+
+
+def _read_info(data: bytes, start: int, end: int) -> Optional[float]:
+    # the segment duration, in seconds, if recorded.
+    scale, duration = 1_000_000, None
+    for field, field_start, field_end in _ebml_elements(data, start, end):
+        if field == _TIMECODE_SCALE:
+            scale = _ebml_uint(data, field_start, field_end)
+        elif field == _DURATION:
+            duration = _ebml_float(data, field_start, field_end)
+    return None if duration is None else duration * scale / 1e9
+
+
+def _read_tracks(data: bytes, start: int, end: int, info: AudioInfo) -> None:
+    # fills `info` from the first audio track.
+    for entry, body, entry_end in _ebml_elements(data, start, end):
+        if entry != _TRACK_ENTRY:
+            continue
+        track_type, codec, audio = None, None, None
+        for field, field_start, field_end in _ebml_elements(data, body, entry_end):
+            if field == _TRACK_TYPE:
+                track_type = _ebml_uint(data, field_start, field_end)
+            elif field == _CODEC_ID:
+                codec = data[field_start:field_end].decode("ascii", "replace").rstrip("\0")
+            elif field == _AUDIO:
+                audio = (field_start, field_end)
+        if track_type != _AUDIO_TRACK:
+            continue
+        info.codec = codec
+        if audio is not None:
+            _read_audio(data, *audio, info)
+        return
+
+
+def _read_audio(data: bytes, start: int, end: int, info: AudioInfo) -> None:
+    for setting, setting_start, setting_end in _ebml_elements(data, start, end):
+        if setting == _SAMPLING_FREQUENCY:
+            info.sample_rate = int(_ebml_float(data, setting_start, setting_end))
+        elif setting == _CHANNELS:
+            info.channels = _ebml_uint(data, setting_start, setting_end)
@@ -0,0 +1,84 @@
+"""Energy-based detection and removal of long silent spans in PCM WAV audio."""
+
+import io
+import wave
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from audio.normalize import decode
+
+# length of the analysis frames whose energy is compared against the silence threshold.
+FRAME_SECONDS = 0.02
+
+
+def find_silences(
+    samples: np.ndarray,
+    rate: int,
+    threshold_db: float,
+    min_seconds: float,
+    padding_seconds: float,
+) -> List[Tuple[int, int]]:
+    """Find the removable part of every long silent run in a mono signal.
+
+    A run of consecutive frames whose RMS level is below `threshold_db` (dBFS) is silent. Runs at least `min_seconds`
+    long are removable, except for `padding_seconds` at each end, which keep the onset and decay of nearby speech.
+
+    :return: (first, last) sample indexes of each removable span, last exclusive, in order
+    """
+    frame = max(1, int(rate * FRAME_SECONDS))
+    count = samples.size // frame
+    if count == 0:
+        return []
+    frames = samples[: count * frame].reshape(count, frame).astype(np.float64)
+    level = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-20)
+    silent = np.concatenate(([0], (level < threshold_db).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(silent))
+    starts, ends = edges[0::2] * frame, edges[1::2] * frame
+    # a silent run that reaches the end of the file also covers the trailing partial frame.
+    ends[ends == count * frame] = samples.size
+
+    padding = int(round(padding_seconds * rate))
+    long_enough = (ends - starts) >= max(int(round(min_seconds * rate)), 2 * padding + 1)
+    return [
+        (int(s) + padding, int(e) - padding) for s, e in zip(starts[long_enough], ends[long_enough])
+    ]
+
+
+def trim(
+    data: bytes,
+    threshold_db: float = -45.0,
+    min_seconds: float = 1.0,
+    padding_seconds: float = 0.25,
+) -> Optional[Tuple[bytes, List[Tuple[float, float]]]]:
+    """Remove long silent spans from a PCM WAV file, keeping its format.
+
+    :return: the trimmed WAV bytes and the (start, end) times of the removed spans, in seconds against the original
+        audio, or None when `data` is not PCM WAV or has nothing to remove
+    """
+    try:
+        with wave.open(io.BytesIO(data)) as reader:
+            params = reader.getparams()
+            frames = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    samples = decode(frames, params.sampwidth, params.nchannels).mean(axis=1)
+    silences = find_silences(samples, params.framerate, threshold_db, min_seconds, padding_seconds)
+    if not silences:
+        return None
+
+    width = params.sampwidth * params.nchannels
+    view = memoryview(frames)
+    kept, position = [], 0
+    for first, last in silences:
+        kept.append(view[position * width : first * width])
+        position = last
+    kept.append(view[position * width :])
+
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        writer.setparams(params)
+        writer.writeframes(b"".join(kept))
+    rate = params.framerate
+    return out.getvalue(), [(first / rate, last / rate) for first, last in silences]
@@ -0,0 +1,51 @@
+"""Utility methods for PCM WAV (RIFF/WAVE) audio."""
+
+import io
+import wave
+from typing import List, Tuple
+
+
+def is_wav(data: bytes) -> bool:
+    """Determine whether `data` starts with a RIFF/WAVE header."""
+    return data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def duration(data: bytes) -> float:
+    """Return the duration of a PCM WAV file, in seconds.
+
+    :raises wave.Error: when the file is not uncompressed PCM.
+    """
+    with wave.open(io.BytesIO(data)) as reader:
+        return reader.getnframes() / reader.getframerate()
+
+
+def cut(data: bytes, spans: List[Tuple[float, float]]) -> List[Tuple[float, bytes]]:
+    """Cut a PCM WAV file into standalone WAV files, one per (start, end) span, in seconds.
+
+    :return: the exact start time, in seconds, and the WAV bytes of each span
+    :raises wave.Error: when the file is not uncompressed PCM.
+    """
+    pieces = []
+    with wave.open(io.BytesIO(data)) as reader:
+        rate = reader.getframerate()
+        for start, end in spans:
+            first = int(round(start * rate))
+            reader.setpos(first)
+            frames = reader.readframes(int(round(end * rate)) - first)
+            out = io.BytesIO()
+            with wave.open(out, "wb") as writer:
+                writer.setparams(reader.getparams())
+                writer.writeframes(frames)
+            pieces.append((first / rate, out.getvalue()))
+    return pieces
+
+
+def silent(seconds: float, rate: int = 16000) -> bytes:
+    """Build a silent 16-bit mono PCM WAV file lasting `seconds`."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(b"\x00\x00" * int(seconds * rate))
+    return out.getvalue()
@@ -0,0 +1,77 @@
+"""Split long audio into overlapping windows that can be transcribed independently."""
+
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from . import mp3, wav
+
+
+@dataclass
+class Window:
+    """A standalone piece of a longer recording.
+
+    Attributes
+    ----------
+    offset : float
+        where the window's audio starts in the original recording, in seconds
+    start : float
+        start of the span, in seconds, for which this window's transcription is used when windows are merged
+    end : float
+        end of that span, in seconds. consecutive windows meet at the middle of their overlap.
+    data : bytes
+        the window's audio, in the same format as the original
+    """
+
+    offset: float
+    start: float
+    end: float
+    data: bytes
+
+
+def plan(total: float, window_seconds: float, overlap_seconds: float) -> List[Tuple[float, float]]:
+    """Return the (start, end) spans, in seconds, of overlapping windows covering `total` seconds of audio."""
+    if window_seconds <= overlap_seconds:
+        raise ValueError(
+            f"window ({window_seconds}s) must be longer than the overlap ({overlap_seconds}s)"
+        )
+    spans = []
+    start = 0.0
+    while True:
+        end = min(start + window_seconds, total)
+        spans.append((start, end))
+        if end >= total:
+            return spans
+        start += window_seconds - overlap_seconds
+
+
+def split(data: bytes, window_seconds: float, overlap_seconds: float) -> Optional[List[Window]]:
+    """Split WAV or MP3 audio into overlapping windows.
+
+    :return: the windows, in order, or None if the format cannot be split (or is too short to need splitting)
+    """
+    if wav.is_wav(data):
+        fmt = wav
+    elif mp3.is_mp3(data):
+        fmt = mp3
+    else:
+        return None
+
+    try:
+        total = fmt.duration(data)
+        if total <= window_seconds:
+            return None
+        pieces = fmt.cut(data, plan(total, window_seconds, overlap_seconds))
+    except Exception as e:
+        logging.warning(f"could not split audio into windows: {e}")
+        return None
+
+    windows = []
+    for i, (offset, piece) in enumerate(pieces):
+        start = 0.0 if i == 0 else windows[-1].end
+        if i + 1 < len(pieces):
+            end = (pieces[i + 1][0] + offset + fmt.duration(piece)) / 2
+        else:
+            end = total
+        windows.append(Window(offset, start, end, piece))
+    return windows
@@ -1,3 +1,15 @@
 """Minimal implementation of banana.dev API."""
 
-from .package import check, start
+from .package import check, is_server_failure, is_transient, start
+from .resilience import CircuitBreaker, CircuitOpenError, Hedger
+from .session import ENDPOINT, BananaSession, Timeouts
+from .streaming import StreamedBase64
+
+
+def __getattr__(name: str):
+    # the asyncio transport pulls in aiohttp, which adds ~200ms to every cold start of the synchronous plugin.
+    if name == "AsyncBananaSession":
+        from .aio import AsyncBananaSession
+
+        return AsyncBananaSession
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,211 @@
+"""Asyncio-native transport for the banana.dev API."""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+import metrics
+
+from . import codec
+from .package import check_payload, parse_response, record_outcome, start_payload
+from .resilience import CircuitBreaker, Hedger
+from .session import (
+    ENDPOINT,
+    RETRYABLE_STATUS_CODES,
+    Timeouts,
+    record_payload,
+    retry_delay,
+    session_stats,
+)
+from .streaming import JsonBody, contains_stream
+
+
+class AsyncBananaSession:
+    """A shared connection pool for concurrent, non-blocking calls to the banana.dev API.
+
+    Every request made through the session waits for one of `max_in_flight` slots, so hundreds of concurrent
+    long-poll checks can be issued from one event loop without overwhelming the backend or the pool.
+
+    Attributes
+    ----------
+    endpoint : str
+        base URL of the banana.dev API
+    timeouts : Timeouts
+        per-phase request timeouts
+    check_retries : int
+        number of times an idempotent `check` is retried after a connection error or retryable status
+    """
+
+    def __init__(
+        self,
+        endpoint: str = ENDPOINT,
+        pool_size: int = 100,
+        max_in_flight: int = 100,
+        keep_alive_seconds: float = 30.0,
+        timeouts: Optional[Timeouts] = None,
+        check_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedger: Optional[Hedger] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        """Initialize a session. The connection pool is created lazily, inside the running event loop.
+
+        :param endpoint: base URL of the banana.dev API
+        :param pool_size: maximum number of connections kept open to the endpoint
+        :param max_in_flight: maximum number of requests outstanding at once
+        :param keep_alive_seconds: how long an idle connection is kept open for reuse
+        :param timeouts: per-phase request timeouts
+        :param check_retries: number of retries for idempotent `check` calls
+        :param backoff_base: initial retry delay, in seconds, doubled after every attempt
+        :param backoff_max: upper bound on the retry delay, in seconds
+        :param hedger: duplicates `check` calls that run past a latency percentile learned from recent checks. it may
+        be shared with a `BananaSession`, so that both learn from the same checks.
+        :param breaker: fails `start` calls fast after repeated connection errors or 5xx responses. it may be shared
+        with a `BananaSession`, so that an outage seen by either stops both.
+        """
+        self.endpoint = endpoint if endpoint.endswith("/") else f"{endpoint}/"
+        self.timeouts = timeouts or Timeouts()
+        self.check_retries = check_retries
+        self._pool_size = pool_size
+        self._keep_alive_seconds = keep_alive_seconds
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._max_in_flight = max_in_flight
+        self.hedger = hedger
+        self.breaker = breaker
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def for_endpoint(self, endpoint: str) -> "AsyncBananaSession":
+        """Return a session to `endpoint` with the same limits, timeouts, retries and backoff.
+
+        Like `BananaSession.for_endpoint`, the new session has its own hedger and circuit breaker, configured like
+        those of this session.
+        """
+        return AsyncBananaSession(
+            endpoint=endpoint,
+            pool_size=self._pool_size,
+            max_in_flight=self._max_in_flight,
+            keep_alive_seconds=self._keep_alive_seconds,
+            timeouts=self.timeouts,
+            check_retries=self.check_retries,
+            backoff_base=self._backoff_base,
+            backoff_max=self._backoff_max,
+            hedger=self.hedger.fresh() if self.hedger is not None else None,
+            breaker=self.breaker.fresh() if self.breaker is not None else None,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the statistics of the hedger and circuit breaker, for those that are set."""
+        return session_stats(self.hedger, self.breaker)
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def start(self, api_key, model_key, model_inputs) -> str:
+        """Start a model transaction. Starting a transcription is not idempotent, so it is never retried.
+
+        :raises CircuitOpenError: when the breaker is open, without sending the request.
+        """
+        payload = start_payload(api_key, model_key, model_inputs)
+        with metrics.span("banana_start"):
+            if self.breaker is None:
+                status, body = await self._post("start/v4/", payload, self.timeouts.start)
+            else:
+                status, body = await self.breaker.call_async(
+                    lambda: self._post("start/v4/", payload, self.timeouts.start),
+                    lambda response: response[0] >= 500,
+                )
+            return record_outcome("start", lambda: parse_response(status, lambda: _require(body)))[
+                "callID"
+            ]
+
+    async def check(self, api_key, call_id) -> Dict[str, Any]:
+        """Check status of a model transaction, retrying with jittered exponential backoff on transient failures.
+
+        With a hedger, a check that runs unusually long is sent again, and whichever copy answers first is used.
+        """
+        payload = check_payload(api_key, call_id)
+        with metrics.span("banana_check"):
+            if self.hedger is None:
+                return await self._check(payload)
+            return await self.hedger.call_async(lambda: self._check(payload))
+
+    async def _check(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            error: Optional[Exception] = None
+            try:
+                status, body = await self._post("check/v4/", payload, self.timeouts.check)
+                if status not in RETRYABLE_STATUS_CODES:
+                    return record_outcome(
+                        "check", lambda: parse_response(status, lambda: _require(body))
+                    )
+                reason = f"status code {status}"
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error, reason = e, type(e).__name__
+
+            delay = retry_delay(
+                attempt, self.check_retries, self._backoff_base, self._backoff_max, reason
+            )
+            if delay is None:
+                if error is not None:
+                    raise Exception(f"server error: {error!r}")
+                return record_outcome(
+                    "check", lambda: parse_response(status, lambda: _require(body))
+                )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _post(self, route: str, payload: Dict[str, Any], read_timeout: float):
+        timeout = aiohttp.ClientTimeout(connect=self.timeouts.connect, sock_read=read_timeout)
+        headers = {"Content-Type": "application/json"}
+        body: Optional[JsonBody] = None
+        if contains_stream(payload):
+            body = JsonBody(payload)
+            data: Any = _iterate(body)
+            sent = len(body)
+            headers["Content-Length"] = str(sent)
+        else:
+            data = json.dumps(payload).encode("utf-8")
+            sent = len(data)
+
+        try:
+            async with self._slots:
+                async with self._client().post(
+                    self.endpoint + route, timeout=timeout, data=data, headers=headers
+                ) as response:
+                    raw = await response.read()
+        finally:
+            if body is not None:
+                body.close()
+        record_payload(route, sent, len(raw))
+        try:
+            return response.status, codec.loads(raw)
+        except Exception:
+            return response.status, None
+
+    def _client(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_size, keepalive_timeout=self._keep_alive_seconds
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+
+def _require(body: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if body is None:
+        raise ValueError("response body was not valid json")
+    return body
+
+
+async def _iterate(body: JsonBody) -> AsyncIterator[bytes]:
+    for chunk in body:
+        yield chunk
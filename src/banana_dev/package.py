@@ -1,19 +1,44 @@
 """Borrow code from https://github.com/bananaml/banana-python-sdk pending dependency conflict resolution."""
 
 import logging
+import re
 import time
+from typing import Any, Callable, Dict, Optional
 from uuid import uuid4
 
-import requests
+import metrics
 
-ENDPOINT = "https://api.banana.dev/"
+from . import codec
+from .session import BananaSession, default_session
 
+# counts every start and check call, labelled with the call and its outcome ("ok", "running", "success", or "error").
+BACKEND_CALLS = "whisper_backend_calls_total"
 
-def start(api_key, model_key, model_inputs):
+
+def start(api_key, model_key, model_inputs, session: Optional[BananaSession] = None):
     """Start a model transaction."""
-    route_start = "start/v4/"
-    url_start = ENDPOINT + route_start
+    payload = start_payload(api_key, model_key, model_inputs)
+    with metrics.span("banana_start"):
+        response = (session or default_session()).post_start(payload)
+        return record_outcome(
+            "start",
+            lambda: parse_response(response.status_code, lambda: codec.loads(response.content)),
+        )["callID"]
+
+
+def check(api_key, call_id, session: Optional[BananaSession] = None):
+    """Check status of a model transaction."""
+    payload = check_payload(api_key, call_id)
+    with metrics.span("banana_check"):
+        response = (session or default_session()).post_check(payload)
+        return record_outcome(
+            "check",
+            lambda: parse_response(response.status_code, lambda: codec.loads(response.content)),
+        )
 
+
+def start_payload(api_key, model_key, model_inputs) -> Dict[str, Any]:
+    """Build the request body for a `start` call."""
     payload = {
         "id": str(uuid4()),
         "created": int(time.time()),
@@ -24,41 +49,60 @@ def start(api_key, model_key, model_inputs):
     }
 
     logging.info(f'getSegments={payload["modelInputs"]["getSegments"]}')
-    response = requests.post(url_start, json=payload)
+    return payload
+
+
+def check_payload(api_key, call_id) -> Dict[str, Any]:
+    """Build the request body for a `check` call."""
+    return {
+        "id": str(uuid4()),
+        "created": int(time.time()),
+        "longPoll": True,
+        "callID": call_id,
+        "apiKey": api_key,
+    }
 
-    if response.status_code != 200:
-        raise Exception("server error: status code {}".format(response.status_code))
 
+def record_outcome(call: str, parse: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Parse a `start` or `check` response with `parse`, counting the call's outcome in `BACKEND_CALLS`."""
     try:
-        out = response.json()
+        out = parse()
     except Exception:
-        raise Exception("server error: returned invalid json")
+        metrics.get_sink().increment(BACKEND_CALLS, labels={"call": call, "outcome": "error"})
+        raise
+    if call == "start":
+        outcome = "ok"
+    else:
+        outcome = "success" if out["message"].lower() == "success" else "running"
+    metrics.get_sink().increment(BACKEND_CALLS, labels={"call": call, "outcome": outcome})
+    return out
 
-    if "error" in out["message"].lower():
-        raise Exception(out["message"])
 
-    return out["callID"]
+def is_transient(error: Exception) -> bool:
+    """Return whether `error` was raised while reaching the backend, rather than reported by it for a transcription."""
+    return str(error).lower().startswith("server error:")
 
 
-def check(api_key, call_id):
-    """Check status of a model transaction."""
-    route_check = "check/v4/"
-    url_check = ENDPOINT + route_check
+def is_server_failure(error: Exception) -> bool:
+    """Return whether `error` is a connection error, invalid answer or 5xx response, rather than a rejected request."""
+    if not is_transient(error):
+        return False
+    status = re.match(r"server error: status code (\d+)", str(error).lower())
+    return status is None or int(status.group(1)) >= 500
 
-    payload = {
-        "id": str(uuid4()),
-        "created": int(time.time()),
-        "longPoll": True,
-        "callID": call_id,
-        "apiKey": api_key,
-    }
-    response = requests.post(url_check, json=payload)
 
-    if response.status_code != 200:
-        raise Exception("server error: status code {}".format(response.status_code))
+def parse_response(status_code: int, load_json: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Validate a `start` or `check` response and return its JSON body.
+
+    :param status_code: the HTTP status code of the response
+    :param load_json: returns the decoded response body
+    :raises Exception: for non-200 responses, invalid JSON, or a body whose "message" reports an error.
+    """
+    if status_code != 200:
+        raise Exception("server error: status code {}".format(status_code))
 
     try:
-        out = response.json()
+        out = load_json()
     except Exception:
         raise Exception("server error: returned invalid json")
 
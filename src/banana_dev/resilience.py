@@ -0,0 +1,349 @@
+"""Hedging of slow `check` calls and a circuit breaker for `start` calls."""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, List, Optional, TypeVar
+
+import metrics
+
+# counts hedged `check` calls, labelled with whether the duplicate ("hedge") or the original ("primary") answered first.
+HEDGED_CHECKS = "whisper_hedged_checks_total"
+# counts `start` calls rejected without being sent because the circuit was open.
+CIRCUIT_REJECTIONS = "whisper_circuit_rejections_total"
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the backend is considered unavailable."""
+
+
+@dataclass
+class HedgeStats:
+    """Counters describing hedged calls.
+
+    Attributes
+    ----------
+    calls : int
+        calls made through the hedger
+    hedged : int
+        calls that exceeded the hedging delay and were duplicated
+    hedge_wins : int
+        hedged calls answered first by the duplicate
+    delay : Optional[float]
+        the current hedging delay, in seconds, or None until enough calls have been observed
+    """
+
+    calls: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    delay: Optional[float] = None
+
+
+class Hedger:
+    """Duplicates calls that take longer than a latency percentile learned from recent calls.
+
+    Attributes
+    ----------
+    quantile : float
+        a call slower than this fraction of recent calls is duplicated
+    min_delay : float
+        lower bound on the hedging delay, in seconds
+    min_samples : int
+        no call is hedged until this many calls have been observed
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        min_delay: float = 1.0,
+        window: int = 200,
+        min_samples: int = 20,
+        max_workers: int = 16,
+    ):
+        """Initialize a hedger with no latency history.
+
+        :param quantile: a call slower than this fraction of recent calls is duplicated
+        :param min_delay: lower bound on the hedging delay, in seconds
+        :param window: number of recent call latencies the percentile is computed over
+        :param min_samples: number of calls observed before any call is hedged
+        :param max_workers: maximum number of calls (including duplicates) in flight at once. calls beyond it wait for
+        a free worker, and the wait counts toward their hedging delay, so size it for twice the number of concurrent
+        callers: each may have an original and a duplicate in flight.
+        """
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.stats = HedgeStats()
+        self._window = window
+        self._max_workers = max_workers
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def fresh(self) -> "Hedger":
+        """Return a hedger with the same settings, its own workers and no latency history."""
+        return Hedger(
+            self.quantile, self.min_delay, self._window, self.min_samples, self._max_workers
+        )
+
+    def delay(self) -> Optional[float]:
+        """Return how long a call may run before it is duplicated, or None while there is too little history."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.quantile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Call `fn`, and call it again if it runs past the hedging delay; return whichever answers first.
+
+        :raises Exception: whatever `fn` raises, once every attempt has failed.
+        """
+        delay = self._begin()
+        if delay is None:
+            return self._timed(fn)
+
+        primary = self._executor.submit(metrics.wrap(self._timed), fn)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        self._hedging(delay)
+        hedge = self._executor.submit(metrics.wrap(self._timed), fn)
+        winner = self._first_success([primary, hedge])
+        self._answered(winner is hedge)
+        return winner.result()
+
+    async def call_async(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await `fn()`, and again if it runs past the hedging delay; return whichever answers first.
+
+        The coroutine counterpart of `call`, sharing its latency history and counters. Both attempts run on the event
+        loop, and the one still running when the other answers is cancelled.
+
+        :raises Exception: whatever `fn()` raises, once every attempt has failed.
+        """
+        delay = self._begin()
+        if delay is None:
+            return await self._timed_async(fn)
+
+        tasks = [asyncio.ensure_future(self._timed_async(fn))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return tasks[0].result()
+
+            self._hedging(delay)
+            tasks.append(asyncio.ensure_future(self._timed_async(fn)))
+            winner = await self._first_success_async(tasks)
+            self._answered(winner is tasks[1])
+            return winner.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def close(self) -> None:
+        """Stop the worker threads, without waiting for calls still in flight."""
+        self._executor.shutdown(wait=False)
+
+    def _begin(self) -> Optional[float]:
+        # counts a call, and returns its hedging delay.
+        delay = self.delay()
+        with self._lock:
+            self.stats.calls += 1
+            self.stats.delay = delay
+        return delay
+
+    def _hedging(self, delay: float) -> None:
+        logging.warning(f"call still running after {delay:.2f}s, sending a hedged duplicate")
+        with self._lock:
+            self.stats.hedged += 1
+
+    def _answered(self, by_hedge: bool) -> None:
+        if by_hedge:
+            with self._lock:
+                self.stats.hedge_wins += 1
+        metrics.get_sink().increment(
+            HEDGED_CHECKS, labels={"winner": "hedge" if by_hedge else "primary"}
+        )
+
+    def _timed(self, fn: Callable[[], T]) -> T:
+        started = time.perf_counter()
+        result = fn()
+        self._observe(time.perf_counter() - started)
+        return result
+
+    async def _timed_async(self, fn: Callable[[], Awaitable[T]]) -> T:
+        started = time.perf_counter()
+        result = await fn()
+        self._observe(time.perf_counter() - started)
+        return result
+
+    def _observe(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    @staticmethod
+    def _first_success(futures: List[Future]) -> Future:
+        # the first future to succeed, or the first to fail when none succeeds.
+        pending, failed = set(futures), []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future
+                failed.append(future)
+        return failed[0]
+
+    @staticmethod
+    async def _first_success_async(tasks: List["asyncio.Future"]) -> "asyncio.Future":
+        # the first task to succeed, or the first to fail when none succeeds.
+        pending, failed = set(tasks), []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task
+                failed.append(task)
+        return failed[0]
+
+
+@dataclass
+class CircuitStats:
+    """Counters describing a circuit breaker.
+
+    Attributes
+    ----------
+    state : str
+        "closed" (calls flow), "open" (calls are rejected) or "half_open" (one trial call is allowed)
+    consecutive_failures : int
+        failures since the last success
+    opened : int
+        times the circuit has opened
+    rejected : int
+        calls rejected while the circuit was open
+    """
+
+    state: str = "closed"
+    consecutive_failures: int = 0
+    opened: int = 0
+    rejected: int = 0
+
+
+class CircuitBreaker:
+    """Fails calls fast after repeated backend failures, until a trial call succeeds.
+
+    After `failure_threshold` consecutive failures the circuit opens and every call is rejected with
+    `CircuitOpenError`. Once `reset_seconds` have passed, a single trial call is let through: its success closes the
+    circuit, and its failure opens it again.
+
+    Attributes
+    ----------
+    failure_threshold : int
+        consecutive failures that open the circuit
+    reset_seconds : float
+        how long the circuit stays open before a trial call is allowed
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize a closed circuit.
+
+        :param failure_threshold: consecutive failures that open the circuit
+        :param reset_seconds: how long the circuit stays open before a trial call is allowed
+        :param clock: returns the current time, in seconds
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.stats = CircuitStats()
+        self._clock = clock
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def fresh(self) -> "CircuitBreaker":
+        """Return a closed circuit with the same settings."""
+        return CircuitBreaker(self.failure_threshold, self.reset_seconds, self._clock)
+
+    def call(self, fn: Callable[[], T], is_failure: Callable[[T], bool]) -> T:
+        """Call `fn` unless the circuit is open.
+
+        :param fn: the guarded call
+        :param is_failure: whether a returned value indicates a backend failure. exceptions always do.
+        :raises CircuitOpenError: when the circuit is open.
+        """
+        self._allow()
+        try:
+            result = fn()
+        except Exception:
+            self._record(False)
+            raise
+        self._record(not is_failure(result))
+        return result
+
+    async def call_async(
+        self, fn: Callable[[], Awaitable[T]], is_failure: Callable[[T], bool]
+    ) -> T:
+        """Await `fn()` unless the circuit is open. The coroutine counterpart of `call`, sharing its state.
+
+        :raises CircuitOpenError: when the circuit is open.
+        """
+        self._allow()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # a cancelled call says nothing about the backend, but must not hold the trial slot.
+            with self._lock:
+                self._trial_running = False
+            raise
+        except Exception:
+            self._record(False)
+            raise
+        self._record(not is_failure(result))
+        return result
+
+    def _allow(self) -> None:
+        with self._lock:
+            if self.stats.state == "closed":
+                return
+            remaining = self._opened_at + self.reset_seconds - self._clock()
+            if remaining <= 0 and not self._trial_running:
+                self.stats.state = "half_open"
+                self._trial_running = True
+                return
+            self.stats.rejected += 1
+        metrics.get_sink().increment(CIRCUIT_REJECTIONS)
+        raise CircuitOpenError(
+            f"server error: backend unavailable after {self.stats.consecutive_failures} consecutive failures, "
+            f"retry in {max(remaining, 0):.0f}s"
+        )
+
+    def _record(self, success: bool) -> None:
+        with self._lock:
+            self._trial_running = False
+            if success:
+                self.stats.state = "closed"
+                self.stats.consecutive_failures = 0
+                return
+            self.stats.consecutive_failures += 1
+            if (
+                self.stats.state == "half_open"
+                or self.stats.consecutive_failures >= self.failure_threshold
+            ):
+                if self.stats.state != "open":
+                    logging.error(
+                        f"backend circuit opened after {self.stats.consecutive_failures} consecutive failures"
+                    )
+                    self.stats.opened += 1
+                self.stats.state = "open"
+                self._opened_at = self._clock()
@@ -0,0 +1,248 @@
+"""Pooled, keep-alive HTTP transport shared by calls to the banana.dev API."""
+
+import logging
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+from .resilience import CircuitBreaker, Hedger
+from .streaming import JsonBody, contains_stream
+
+ENDPOINT = "https://api.banana.dev/"
+
+# status codes for which a retried `check` may succeed.
+RETRYABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+# counts request and response body bytes, labelled with the call ("start" or "check") and direction.
+PAYLOAD_BYTES = "whisper_payload_bytes_total"
+
+
+@dataclass
+class Timeouts:
+    """Per-phase request timeouts, in seconds.
+
+    Attributes
+    ----------
+    connect : float
+        time allowed to establish a connection (including TLS)
+    start : float
+        time allowed to read the response to a `start` call, which includes uploading the audio
+    check : float
+        time allowed to read the response to a long-poll `check` call
+    """
+
+    connect: float = 10.0
+    start: float = 300.0
+    check: float = 90.0
+
+
+class BananaSession:
+    """A connection pool for the banana.dev API.
+
+    A single session keeps connections alive between `start` and subsequent `check` calls, so that
+    polling does not pay for a new TCP and TLS handshake on every request.
+
+    Attributes
+    ----------
+    endpoint : str
+        base URL of the banana.dev API
+    timeouts : Timeouts
+        per-phase request timeouts
+    check_retries : int
+        number of times an idempotent `check` is retried after a connection error or retryable status
+    hedger : Optional[Hedger]
+        duplicates `check` calls that run unusually long, if set
+    breaker : Optional[CircuitBreaker]
+        rejects `start` calls during a backend outage, if set
+    """
+
+    def __init__(
+        self,
+        endpoint: str = ENDPOINT,
+        pool_size: int = 10,
+        keep_alive: bool = True,
+        timeouts: Optional[Timeouts] = None,
+        check_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        sleep: Callable[[float], None] = time.sleep,
+        hedger: Optional[Hedger] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        """Initialize a session and its connection pool.
+
+        :param endpoint: base URL of the banana.dev API
+        :param pool_size: maximum number of connections kept open to the endpoint
+        :param keep_alive: whether connections are reused between requests
+        :param timeouts: per-phase request timeouts
+        :param check_retries: number of retries for idempotent `check` calls
+        :param backoff_base: initial retry delay, in seconds, doubled after every attempt
+        :param backoff_max: upper bound on the retry delay, in seconds
+        :param sleep: function used to wait between retries
+        :param hedger: duplicates `check` calls that run past a latency percentile learned from recent checks
+        :param breaker: fails `start` calls fast after repeated connection errors or 5xx responses
+        """
+        self.endpoint = endpoint if endpoint.endswith("/") else f"{endpoint}/"
+        self.timeouts = timeouts or Timeouts()
+        self.check_retries = check_retries
+        self._pool_size = pool_size
+        self._keep_alive = keep_alive
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._sleep = sleep
+        self.hedger = hedger
+        self.breaker = breaker
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        if not keep_alive:
+            self._session.headers["Connection"] = "close"
+
+    def for_endpoint(self, endpoint: str) -> "BananaSession":
+        """Return a session to `endpoint` with the same timeouts, connection pool, retries and backoff.
+
+        The new session has its own hedger and circuit breaker, configured like those of this session, so that the
+        latency and failures of one endpoint do not affect calls to another.
+        """
+        return BananaSession(
+            endpoint=endpoint,
+            pool_size=self._pool_size,
+            keep_alive=self._keep_alive,
+            timeouts=self.timeouts,
+            check_retries=self.check_retries,
+            backoff_base=self._backoff_base,
+            backoff_max=self._backoff_max,
+            sleep=self._sleep,
+            hedger=self.hedger.fresh() if self.hedger is not None else None,
+            breaker=self.breaker.fresh() if self.breaker is not None else None,
+        )
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        if self.hedger is not None:
+            self.hedger.close()
+        self._session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the statistics of the hedger and circuit breaker, for those that are set."""
+        return session_stats(self.hedger, self.breaker)
+
+    def post_start(self, payload: Dict[str, Any]) -> requests.Response:
+        """Send a `start` request. Starting a transcription is not idempotent, so it is never retried.
+
+        :raises CircuitOpenError: when the breaker is open, without sending the request.
+        """
+        if self.breaker is None:
+            return self._post("start/v4/", payload, self.timeouts.start)
+        return self.breaker.call(
+            lambda: self._post("start/v4/", payload, self.timeouts.start),
+            lambda response: response.status_code >= 500,
+        )
+
+    def post_check(self, payload: Dict[str, Any]) -> requests.Response:
+        """Send a `check` request, retrying with jittered exponential backoff on transient failures.
+
+        With a hedger, a check that runs unusually long is sent again, and whichever copy answers first is used.
+        """
+        if self.hedger is None:
+            return self._post_check(payload)
+        return self.hedger.call(lambda: self._post_check(payload))
+
+    def _post_check(self, payload: Dict[str, Any]) -> requests.Response:
+        attempt = 0
+        while True:
+            error: Optional[Exception] = None
+            try:
+                response = self._post("check/v4/", payload, self.timeouts.check)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                reason = f"status code {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, reason = e, type(e).__name__
+
+            delay = retry_delay(
+                attempt, self.check_retries, self._backoff_base, self._backoff_max, reason
+            )
+            if delay is None:
+                if error is not None:
+                    raise Exception(f"server error: {error}")
+                return response
+            self._sleep(delay)
+            attempt += 1
+
+    def backoff(self, attempt: int) -> float:
+        """Return a "full jitter" delay for the given retry attempt."""
+        return jittered_backoff(attempt, self._backoff_base, self._backoff_max)
+
+    def _post(self, route: str, payload: Dict[str, Any], read_timeout: float) -> requests.Response:
+        timeout = (self.timeouts.connect, read_timeout)
+        if contains_stream(payload):
+            with JsonBody(payload) as body:
+                response = self._session.post(
+                    self.endpoint + route,
+                    data=body,
+                    headers={"Content-Type": "application/json"},
+                    timeout=timeout,
+                )
+        else:
+            response = self._session.post(self.endpoint + route, json=payload, timeout=timeout)
+        record_payload(
+            route, int(response.request.headers.get("Content-Length") or 0), len(response.content)
+        )
+        return response
+
+
+def record_payload(route: str, sent: int, received: int) -> None:
+    """Count the request and response body bytes of one call to `route` in `PAYLOAD_BYTES`."""
+    call = route.split("/")[0]
+    sink = metrics.get_sink()
+    sink.increment(PAYLOAD_BYTES, sent, {"call": call, "direction": "sent"})
+    sink.increment(PAYLOAD_BYTES, received, {"call": call, "direction": "received"})
+
+
+def session_stats(hedger: Optional[Hedger], breaker: Optional[CircuitBreaker]) -> Dict[str, Any]:
+    """Return the statistics of a session's hedger and circuit breaker, for those that are set."""
+    stats = {}
+    if hedger is not None:
+        stats["hedging"] = asdict(hedger.stats)
+    if breaker is not None:
+        stats["circuit"] = asdict(breaker.stats)
+    return stats
+
+
+def retry_delay(
+    attempt: int, retries: int, base: float, cap: float, reason: str
+) -> Optional[float]:
+    """Return how long to wait before retrying a `check` that failed for `reason`, or None once `retries` are spent.
+
+    Both the blocking and the asyncio sessions retry checks through this one policy.
+    """
+    if attempt >= retries:
+        return None
+    delay = jittered_backoff(attempt, base, cap)
+    logging.warning(f"retrying check in {delay:.2f}s attempt={attempt + 1} reason={reason}")
+    return delay
+
+
+def jittered_backoff(attempt: int, base: float, cap: float) -> float:
+    """Return a random delay between zero and the capped exponential backoff for `attempt` ("full jitter")."""
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+_default_session: Optional[BananaSession] = None
+
+
+def default_session() -> BananaSession:
+    """Return a process-wide session, for callers that do not manage their own."""
+    global _default_session
+    if _default_session is None:
+        _default_session = BananaSession()
+    return _default_session
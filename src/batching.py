@@ -0,0 +1,89 @@
+"""Pack many small audio files into a few backend requests."""
+
+import io
+import zipfile
+from dataclasses import dataclass
+from typing import List, Tuple
+
+ZIP_MIME_TYPE = "application/zip"
+# limits on what an archive may expand to, so that a small, highly compressed archive cannot exhaust worker memory.
+# audio compresses poorly, so a much higher ratio than `MAX_COMPRESSION_RATIO` is only expected of a crafted archive;
+# it is not checked for files under `RATIO_CHECK_BYTES`, such as short clips of silence.
+MAX_ARCHIVE_BYTES = 512 * 1024 * 1024
+MAX_COMPRESSION_RATIO = 100
+RATIO_CHECK_BYTES = 1024 * 1024
+
+
+@dataclass
+class BatchItem:
+    """One audio file to be transcribed as part of a batch.
+
+    Attributes
+    ----------
+    name : str
+        the file's name within its archive
+    data : bytes
+        the audio file bytes (unencoded)
+    seconds : float
+        the (possibly estimated) duration of the audio
+    """
+
+    name: str
+    data: bytes
+    seconds: float
+
+
+def pack(
+    items: List[BatchItem], max_bytes: int, max_seconds: float, max_items: int
+) -> List[List[int]]:
+    """Group items, in order, into batches that each fit within the byte, duration, and item-count budgets.
+
+    An item that exceeds a budget on its own is placed in a batch by itself.
+
+    :return: the indexes of the items in each batch
+    """
+    batches: List[List[int]] = []
+    size = seconds = 0.0
+    for i, item in enumerate(items):
+        current = batches[-1] if batches else None
+        if (
+            current is None
+            or len(current) >= max_items
+            or size + len(item.data) > max_bytes
+            or seconds + item.seconds > max_seconds
+        ):
+            current = []
+            batches.append(current)
+            size = seconds = 0.0
+        current.append(i)
+        size += len(item.data)
+        seconds += item.seconds
+    return batches
+
+
+def read_archive(data: bytes, max_bytes: int = MAX_ARCHIVE_BYTES) -> List[Tuple[str, bytes]]:
+    """Return the (name, bytes) of every file in a ZIP archive, in archive order.
+
+    :param data: the archive
+    :param max_bytes: the most the files may add up to once decompressed
+    :raises zipfile.BadZipFile: when `data` is not a ZIP archive.
+    :raises ValueError: when the files add up to more than `max_bytes`, or one is compressed implausibly well. both are
+    checked before anything is decompressed.
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        infos = [
+            info
+            for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+        ]
+        if sum(info.file_size for info in infos) > max_bytes:
+            raise ValueError(f"the files add up to more than {max_bytes} bytes")
+        for info in infos:
+            if info.file_size > RATIO_CHECK_BYTES and info.file_size > MAX_COMPRESSION_RATIO * max(
+                info.compress_size, 1
+            ):
+                raise ValueError(
+                    f"{info.filename} is compressed more than {MAX_COMPRESSION_RATIO}:1"
+                )
+        # decompression stops at the recorded size, so the checks above bound what is read.
+        return [(info.filename, archive.read(info)) for info in infos]
@@ -0,0 +1,44 @@
+"""Blob stores that hold large audio for the backend to fetch by URL, instead of receiving it inline."""
+
+import functools
+from typing import Dict, Optional
+from urllib.parse import unquote, urlparse
+
+from .base import BlobStats, BlobStore, blob_name, blob_size
+from .http import HttpBlobStore
+from .local import LocalBlobStore
+
+__all__ = [
+    "BlobStats",
+    "BlobStore",
+    "HttpBlobStore",
+    "LocalBlobStore",
+    "blob_name",
+    "blob_size",
+    "from_url",
+    "get_shared_store",
+]
+
+
+def from_url(url: str, headers: Optional[Dict[str, str]] = None) -> BlobStore:
+    """Build a blob store from its location.
+
+    :param url: a `file://` URL of a local directory, or the `http(s)://` URL of a server that accepts `PUT` uploads
+    :param headers: sent with every request to an `http(s)://` store, e.g. an `Authorization` header
+    :raises ValueError: when the URL scheme is not supported.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return LocalBlobStore(unquote(parsed.path))
+    if parsed.scheme in ("http", "https"):
+        return HttpBlobStore(url, headers=headers)
+    raise ValueError(f"unsupported blob store URL: {url}")
+
+
+@functools.lru_cache(maxsize=None)
+def get_shared_store(url: str, authorization: str = "") -> BlobStore:
+    """Return the process-wide blob store for `url`, so that its connections and counters outlive a blockifier.
+
+    :param authorization: when set, sent as the `Authorization` header of every request to an `http(s)://` store
+    """
+    return from_url(url, {"Authorization": authorization} if authorization else None)
@@ -0,0 +1,122 @@
+"""Interface and shared helpers for blob stores that hold audio the backend fetches by reference."""
+
+import hashlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Union
+
+# size of the reads used to hash (and copy) audio given as a file.
+READ_SIZE = 1024 * 1024
+
+Blob = Union[bytes, bytearray, memoryview, BinaryIO]
+
+
+def blob_size(data: Blob) -> int:
+    """Return the size of `data` in bytes, leaving a file positioned at its start."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return len(data)
+    size = data.seek(0, 2)
+    data.seek(0)
+    return size
+
+
+def blob_name(data: Blob) -> str:
+    """Name a blob by the SHA-256 of its content, so that identical audio is stored (and uploaded) once.
+
+    :param data: the blob bytes, or a binary file containing them. a file is read once and left at its start.
+    :return: a name that is safe to use as a file name or URL path segment
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    data.seek(0)
+    for chunk in iter(lambda: data.read(READ_SIZE), b""):
+        digest.update(chunk)
+    data.seek(0)
+    return digest.hexdigest()
+
+
+@dataclass
+class BlobStats:
+    """Counters describing how a blob store has been used."""
+
+    puts: int = 0
+    uploads: int = 0
+    bytes_uploaded: int = 0
+    reused: int = 0
+    deleted: int = 0
+
+
+class BlobStore(ABC):
+    """A store of audio blobs that the backend can fetch from a URL.
+
+    Blobs are kept until they are deleted, either one by one with `delete` or by age with `expire`.
+    """
+
+    def __init__(self):
+        """Initialize the usage counters."""
+        self.stats = BlobStats()
+        # when each blob was last stored or reused through this store, by name.
+        self._stored_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def put(self, data: Blob) -> str:
+        """Store `data`, unless a blob with the same content is already stored, and return its URL.
+
+        :param data: the blob bytes, or a binary file containing them
+        :raises Exception: when the blob could not be stored.
+        """
+        name = blob_name(data)
+        self.stats.puts += 1
+        if self._exists(name):
+            self.stats.reused += 1
+        else:
+            self._put(name, data)
+            self.stats.uploads += 1
+            self.stats.bytes_uploaded += blob_size(data)
+        with self._lock:
+            self._stored_at[name] = time.time()
+        return self.url(name)
+
+    def delete(self, name: str) -> None:
+        """Delete the blob `name`, if it is stored.
+
+        :raises Exception: when the blob could not be deleted.
+        """
+        self._delete(name)
+        with self._lock:
+            self._stored_at.pop(name, None)
+        self.stats.deleted += 1
+
+    def expire(self, max_age_seconds: float) -> int:
+        """Delete the blobs stored or reused through this store more than `max_age_seconds` ago.
+
+        Stores that can list their blobs override this to also delete those left by other processes.
+
+        :return: the number of blobs deleted
+        """
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            names = [name for name, stored_at in self._stored_at.items() if stored_at <= cutoff]
+        for name in names:
+            self.delete(name)
+        return len(names)
+
+    @abstractmethod
+    def url(self, name: str) -> str:
+        """Return the URL the backend fetches the blob `name` from."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _exists(self, name: str) -> bool:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _put(self, name: str, data: Blob) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _delete(self, name: str) -> None:
+        raise NotImplementedError()
@@ -0,0 +1,70 @@
+"""A blob store that uploads blobs to an HTTP server with `PUT`."""
+
+from typing import Dict, Optional
+
+import requests
+
+from .base import Blob, BlobStore
+
+
+class HttpBlobStore(BlobStore):
+    """A store that uploads each blob to `<base_url>/<name>` with a `PUT`, and checks for it with a `HEAD`.
+
+    This fits object stores and WebDAV servers that accept uploads at the URL they serve blobs from, and delete blobs
+    with a `DELETE` to the same URL.
+
+    Attributes
+    ----------
+    base_url : str
+        the URL blobs are uploaded to and fetched from
+    timeout : float
+        seconds allowed for each upload or existence check
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        session: Optional[requests.Session] = None,
+        timeout: float = 300.0,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        """Initialize a store that uploads to `base_url`.
+
+        :param base_url: the URL blobs are uploaded to and fetched from
+        :param session: the HTTP session used for uploads. a new session is created if none is supplied.
+        :param timeout: seconds allowed for each upload or existence check
+        :param headers: sent with every request to the store, e.g. an `Authorization` header. the backend is only sent
+        the blob URL, so reads must be allowed without them (or the URL must carry its own credentials).
+        """
+        super().__init__()
+        self.base_url = base_url.rstrip("/") + "/"
+        self.timeout = timeout
+        self._session = session or requests.Session()
+        self._session.headers.update(headers or {})
+
+    def url(self, name: str) -> str:
+        """Return the URL the backend fetches the blob `name` from."""
+        return self.base_url + name
+
+    def _exists(self, name: str) -> bool:
+        response = self._session.head(self.url(name), timeout=self.timeout)
+        return response.status_code == 200
+
+    def _put(self, name: str, data: Blob) -> None:
+        # a file object is streamed from disk rather than read into memory.
+        response = self._session.put(
+            self.url(name),
+            data=bytes(data) if isinstance(data, memoryview) else data,
+            headers={"Content-Type": "application/octet-stream"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+    def _delete(self, name: str) -> None:
+        response = self._session.delete(self.url(name), timeout=self.timeout)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    def close(self) -> None:
+        """Release the pooled connections used for uploads."""
+        self._session.close()
@@ -0,0 +1,94 @@
+"""A blob store in a local directory, optionally served to the backend from a base URL."""
+
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from .base import Blob, BlobStore
+
+
+class LocalBlobStore(BlobStore):
+    """A store that keeps one file per blob in a local directory.
+
+    Without a `base_url`, blobs are addressed by `file://` URLs, which only a backend on the same machine can read; this
+    is meant for tests and local development. With one, the directory is expected to be served at that URL (e.g. by
+    `python -m http.server` or a reverse proxy). A blob's modification time is refreshed whenever it is reused, so
+    `expire` only deletes blobs that no process has stored recently.
+
+    Attributes
+    ----------
+    directory : pathlib.Path
+        where blobs are written
+    base_url : Optional[str]
+        the URL the directory is served at
+    """
+
+    def __init__(self, directory: str, base_url: Optional[str] = None):
+        """Initialize a store rooted at `directory`, creating it if needed.
+
+        :param directory: where blobs are written
+        :param base_url: the URL the directory is served at. blobs are addressed by `file://` URLs when omitted.
+        """
+        super().__init__()
+        self.directory = Path(directory).absolute()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.base_url = base_url.rstrip("/") + "/" if base_url else None
+
+    def url(self, name: str) -> str:
+        """Return the URL the backend fetches the blob `name` from."""
+        if self.base_url is None:
+            return (self.directory / name).as_uri()
+        return self.base_url + name
+
+    def expire(self, max_age_seconds: float) -> int:
+        """Delete the blobs in the directory, from any process, that were last stored more than `max_age_seconds` ago.
+
+        Temporary files left by interrupted writes are removed too.
+
+        :return: the number of blobs deleted
+        """
+        cutoff = time.time() - max_age_seconds
+        expired = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_file() or entry.stat().st_mtime > cutoff:
+                    continue
+                if entry.name.endswith(".tmp"):
+                    os.unlink(entry.path)
+                else:
+                    self.delete(entry.name)
+                    expired += 1
+            except FileNotFoundError:
+                # deleted by another process meanwhile.
+                continue
+        return expired
+
+    def _exists(self, name: str) -> bool:
+        try:
+            os.utime(self.directory / name)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _put(self, name: str, data: Blob) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    f.write(data)
+                else:
+                    shutil.copyfileobj(data, f)
+                    data.seek(0)
+            os.replace(tmp_path, self.directory / name)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _delete(self, name: str) -> None:
+        try:
+            os.unlink(self.directory / name)
+        except FileNotFoundError:
+            pass
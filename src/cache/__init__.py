@@ -0,0 +1,17 @@
+"""Content-addressed caching of completed transcription results."""
+
+from .base import CacheStats, ResultCache, content_key, transcription_key
+from .disk import DiskCache
+from .memory import MemoryCache
+from .tiered import TieredCache, get_shared_cache
+
+__all__ = [
+    "CacheStats",
+    "DiskCache",
+    "MemoryCache",
+    "ResultCache",
+    "TieredCache",
+    "content_key",
+    "get_shared_cache",
+    "transcription_key",
+]
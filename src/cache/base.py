@@ -0,0 +1,74 @@
+"""Interface and shared helpers for transcription result caches."""
+
+import hashlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from steamship.plugin.outputs.block_and_tag_plugin_output import BlockAndTagPluginOutput
+
+
+def content_key(raw_audio: Union[bytes, str], whisper_model: str, mode: str) -> str:
+    """Build a cache key from the audio content and the options that affect the transcription.
+
+    :param raw_audio: the audio file bytes (unencoded)
+    :param whisper_model: name of the whisper model used for transcription
+    :param mode: the shape of the transcript: "text", "segments" or "words" (segments with word timing), followed by
+    any options that change how the transcript is split into blocks
+    :return: a key that is safe to use as a file name
+    """
+    if isinstance(raw_audio, str):
+        raw_audio = raw_audio.encode("utf-8")
+    digest = hashlib.sha256(raw_audio).hexdigest()
+    return f"{digest}-{whisper_model.lower()}-{mode}"
+
+
+def transcription_key(transcription_id: str, mode: str) -> str:
+    """Build a cache key for the finished result of a backend transcription.
+
+    :param transcription_id: the id returned when the transcription was started
+    :param mode: the shape of the result, as for `content_key`
+    :return: a key that is safe to use as a file name
+    """
+    digest = hashlib.sha256(transcription_id.encode("utf-8")).hexdigest()
+    return f"id-{digest}-{mode}"
+
+
+@dataclass
+class CacheStats:
+    """Counters describing how a cache has been used."""
+
+    hits: int = 0
+    misses: int = 0
+    puts: int = 0
+    evictions: int = 0
+
+
+class ResultCache(ABC):
+    """A store of finished transcription results, addressed by `content_key`."""
+
+    def __init__(self):
+        """Initialize the hit/miss counters."""
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[BlockAndTagPluginOutput]:
+        """Return the cached result for `key`, or None. Updates hit/miss counters."""
+        result = self._get(key)
+        if result is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return result
+
+    def put(self, key: str, output: BlockAndTagPluginOutput) -> None:
+        """Store `output` under `key`, evicting older entries as needed."""
+        self.stats.puts += 1
+        self._put(key, output)
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[BlockAndTagPluginOutput]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _put(self, key: str, output: BlockAndTagPluginOutput) -> None:
+        raise NotImplementedError()
@@ -0,0 +1,125 @@
+"""Local disk cache tier with size- and age-based eviction."""
+
+import logging
+import os
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Optional
+
+from steamship.plugin.outputs.block_and_tag_plugin_output import BlockAndTagPluginOutput
+
+from .base import ResultCache
+
+
+class DiskCache(ResultCache):
+    """A cache that keeps one JSON file per result in a local directory.
+
+    File modification times double as last-access times: reads touch the file, and eviction removes
+    expired entries first, then the least-recently-used ones until the directory fits in `max_bytes`.
+
+    Attributes
+    ----------
+    directory : pathlib.Path
+        where cached results are written
+    max_bytes : int
+        upper bound on the total size of cached results
+    ttl_seconds : float
+        how long a result remains valid after it was last written or read
+    compress : bool
+        whether results are stored zlib-compressed, which shrinks the JSON of segment tags several-fold
+    """
+
+    SUFFIX = ".json"
+    COMPRESSED_SUFFIX = ".json.z"
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float = 7 * 24 * 60 * 60,
+        clock: Callable[[], float] = time.time,
+        compress: bool = False,
+    ):
+        """Initialize a cache rooted at `directory`, creating it if needed.
+
+        :param directory: where cached results are written
+        :param max_bytes: upper bound on the total size of cached results
+        :param ttl_seconds: how long a result remains valid after it was last written or read
+        :param clock: source of the current time, in seconds since the epoch
+        :param compress: store results zlib-compressed
+        """
+        super().__init__()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.compress = compress
+        self._suffix = self.COMPRESSED_SUFFIX if compress else self.SUFFIX
+        self._clock = clock
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self._suffix}"
+
+    def _get(self, key: str) -> Optional[BlockAndTagPluginOutput]:
+        path = self._path(key)
+        try:
+            if self._clock() - path.stat().st_mtime > self.ttl_seconds:
+                self._remove(path)
+                return None
+            data = path.read_bytes()
+            output = BlockAndTagPluginOutput.parse_raw(
+                zlib.decompress(data) if self.compress else data
+            )
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"discarding unreadable cache entry key={key} error={e}")
+            self._remove(path)
+            return None
+
+        now = self._clock()
+        os.utime(path, (now, now))
+        return output
+
+    def _put(self, key: str, output: BlockAndTagPluginOutput) -> None:
+        data = output.json(by_alias=True, exclude_none=True).encode("utf-8")
+        if self.compress:
+            data = zlib.compress(data)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        now = self._clock()
+        os.utime(tmp_path, (now, now))
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self) -> None:
+        now = self._clock()
+        entries = []
+        total = 0
+        for path in self.directory.glob(f"*{self._suffix}"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - st.st_mtime > self.ttl_seconds:
+                self._remove(path)
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path: Path) -> None:
+        try:
+            path.unlink()
+            self.stats.evictions += 1
+        except FileNotFoundError:
+            pass
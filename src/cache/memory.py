@@ -0,0 +1,51 @@
+"""In-process LRU cache tier."""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from steamship.plugin.outputs.block_and_tag_plugin_output import BlockAndTagPluginOutput
+
+from .base import ResultCache
+
+
+class MemoryCache(ResultCache):
+    """A bounded, least-recently-used cache held in process memory.
+
+    Attributes
+    ----------
+    max_entries : int
+        the number of results to hold before the least-recently-used entry is evicted
+    """
+
+    def __init__(self, max_entries: int = 32):
+        """Initialize an empty cache.
+
+        :param max_entries: the number of results to hold before evicting
+        :raises ValueError: when `max_entries` is not positive.
+        """
+        super().__init__()
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be positive: {max_entries}")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, BlockAndTagPluginOutput]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of cached entries."""
+        return len(self._entries)
+
+    def _get(self, key: str) -> Optional[BlockAndTagPluginOutput]:
+        with self._lock:
+            output = self._entries.get(key)
+            if output is not None:
+                self._entries.move_to_end(key)
+            return output
+
+    def _put(self, key: str, output: BlockAndTagPluginOutput) -> None:
+        with self._lock:
+            self._entries[key] = output
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
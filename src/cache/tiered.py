@@ -0,0 +1,54 @@
+"""Two-tier cache combining the in-memory LRU and the local disk cache."""
+
+import functools
+from typing import Optional
+
+from steamship.plugin.outputs.block_and_tag_plugin_output import BlockAndTagPluginOutput
+
+from .base import ResultCache
+from .disk import DiskCache
+from .memory import MemoryCache
+
+
+class TieredCache(ResultCache):
+    """Read through the memory tier to the disk tier, promoting disk hits into memory.
+
+    Attributes
+    ----------
+    memory : MemoryCache
+        the fast, process-local tier
+    disk : DiskCache
+        the larger tier, shared by every process on the host
+    """
+
+    def __init__(self, memory: MemoryCache, disk: DiskCache):
+        """Initialize a cache from its two tiers."""
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    def _get(self, key: str) -> Optional[BlockAndTagPluginOutput]:
+        output = self.memory.get(key)
+        if output is None:
+            output = self.disk.get(key)
+            if output is not None:
+                self.memory.put(key, output)
+        return output
+
+    def _put(self, key: str, output: BlockAndTagPluginOutput) -> None:
+        self.memory.put(key, output)
+        self.disk.put(key, output)
+
+
+@functools.lru_cache(maxsize=None)
+def get_shared_cache(
+    directory: str, max_bytes: int, ttl_seconds: float, memory_entries: int, compress: bool = False
+) -> TieredCache:
+    """Return the process-wide cache for the given settings.
+
+    Handlers are constructed per request, so the memory tier must outlive any single blockifier.
+    """
+    return TieredCache(
+        MemoryCache(max_entries=memory_entries),
+        DiskCache(directory, max_bytes=max_bytes, ttl_seconds=ttl_seconds, compress=compress),
+    )
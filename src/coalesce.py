@@ -0,0 +1,172 @@
+"""Single-flight coalescing of identical transcription submissions, shared by worker processes on one node."""
+
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import metrics
+from banana_dev import Timeouts
+
+# counts submissions that joined a transcription already started by another caller.
+COALESCED = "whisper_coalesced_submissions_total"
+
+# a pending claim outlives the longest an owner's `start` call can take with the default session timeouts.
+DEFAULT_CLAIM_SECONDS = Timeouts.connect + Timeouts.start
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inflight (
+    key TEXT PRIMARY KEY,
+    transcription_id TEXT,
+    expires_at REAL NOT NULL
+)
+"""
+
+
+class SubmissionPendingError(Exception):
+    """Raised to a caller that gave up waiting for an identical submission that is still being started."""
+
+
+class InflightRegistry:
+    """Maps submission keys to the backend transcription started for them, in a SQLite database on local disk.
+
+    The first caller for a key claims it and starts the transcription; callers that arrive while the claim is pending
+    wait for its transcription id, and callers that arrive later reuse it, until the entry expires. A claim lasts
+    as long as its owner's start may take; one whose owner neither records an id nor releases it (e.g. because its
+    process died) expires after `claim_seconds`.
+
+    Attributes
+    ----------
+    path : pathlib.Path
+        the SQLite database file. every process that opens the same file shares its entries.
+    ttl_seconds : float
+        how long a started transcription can be joined by identical submissions
+    wait_seconds : float
+        how long a caller waits for a pending claim before giving up with `SubmissionPendingError`
+    claim_seconds : float
+        how long a claim stays pending without a transcription id before it is presumed abandoned
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 3600.0,
+        wait_seconds: float = 10.0,
+        claim_seconds: float = DEFAULT_CLAIM_SECONDS,
+        poll_seconds: float = 0.05,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """Open (or create) the registry at `path`.
+
+        :param path: the SQLite database file, created along with its directory if needed
+        :param ttl_seconds: how long a started transcription can be joined by identical submissions
+        :param wait_seconds: how long to wait for a pending claim before giving up
+        :param claim_seconds: how long a claim stays pending before it is presumed abandoned. at least the `start`
+        timeout of the session that starts transcriptions, so that a slow start is never duplicated.
+        :param poll_seconds: interval between checks of a pending claim
+        :param clock: returns the current time, in seconds since the epoch
+        :param sleep: function used to wait between checks of a pending claim
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.claim_seconds = claim_seconds
+        self._poll_seconds = poll_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(_SCHEMA)
+
+    def start(self, key: str, start_fn: Callable[[], str]) -> Tuple[str, bool]:
+        """Return the transcription id for `key`, calling `start_fn` only if no identical submission is in flight.
+
+        :param key: identifies the audio and every option that affects its transcription
+        :param start_fn: starts a transcription and returns its id
+        :return: the transcription id, and whether it was shared with an earlier submission
+        :raises SubmissionPendingError: when an identical submission is still being started after `wait_seconds`.
+        `start_fn` is not called, so that the backend is never sent the same audio twice; the caller may retry later.
+        :raises Exception: whatever `start_fn` raises. the claim is released, so the next caller may retry.
+        """
+        deadline = self._clock() + self.wait_seconds
+        while True:
+            claimed, transcription_id = self._claim(key)
+            if transcription_id is not None:
+                logging.info(f"joining in-flight transcription key={key} id={transcription_id}")
+                metrics.get_sink().increment(COALESCED)
+                return transcription_id, True
+            if claimed:
+                break
+            if self._clock() >= deadline:
+                logging.warning(f"gave up waiting for in-flight transcription key={key}")
+                raise SubmissionPendingError(
+                    f"an identical submission is still being started after {self.wait_seconds}s"
+                )
+            self._sleep(self._poll_seconds)
+
+        try:
+            transcription_id = start_fn()
+        except Exception:
+            self.release(key)
+            raise
+        self._record(key, transcription_id)
+        return transcription_id, False
+
+    def release(self, key: str, transcription_id: Optional[str] = None) -> None:
+        """Forget `key`, so that the next submission starts a new transcription.
+
+        :param key: identifies the audio and every option that affects its transcription
+        :param transcription_id: only forget `key` while it is recorded for this transcription, so that releasing a
+        failed transcription does not forget a newer one started for the same audio
+        """
+        with closing(self._connect()) as db:
+            if transcription_id is None:
+                db.execute("DELETE FROM inflight WHERE key = ?", (key,))
+            else:
+                db.execute(
+                    "DELETE FROM inflight WHERE key = ? AND transcription_id = ?",
+                    (key, transcription_id),
+                )
+
+    def _claim(self, key: str) -> Tuple[bool, Optional[str]]:
+        """Atomically look up `key`, claiming it if absent. Returns (claimed, transcription id if started)."""
+        now = self._clock()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("DELETE FROM inflight WHERE expires_at <= ?", (now,))
+                row = db.execute(
+                    "SELECT transcription_id FROM inflight WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    db.execute(
+                        "INSERT INTO inflight (key, transcription_id, expires_at) VALUES (?, NULL, ?)",
+                        (key, now + self.claim_seconds),
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return row is None, row[0] if row is not None else None
+
+    def _record(self, key: str, transcription_id: str) -> None:
+        with closing(self._connect()) as db:
+            db.execute(
+                "INSERT OR REPLACE INTO inflight (key, transcription_id, expires_at) VALUES (?, ?, ?)",
+                (key, transcription_id, self._clock() + self.ttl_seconds),
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # a connection per operation is safe to use from any thread, and opening one costs tens of microseconds.
+        return sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None)
+
+
+@lru_cache(maxsize=None)
+def get_shared_registry(path: str, ttl_seconds: float, wait_seconds: float) -> InflightRegistry:
+    """Return the process-wide registry for `path`, so that the database is initialized only once per process."""
+    return InflightRegistry(path, ttl_seconds, wait_seconds)
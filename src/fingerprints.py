@@ -0,0 +1,322 @@
+"""Reuse of earlier transcripts for near-duplicate audio, found by spectral fingerprint, shared by worker processes."""
+
+import json
+import sqlite3
+import time
+from collections import Counter
+from contextlib import closing
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from steamship.plugin.outputs.block_and_tag_plugin_output import BlockAndTagPluginOutput
+
+import metrics
+import stitch
+import tag
+from audio import fingerprint
+
+# counts fingerprint lookups, labelled with their outcome: "hit" or "miss".
+FINGERPRINT_LOOKUPS = "whisper_fingerprint_lookups_total"
+
+# only the start of a query is used to find candidate alignments; the whole query is compared to verify them.
+MAX_QUERY_FRAMES = 4096
+# values that repeat more often than this within one fingerprint (e.g. during a held tone) say little about alignment.
+MAX_REPEATS = 8
+# a candidate alignment needs this many exactly-matching frames before it is verified.
+MIN_VOTES = 2
+# candidate alignments verified per lookup.
+MAX_CANDIDATES = 3
+# audio that a match leaves uncovered, at the ends of the query (or, for text transcripts, of either recording).
+MAX_UNCOVERED_SECONDS = 1.0
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        options TEXT NOT NULL,
+        fingerprint BLOB NOT NULL,
+        transcript TEXT,
+        expires_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS anchors (
+        value INTEGER NOT NULL,
+        entry INTEGER NOT NULL,
+        position INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS anchors_value ON anchors (value)",
+    "CREATE INDEX IF NOT EXISTS anchors_entry ON anchors (entry)",
+]
+
+
+@dataclass
+class Hit:
+    """An earlier transcript of audio that the query is a near-duplicate of.
+
+    Attributes
+    ----------
+    entry : int
+        the index entry of the earlier audio
+    offset_seconds : float
+        where the query starts within the earlier audio. negative when the query starts earlier.
+    similarity : float
+        the fraction of fingerprint bits that agree where the two overlap
+    transcript : Dict[str, Any]
+        the earlier transcript: `{"segments": [...]}` of `stitch.compact_segment` entries, or `{"text": ...}`
+    """
+
+    entry: int
+    offset_seconds: float
+    similarity: float
+    transcript: Dict[str, Any]
+
+
+class FingerprintIndex:
+    """Fingerprints of transcribed audio and their transcripts, in a SQLite database on local disk.
+
+    A fingerprint is added when its audio is submitted, and becomes searchable once its transcript is recorded with
+    `complete`. Every frame of a searchable fingerprint is indexed by value. A lookup finds the entries and alignments
+    that share the most exactly-equal frames with the start of the query, then verifies the best few by comparing the
+    whole query, bit by bit, with each entry. It is a hit when the bits agree at least `min_similarity` of the time and
+    the entry covers the query (less `MAX_UNCOVERED_SECONDS`).
+
+    Attributes
+    ----------
+    path : pathlib.Path
+        the SQLite database file. every process that opens the same file shares its entries.
+    min_similarity : float
+        the fraction of agreeing fingerprint bits for audio to count as a near-duplicate
+    max_entries : int
+        the most entries kept. the oldest are dropped first.
+    ttl_seconds : float
+        how long an entry is kept after it was added or last matched
+    """
+
+    def __init__(
+        self,
+        path: str,
+        min_similarity: float = 0.75,
+        max_entries: int = 10000,
+        ttl_seconds: float = 7 * 24 * 60 * 60,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Open (or create) the index at `path`.
+
+        :param path: the SQLite database file, created along with its directory if needed
+        :param min_similarity: the fraction of agreeing fingerprint bits for audio to count as a near-duplicate
+        :param max_entries: the most entries kept
+        :param ttl_seconds: how long an entry is kept after it was added or last matched
+        :param clock: returns the current time, in seconds since the epoch
+        """
+        self.path = Path(path)
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                db.execute(statement)
+
+    def add(self, fp: np.ndarray, options: str) -> int:
+        """Add the fingerprint of audio being transcribed, dropping expired and excess entries.
+
+        :param fp: the audio's fingerprint
+        :param options: identifies every option that affects the transcript (e.g. the model)
+        :return: the entry to pass to `complete` once the transcript is known
+        """
+        now = self._clock()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                entry = db.execute(
+                    "INSERT INTO entries (options, fingerprint, expires_at) VALUES (?, ?, ?)",
+                    (options, fp.astype("<u4").tobytes(), now + self.ttl_seconds),
+                ).lastrowid
+                dropped = [
+                    row[0]
+                    for row in db.execute(
+                        "SELECT id FROM entries WHERE expires_at <= ? UNION "
+                        "SELECT id FROM (SELECT id FROM entries ORDER BY id DESC LIMIT -1 OFFSET ?)",
+                        (now, self.max_entries),
+                    )
+                ]
+                for first in range(0, len(dropped), 500):
+                    ids = dropped[first : first + 500]
+                    marks = ",".join("?" * len(ids))
+                    db.execute(f"DELETE FROM anchors WHERE entry IN ({marks})", ids)
+                    db.execute(f"DELETE FROM entries WHERE id IN ({marks})", ids)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return entry
+
+    def complete(self, entry: int, transcript: Dict[str, Any]) -> None:
+        """Record the transcript of an entry's audio, making the entry searchable."""
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT fingerprint FROM entries WHERE id = ? AND transcript IS NULL", (entry,)
+                ).fetchone()
+                if row is not None:
+                    fp = np.frombuffer(row[0], dtype="<u4")
+                    positions = _anchor_positions(fp)
+                    db.executemany(
+                        "INSERT INTO anchors (value, entry, position) VALUES (?, ?, ?)",
+                        ((int(fp[p]), entry, int(p)) for p in positions),
+                    )
+                    db.execute(
+                        "UPDATE entries SET transcript = ? WHERE id = ?",
+                        (json.dumps(transcript), entry),
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def lookup(self, fp: np.ndarray, options: str) -> Optional[Hit]:
+        """Find the transcript of earlier audio that `fp` is a near-duplicate of.
+
+        :param fp: the fingerprint of the new audio
+        :param options: identifies every option that affects the transcript. only entries added with the same options
+        are searched.
+        :return: the best match, or None
+        """
+        hit = None
+        with closing(self._connect()) as db:
+            for entry, offset in self._candidates(db, fp, options):
+                row = db.execute(
+                    "SELECT fingerprint, transcript FROM entries WHERE id = ?", (entry,)
+                ).fetchone()
+                reference = np.frombuffer(row[0], dtype="<u4").astype(np.uint32)
+                match = fingerprint.refine(fp, reference, offset)
+                if match.similarity < self.min_similarity or (
+                    hit is not None and match.similarity <= hit.similarity
+                ):
+                    continue
+                transcript = json.loads(row[1])
+                if _covers(fp.size, reference.size, match.offset, "text" in transcript):
+                    hit = Hit(entry, match.offset_seconds, match.similarity, transcript)
+            if hit is not None:
+                db.execute(
+                    "UPDATE entries SET expires_at = ? WHERE id = ?",
+                    (self._clock() + self.ttl_seconds, hit.entry),
+                )
+        outcome = "hit" if hit is not None else "miss"
+        metrics.get_sink().increment(FINGERPRINT_LOOKUPS, labels={"outcome": outcome})
+        return hit
+
+    def _candidates(self, db: sqlite3.Connection, fp: np.ndarray, options: str) -> List[tuple]:
+        # the (entry, offset) alignments sharing the most exactly-equal frames with the start of `fp`.
+        query = fp[:MAX_QUERY_FRAMES]
+        order = np.argsort(query, kind="stable")
+        values, starts, counts = np.unique(query[order], return_index=True, return_counts=True)
+        usable = np.flatnonzero((values != 0) & (counts <= MAX_REPEATS))
+        positions = {
+            int(values[i]): order[starts[i] : starts[i] + counts[i]] for i in usable.tolist()
+        }
+        keys = list(positions)
+        votes: Counter = Counter()
+        now = self._clock()
+        for first in range(0, len(keys), 500):
+            chunk = keys[first : first + 500]
+            rows = db.execute(
+                "SELECT a.value, a.entry, a.position FROM anchors a JOIN entries e ON e.id = a.entry "
+                f"WHERE e.options = ? AND e.expires_at > ? AND a.value IN ({','.join('?' * len(chunk))})",
+                (options, now, *chunk),
+            )
+            for value, entry, position in rows:
+                for query_position in positions[value].tolist():
+                    votes[(entry, position - query_position)] += 1
+        return [candidate for candidate, n in votes.most_common(MAX_CANDIDATES) if n >= MIN_VOTES]
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None)
+
+
+def _anchor_positions(fp: np.ndarray) -> np.ndarray:
+    # the frames of a fingerprint that are indexed: non-silent, and not repeated too often.
+    _, inverse, counts = np.unique(fp, return_inverse=True, return_counts=True)
+    return np.flatnonzero((fp != 0) & (counts[inverse] <= MAX_REPEATS))
+
+
+def _covers(query_frames: int, reference_frames: int, offset: int, whole: bool) -> bool:
+    # whether the reference covers the query at `offset`, and, for `whole` transcripts, the query the reference.
+    slack = MAX_UNCOVERED_SECONDS / fingerprint.FRAME_SECONDS
+    before, after = max(-offset, 0), max(offset + query_frames - reference_frames, 0)
+    if before + after > slack:
+        return False
+    return not whole or max(offset, 0) + max(reference_frames - offset - query_frames, 0) <= slack
+
+
+def transcript_of(output: BlockAndTagPluginOutput) -> Dict[str, Any]:
+    """Extract a transcript from a plugin output: its timed segments (and words), or its text when untimed."""
+    blocks = output.file.blocks
+    segments = []
+    for block in blocks:
+        spans = sorted(
+            (t for t in block.tags if t.kind == tag.TIMESTAMP), key=lambda t: t.start_idx
+        )
+        words = sorted(
+            (t for t in block.tags if t.kind == tag.WORD_TIMESTAMP), key=lambda t: t.start_idx
+        )
+        w = 0
+        for span in spans:
+            segment = [span.value["start_time"], span.value["end_time"], span.name]
+            timed = []
+            while w < len(words) and words[w].start_idx < span.end_idx:
+                word = words[w]
+                if word.start_idx >= span.start_idx:
+                    timed.append([word.value["start_time"], word.value["end_time"], word.name])
+                w += 1
+            if timed:
+                segment.append(timed)
+            segments.append(segment)
+    if segments:
+        return {"segments": segments}
+    return {"text": " ".join(block.text for block in blocks)}
+
+
+def shift(
+    segments: List[List[Any]], offset_seconds: float, duration_seconds: float
+) -> List[Dict[str, Any]]:
+    """Retime compact segments against audio that starts `offset_seconds` into the original.
+
+    Segments (and words) outside the new audio, which lasts `duration_seconds`, are dropped, and times are clamped to
+    it. The offset is only known to within a fingerprint frame, so a segment that overlaps the new audio by less is
+    dropped too. A segment that keeps only some of its timed words keeps only their text.
+    """
+    first, last = fingerprint.FRAME_SECONDS, duration_seconds - fingerprint.FRAME_SECONDS
+    shifted = []
+    for compact in segments:
+        segment = stitch.expand_segment(compact, -offset_seconds)
+        if segment["end"] <= first or segment["start"] >= last:
+            continue
+        segment["start"] = max(segment["start"], 0.0)
+        segment["end"] = min(segment["end"], duration_seconds)
+        if "words" in segment:
+            words = [w for w in segment["words"] if w["end"] > first and w["start"] < last]
+            if len(words) < len(segment["words"]):
+                segment["text"] = " ".join(w["word"].strip() for w in words)
+            for word in words:
+                word["start"] = max(word["start"], 0.0)
+                word["end"] = min(word["end"], duration_seconds)
+            segment["words"] = words
+        shifted.append(segment)
+    return shifted
+
+
+@lru_cache(maxsize=None)
+def get_shared_index(
+    path: str, min_similarity: float, max_entries: int, ttl_seconds: float
+) -> FingerprintIndex:
+    """Return the process-wide index for `path`, so that the database is initialized only once per process."""
+    return FingerprintIndex(path, min_similarity, max_entries, ttl_seconds)
@@ -0,0 +1,25 @@
+"""Latency histograms, payload and outcome counters, and tracing spans for the transcription path.
+
+Instrumented code reports to a process-wide sink (`get_sink`), which discards everything until another sink is
+installed with `set_sink`.
+"""
+
+from .base import MetricsSink, NullSink, get_sink, set_sink
+from .memory import MemorySink, shared_memory_sink
+from .prometheus import render
+from .tracing import Span, annotate, current_span, span, wrap
+
+__all__ = [
+    "MemorySink",
+    "MetricsSink",
+    "NullSink",
+    "Span",
+    "annotate",
+    "current_span",
+    "get_sink",
+    "render",
+    "set_sink",
+    "shared_memory_sink",
+    "span",
+    "wrap",
+]
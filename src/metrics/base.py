@@ -0,0 +1,54 @@
+"""Interface for metrics sinks, and the process-wide sink that instrumentation reports to."""
+
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from .tracing import Span
+
+Labels = Optional[Dict[str, str]]
+
+
+class MetricsSink(ABC):
+    """Receives timing observations, counter increments, and finished spans."""
+
+    @abstractmethod
+    def observe(self, name: str, value: float, labels: Labels = None) -> None:
+        """Record `value` in the histogram `name`."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def increment(self, name: str, amount: float = 1.0, labels: Labels = None) -> None:
+        """Add `amount` to the counter `name`."""
+        raise NotImplementedError()
+
+    def set_gauge(self, name: str, value: float, labels: Labels = None) -> None:
+        """Set the gauge `name` to `value`. Sinks that do not keep gauges ignore it."""
+
+    def record_span(self, span: "Span") -> None:
+        """Receive a finished span. Sinks that do not keep traces ignore it."""
+
+
+class NullSink(MetricsSink):
+    """Discards everything. This is the default, so uninstrumented deployments pay almost nothing."""
+
+    def observe(self, name: str, value: float, labels: Labels = None) -> None:
+        """Discard the observation."""
+
+    def increment(self, name: str, amount: float = 1.0, labels: Labels = None) -> None:
+        """Discard the increment."""
+
+
+_sink: MetricsSink = NullSink()
+
+
+def get_sink() -> MetricsSink:
+    """Return the process-wide sink."""
+    return _sink
+
+
+def set_sink(sink: MetricsSink) -> MetricsSink:
+    """Replace the process-wide sink, returning the previous one."""
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
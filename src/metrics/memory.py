@@ -0,0 +1,143 @@
+"""In-process metrics sink that keeps cumulative histograms, counters, gauges, and recent spans."""
+
+import bisect
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from .base import Labels, MetricsSink
+from .tracing import Span
+
+# upper bounds, in seconds, of the latency histogram buckets: 5ms to 5 minutes.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+@dataclass
+class Histogram:
+    """Bucketed observations of one labelled series. `counts[i]` counts values <= `buckets[i]` (not cumulative)."""
+
+    buckets: Tuple[float, ...]
+    counts: List[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self):
+        """Allocate one count per bucket, plus one for values above the last bucket."""
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _key(labels: Labels) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+class MemorySink(MetricsSink):
+    """Aggregates metrics in process memory, for inspection in tests or export with `metrics.prometheus.render`.
+
+    Attributes
+    ----------
+    buckets : Tuple[float, ...]
+        upper bounds of every histogram's buckets
+    spans : Deque[Span]
+        the most recently finished spans, oldest first
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, max_spans: int = 1000):
+        """Initialize an empty sink.
+
+        :param buckets: upper bounds of every histogram's buckets, in increasing order
+        :param max_spans: the number of finished spans to keep
+        """
+        self.buckets = tuple(buckets)
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, labels: Labels = None) -> None:
+        """Record `value` in the histogram `name`."""
+        key = _key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(self.buckets)
+            series[key].observe(value)
+
+    def increment(self, name: str, amount: float = 1.0, labels: Labels = None) -> None:
+        """Add `amount` to the counter `name`."""
+        key = _key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def set_gauge(self, name: str, value: float, labels: Labels = None) -> None:
+        """Set the gauge `name` to `value`."""
+        key = _key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def record_span(self, span: Span) -> None:
+        """Keep a finished span."""
+        self.spans.append(span)
+
+    def histogram(self, name: str, **labels: str) -> Optional[Histogram]:
+        """Return the histogram series `name` with exactly these labels, if anything was observed."""
+        with self._lock:
+            return self._histograms.get(name, {}).get(_key(labels))
+
+    def counter(self, name: str, **labels: str) -> float:
+        """Return the value of the counter series `name` with exactly these labels."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_key(labels), 0.0)
+
+    def gauge(self, name: str, **labels: str) -> Optional[float]:
+        """Return the value of the gauge series `name` with exactly these labels, if it was ever set."""
+        with self._lock:
+            return self._gauges.get(name, {}).get(_key(labels))
+
+    def histograms(self) -> Iterator[Tuple[str, LabelKey, Histogram]]:
+        """Iterate over a snapshot of every histogram series, sorted by name and labels."""
+        with self._lock:
+            snapshot = [
+                (name, key, Histogram(h.buckets, list(h.counts), h.sum, h.count))
+                for name, series in self._histograms.items()
+                for key, h in series.items()
+            ]
+        return iter(sorted(snapshot, key=lambda item: item[:2]))
+
+    def counters(self) -> Iterator[Tuple[str, LabelKey, float]]:
+        """Iterate over a snapshot of every counter series, sorted by name and labels."""
+        with self._lock:
+            snapshot = [
+                (name, key, value)
+                for name, series in self._counters.items()
+                for key, value in series.items()
+            ]
+        return iter(sorted(snapshot))
+
+    def gauges(self) -> Iterator[Tuple[str, LabelKey, float]]:
+        """Iterate over a snapshot of every gauge series, sorted by name and labels."""
+        with self._lock:
+            snapshot = [
+                (name, key, value)
+                for name, series in self._gauges.items()
+                for key, value in series.items()
+            ]
+        return iter(sorted(snapshot))
+
+
+@lru_cache(maxsize=None)
+def shared_memory_sink() -> MemorySink:
+    """Return the process-wide in-memory sink, so that metrics accumulate across plugin invocations."""
+    return MemorySink()
@@ -0,0 +1,53 @@
+"""Export an in-memory sink in the Prometheus text exposition format (version 0.0.4)."""
+
+from typing import List
+
+from .memory import LabelKey, MemorySink
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render(sink: MemorySink) -> str:
+    """Render every histogram, counter and gauge held by `sink`.
+
+    Histogram buckets are cumulative, as the format requires, and end with a `+Inf` bucket.
+    """
+    lines: List[str] = []
+    declared = set()
+    for name, key, histogram in sink.histograms():
+        if name not in declared:
+            lines.append(f"# TYPE {name} histogram")
+            declared.add(name)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(key, le=_number(bound))} {cumulative}")
+        lines.append(f'{name}_bucket{_labels(key, le="+Inf")} {histogram.count}')
+        lines.append(f"{name}_sum{_labels(key)} {_number(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+    for name, key, value in sink.counters():
+        if name not in declared:
+            lines.append(f"# TYPE {name} counter")
+            declared.add(name)
+        lines.append(f"{name}{_labels(key)} {_number(value)}")
+    for name, key, value in sink.gauges():
+        if name not in declared:
+            lines.append(f"# TYPE {name} gauge")
+            declared.add(name)
+        lines.append(f"{name}{_labels(key)} {_number(value)}")
+    return "\n".join(lines) + "\n" if lines else ""
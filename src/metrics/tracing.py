@@ -0,0 +1,117 @@
+"""Tracing spans that time each phase of a transcription and carry its identifiers across status checks."""
+
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+from uuid import uuid4
+
+from .base import get_sink
+
+# every span is recorded in this histogram, labelled with the span name and its outcome.
+SPAN_SECONDS = "whisper_span_seconds"
+
+T = TypeVar("T")
+
+
+@dataclass
+class Span:
+    """A timed phase of work.
+
+    Attributes
+    ----------
+    name : str
+        the phase, e.g. "banana_start"
+    trace_id : str
+        shared by every span of one transcription, including those of later status checks
+    span_id : str
+        unique to this span
+    parent_id : Optional[str]
+        the `span_id` of the enclosing span, if any
+    attributes : Dict[str, Any]
+        identifiers such as `transcription_id`. inherited by spans started within this one.
+    started_at : float
+        wall-clock start time, in seconds since the epoch
+    duration : float
+        elapsed time, in seconds, once the span has finished
+    outcome : str
+        "ok", or "error" when the span exited with an exception
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    started_at: float = 0.0
+    duration: float = 0.0
+    outcome: str = "ok"
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "whisper_span", default=None
+)
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost active span, if any."""
+    return _current.get()
+
+
+def annotate(**attributes: Any) -> None:
+    """Add attributes to the innermost active span, and so to any span started within it from now on."""
+    active = _current.get()
+    if active is not None:
+        active.attributes.update(attributes)
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+    """Time the enclosed block as a span, reporting it to the process-wide metrics sink when it finishes.
+
+    :param name: the phase being timed
+    :param trace_id: continue this trace rather than the enclosing span's (or a new one). Status checks pass the id
+        saved when the transcription started, so that every check joins the same trace.
+    :param attributes: identifiers to attach to this span and the spans started within it
+    """
+    parent = _current.get()
+    trace_id = trace_id or (parent.trace_id if parent else uuid4().hex)
+    inherited = dict(parent.attributes) if parent else {}
+    active = Span(
+        name=name,
+        trace_id=trace_id,
+        span_id=uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        attributes={**inherited, **attributes},
+        started_at=time.time(),
+    )
+    token = _current.set(active)
+    started = time.perf_counter()
+    try:
+        yield active
+    except BaseException:
+        active.outcome = "error"
+        raise
+    finally:
+        active.duration = time.perf_counter() - started
+        _current.reset(token)
+        sink = get_sink()
+        sink.observe(SPAN_SECONDS, active.duration, {"span": name, "outcome": active.outcome})
+        sink.record_span(active)
+        logging.debug(
+            f"span {name} ms={active.duration * 1000:.1f} outcome={active.outcome} "
+            f"trace_id={trace_id} attributes={json.dumps(active.attributes, default=str)}"
+        )
+
+
+def wrap(fn: Callable[..., T]) -> Callable[..., T]:
+    """Bind `fn` to the caller's active span, so that spans it starts on a worker thread join the caller's trace."""
+    context = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> T:
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
@@ -0,0 +1,135 @@
+"""Duration-aware status polling with completion estimates."""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from throughput import ThroughputTable, shared_table
+
+
+@dataclass
+class PollPlan:
+    """What to do after a status check finds a transcription still running.
+
+    Attributes
+    ----------
+    eta_seconds : float
+        expected time until the transcription completes
+    wait_seconds : float
+        how long to wait in-process before checking again; zero to return to the caller right away
+    next_check_seconds : float
+        suggested delay before the caller's next status check
+    """
+
+    eta_seconds: float
+    wait_seconds: float
+    next_check_seconds: float
+
+    def status_input(self) -> Dict[str, Any]:
+        """Return the hints to include in `remote_status_input`."""
+        return {
+            "eta_seconds": round(self.eta_seconds, 1),
+            "next_check_seconds": round(self.next_check_seconds, 1),
+        }
+
+
+class PollingPolicy:
+    """Decide how to poll a running transcription from its audio duration, model, and start time.
+
+    When completion is imminent, the policy waits briefly in-process rather than spending another invocation on a
+    status check. Otherwise it suggests a delay before the next check that grows with the remaining time, bounded by
+    `min_interval_seconds` and `max_interval_seconds`.
+
+    Attributes
+    ----------
+    table : ThroughputTable
+        processing-time estimates, updated as transcriptions complete
+    max_inline_wait_seconds : float
+        the longest in-process wait the policy will ask for
+    min_interval_seconds : float
+        the shortest suggested delay between status checks
+    max_interval_seconds : float
+        the longest suggested delay between status checks
+    """
+
+    # fraction of the remaining time to wait before checking again.
+    BACKOFF_FRACTION = 0.5
+
+    def __init__(
+        self,
+        table: Optional[ThroughputTable] = None,
+        max_inline_wait_seconds: float = 5.0,
+        min_interval_seconds: float = 2.0,
+        max_interval_seconds: float = 60.0,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """Initialize a policy.
+
+        :param table: processing-time estimates. defaults to the process-wide table.
+        :param max_inline_wait_seconds: the longest in-process wait the policy will ask for
+        :param min_interval_seconds: the shortest suggested delay between status checks
+        :param max_interval_seconds: the longest suggested delay between status checks
+        :param clock: source of the current (wall clock) time, in seconds
+        :param sleep: function used to wait in-process
+        """
+        self.table = table or shared_table()
+        self.max_inline_wait_seconds = max_inline_wait_seconds
+        self.min_interval_seconds = min_interval_seconds
+        self.max_interval_seconds = max_interval_seconds
+        self.clock = clock
+        self.sleep = sleep
+
+    def started(self, model: str, audio_seconds: float) -> Dict[str, Any]:
+        """Return the `remote_status_input` fields that track a newly-started transcription."""
+        return {
+            "started_at": self.clock(),
+            "audio_seconds": round(audio_seconds, 3),
+            "model": model,
+        }
+
+    def plan(self, status_input: Dict[str, Any]) -> Optional[PollPlan]:
+        """Plan the next poll of a running transcription, or return None if it is not being tracked."""
+        if "started_at" not in status_input:
+            return None
+        expected = self.table.estimate(status_input["model"], status_input["audio_seconds"])
+        eta = max(0.0, status_input["started_at"] + expected - self.clock())
+        if eta <= self.max_inline_wait_seconds:
+            return PollPlan(eta, eta, self.min_interval_seconds)
+        next_check = eta * self.BACKOFF_FRACTION
+        next_check = min(self.max_interval_seconds, max(self.min_interval_seconds, next_check))
+        return PollPlan(eta, 0.0, next_check)
+
+    def checked(self, status_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Return `status_input`, recording that a status check just found the transcription still running."""
+        return checked(status_input, self.clock())
+
+    def completed(self, status_input: Dict[str, Any], reported_at: Optional[float] = None) -> None:
+        """Learn from a transcription that was found to be complete, at `reported_at` by the backend's clock."""
+        if "started_at" not in status_input:
+            return
+        elapsed = elapsed_seconds(status_input, self.clock(), reported_at)
+        self.table.observe(status_input["model"], status_input["audio_seconds"], elapsed)
+
+
+def checked(status_input: Dict[str, Any], now: float) -> Dict[str, Any]:
+    """Return `status_input`, recording that a status check found the transcription still running at `now`."""
+    if "started_at" not in status_input:
+        return status_input
+    return {**status_input, "checked_at": round(now, 3)}
+
+
+def elapsed_seconds(
+    status_input: Dict[str, Any], now: float, reported_at: Optional[float] = None
+) -> float:
+    """Return how long a tracked transcription took, from its start until it completed.
+
+    The transcription completed after the last status check that found it running (or its start) and by `now`, when a
+    check found it complete. The backend's completion time `reported_at` is used when it falls in that interval;
+    otherwise the middle of the interval is, rather than whenever a check happened to find it complete.
+    """
+    started_at = status_input["started_at"]
+    running_at = status_input.get("checked_at", started_at)
+    if reported_at is not None and running_at <= reported_at <= now:
+        return reported_at - started_at
+    return (running_at + now) / 2 - started_at
@@ -0,0 +1,306 @@
+"""Rate limiting and prioritization of backend submissions, shared by worker processes on one node."""
+
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from uuid import uuid4
+
+import metrics
+
+# priority classes, from most to least urgent.
+PRIORITIES = ("interactive", "bulk")
+
+# time from a submission first asking for admission to being admitted, labelled with its priority.
+SUBMISSION_WAIT_SECONDS = "whisper_submission_wait_seconds"
+# submissions waiting for admission, labelled with their priority.
+QUEUE_DEPTH = "whisper_submission_queue_depth"
+# counts submissions that were not admitted in time and were left queued, labelled with their priority.
+SUBMISSIONS_DEFERRED = "whisper_submissions_deferred_total"
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS bucket (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS waiting (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        ticket TEXT NOT NULL UNIQUE,
+        rank INTEGER NOT NULL,
+        enqueued_at REAL NOT NULL,
+        active_until REAL NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    """,
+]
+
+
+@dataclass
+class Admission:
+    """The outcome of asking for admission.
+
+    Attributes
+    ----------
+    admitted : bool
+        whether the submission may be sent now
+    ticket : str
+        identifies the submission's place in the queue. pass it to `acquire` again to keep that place.
+    position : int
+        submissions ahead of this one in the queue
+    waited_seconds : float
+        time since the submission first asked for admission
+    """
+
+    admitted: bool
+    ticket: str
+    position: int
+    waited_seconds: float
+
+
+class SubmissionScheduler:
+    """Admits backend submissions at a sustained rate, in priority order, across every worker process on this node.
+
+    Admission takes tokens from a token bucket kept in a SQLite database on local disk: it holds up to `burst` tokens
+    and refills at `rate_per_second`. Submissions wait in a queue ordered by priority, then by arrival, and only the
+    head of the queue may take tokens; lower priorities must also leave `reserve` tokens in the bucket, so that an
+    interactive submission arriving during a bulk import is admitted without waiting for the bucket to refill.
+
+    A submission needing more tokens than the bucket can hold is admitted once the bucket holds as many as it can, and
+    is charged in full: the bucket goes into debt, and every later submission waits until it has refilled past it.
+
+    A submission that is not admitted within `max_wait_seconds` keeps its place, identified by its ticket, for
+    `ticket_ttl_seconds`. While its caller is not waiting, it does not hold up the submissions behind it. Its audio
+    can be parked on disk next to the database until the caller returns.
+
+    Attributes
+    ----------
+    path : pathlib.Path
+        the SQLite database file. every process that opens the same file shares its bucket and queue.
+    rate_per_second : float
+        tokens added to the bucket per second
+    burst : int
+        the most tokens the bucket holds
+    reserve : int
+        tokens that submissions of lower than the highest priority must leave in the bucket
+    max_wait_seconds : float
+        how long `acquire` waits for admission
+    ticket_ttl_seconds : float
+        how long a queued submission keeps its place without asking for admission again
+    """
+
+    def __init__(
+        self,
+        path: str,
+        rate_per_second: float = 5.0,
+        burst: int = 10,
+        reserve: int = 2,
+        max_wait_seconds: float = 5.0,
+        ticket_ttl_seconds: float = 600.0,
+        poll_seconds: float = 0.05,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """Open (or create) the scheduler's database at `path`.
+
+        :param path: the SQLite database file, created along with its directory if needed
+        :param rate_per_second: tokens added to the bucket per second
+        :param burst: the most tokens the bucket holds. it starts full.
+        :param reserve: tokens that submissions of lower than the highest priority must leave in the bucket
+        :param max_wait_seconds: how long `acquire` waits for admission
+        :param ticket_ttl_seconds: how long a queued submission keeps its place without asking for admission again
+        :param poll_seconds: interval between admission attempts
+        :param clock: returns the current time, in seconds since the epoch
+        :param sleep: function used to wait between admission attempts
+        :raises ValueError: when `reserve` leaves no tokens for lower priorities.
+        """
+        if reserve >= burst:
+            raise ValueError(f"the reserve ({reserve}) must be smaller than the burst ({burst})")
+        self.path = Path(path)
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.reserve = reserve
+        self.max_wait_seconds = max_wait_seconds
+        self.ticket_ttl_seconds = ticket_ttl_seconds
+        self._poll_seconds = poll_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._parked = self.path.parent / f"{self.path.stem}-parked"
+        self._parked.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                db.execute(statement)
+            db.execute(
+                "INSERT OR IGNORE INTO bucket (id, tokens, updated_at) VALUES (0, ?, ?)",
+                (burst, self._clock()),
+            )
+
+    def acquire(self, priority: str, tokens: int = 1, ticket: Optional[str] = None) -> Admission:
+        """Wait up to `max_wait_seconds` for the submission to reach the head of the queue and take its tokens.
+
+        :param priority: one of `PRIORITIES`
+        :param tokens: backend requests the submission will make. all are charged, even beyond `burst`.
+        :param ticket: the ticket of an earlier, unadmitted attempt, to keep its place in the queue
+        :raises ValueError: when `priority` is unknown.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown submission priority: {priority}")
+        rank = PRIORITIES.index(priority)
+        ticket = ticket or uuid4().hex
+        deadline = self._clock() + self.max_wait_seconds
+        while True:
+            admitted, position, enqueued_at = self._try(ticket, rank, tokens, deadline)
+            if admitted or self._clock() >= deadline:
+                break
+            self._sleep(self._poll_seconds)
+
+        waited = max(self._clock() - enqueued_at, 0.0)
+        sink = metrics.get_sink()
+        if admitted:
+            sink.observe(SUBMISSION_WAIT_SECONDS, waited, {"priority": priority})
+        else:
+            logging.info(
+                f"submission queued ticket={ticket} priority={priority} position={position}"
+            )
+            sink.increment(SUBMISSIONS_DEFERRED, labels={"priority": priority})
+        for name, depth in self.depth().items():
+            sink.set_gauge(QUEUE_DEPTH, depth, {"priority": name})
+        return Admission(admitted, ticket, position, waited)
+
+    def depth(self) -> Dict[str, int]:
+        """Return the number of queued submissions of each priority."""
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT rank, COUNT(*) FROM waiting WHERE expires_at > ? GROUP BY rank",
+                (self._clock(),),
+            ).fetchall()
+        counts = dict(rows)
+        return {name: counts.get(rank, 0) for rank, name in enumerate(PRIORITIES)}
+
+    def park(self, ticket: str, data: bytes) -> None:
+        """Keep the audio of a queued submission on disk until it is admitted, discarding expired parked audio."""
+        now = self._clock()
+        for path in self._parked.iterdir():
+            try:
+                if now - path.stat().st_mtime > self.ticket_ttl_seconds:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+        fd, tmp_path = tempfile.mkstemp(dir=self._parked, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.utime(tmp_path, (now, now))
+        os.replace(tmp_path, self._parked_path(ticket))
+
+    def unpark(self, ticket: str) -> Optional[bytes]:
+        """Return the parked audio of a queued submission, or None if it was never parked here or has expired."""
+        try:
+            path = self._parked_path(ticket)
+            data = path.read_bytes()
+        except (FileNotFoundError, ValueError):
+            return None
+        # reading it keeps it from expiring while the submission is still queued.
+        now = self._clock()
+        os.utime(path, (now, now))
+        return data
+
+    def discard(self, ticket: str) -> None:
+        """Forget a submission: its place in the queue and its parked audio."""
+        with closing(self._connect()) as db:
+            db.execute("DELETE FROM waiting WHERE ticket = ?", (ticket,))
+        try:
+            self._parked_path(ticket).unlink()
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def _parked_path(self, ticket: str) -> Path:
+        # tickets come back in task status, so they are checked before being used as file names.
+        if not ticket.isalnum():
+            raise ValueError(f"invalid ticket: {ticket}")
+        return self._parked / ticket
+
+    def _try(self, ticket: str, rank: int, tokens: int, deadline: float) -> Tuple[bool, int, float]:
+        """Atomically queue `ticket` (if new) and admit it if it can be. Returns (admitted, position, enqueued at)."""
+        now = self._clock()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("DELETE FROM waiting WHERE expires_at <= ?", (now,))
+                expires_at = now + self.ticket_ttl_seconds
+                row = db.execute(
+                    "SELECT seq, enqueued_at FROM waiting WHERE ticket = ?", (ticket,)
+                ).fetchone()
+                if row is None:
+                    seq = db.execute(
+                        "INSERT INTO waiting (ticket, rank, enqueued_at, active_until, expires_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (ticket, rank, now, deadline, expires_at),
+                    ).lastrowid
+                    enqueued_at = now
+                else:
+                    seq, enqueued_at = row
+                    db.execute(
+                        "UPDATE waiting SET active_until = ?, expires_at = ? WHERE seq = ?",
+                        (deadline, expires_at, seq),
+                    )
+                # queued submissions are ordered by priority, then by arrival.
+                ahead = "(rank < ? OR (rank = ? AND seq < ?))"
+                order = (rank, rank, seq)
+                position = db.execute(
+                    f"SELECT COUNT(*) FROM waiting WHERE {ahead}", order
+                ).fetchone()[0]
+                # only submissions whose callers are waiting right now can hold this one up.
+                blocking = db.execute(
+                    f"SELECT COUNT(*) FROM waiting WHERE active_until > ? AND {ahead}",
+                    (now, *order),
+                ).fetchone()[0]
+
+                available, updated_at = db.execute(
+                    "SELECT tokens, updated_at FROM bucket WHERE id = 0"
+                ).fetchone()
+                available = min(
+                    self.burst, available + max(now - updated_at, 0.0) * self.rate_per_second
+                )
+                # the most a submission can wait for is a full bucket; whatever it needs beyond that becomes debt.
+                reserve = self.reserve if rank > 0 else 0
+                required = min(tokens, self.burst - reserve)
+                admitted = blocking == 0 and available - required >= reserve
+                if admitted:
+                    available -= tokens
+                    db.execute("DELETE FROM waiting WHERE ticket = ?", (ticket,))
+                db.execute(
+                    "UPDATE bucket SET tokens = ?, updated_at = ? WHERE id = 0", (available, now)
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return admitted, position, enqueued_at
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None)
+
+
+@lru_cache(maxsize=None)
+def get_shared_scheduler(
+    path: str,
+    rate_per_second: float,
+    burst: int,
+    reserve: int,
+    max_wait_seconds: float,
+    ticket_ttl_seconds: float,
+) -> SubmissionScheduler:
+    """Return the process-wide scheduler for `path`, so that the database is initialized only once per process."""
+    return SubmissionScheduler(
+        path, rate_per_second, burst, reserve, max_wait_seconds, ticket_ttl_seconds
+    )
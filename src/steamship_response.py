@@ -1,6 +1,6 @@
 """Utility methods for generating Responses."""
 
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from steamship import Block, File
 from steamship.base import Task, TaskState
@@ -10,15 +10,28 @@ from steamship.plugin.outputs.block_and_tag_plugin_output import BlockAndTagPlug
 
 def with_blocks(blocks: List[Block.CreateRequest]) -> InvocableResponse[BlockAndTagPluginOutput]:
     """Build a block-and-tag response from text."""
-    return InvocableResponse(data=BlockAndTagPluginOutput(file=File.CreateRequest(blocks=blocks)))
+    return with_output(BlockAndTagPluginOutput(file=File.CreateRequest(blocks=blocks)))
 
 
-def with_status(state: TaskState, message, transcription_id: str) -> InvocableResponse:
-    """Build a response object with a TaskState and message for a given transcription_id."""
+def with_output(output: BlockAndTagPluginOutput) -> InvocableResponse[BlockAndTagPluginOutput]:
+    """Build a block-and-tag response from an already-assembled plugin output."""
+    return InvocableResponse(data=output)
+
+
+def with_status(
+    state: TaskState,
+    message,
+    transcription_id: str,
+    status_input: Optional[Dict[str, Any]] = None,
+) -> InvocableResponse:
+    """Build a response object with a TaskState and message for a given transcription_id.
+
+    Any `status_input` is carried alongside the `transcription_id` so that it is returned on the next status check.
+    """
     return InvocableResponse(
         status=Task(
             state=state,
             remote_status_message=message,
-            remote_status_input={"transcription_id": transcription_id},
+            remote_status_input={**(status_input or {}), "transcription_id": transcription_id},
         )
     )
@@ -0,0 +1,100 @@
+"""Merge the segments of overlapping transcription windows into a single timeline."""
+
+import bisect
+from typing import Any, Dict, List, Sequence, Union
+
+from whisper.response import SegmentTable
+
+# a segment that overlaps the previously kept one by more than this fraction of its own length is a duplicate.
+DUPLICATE_OVERLAP = 0.5
+
+
+def merge_windows(windows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge per-window segments into one list of segments timed against the original recording.
+
+    Each window is a dict with `offset`, `start`, and `end` (see `audio.windows.Window`) and `segments`, a list of
+    `compact_segment` entries timed relative to the window's own audio. A segment is kept by the window whose
+    `start`..`end` span contains the segment's midpoint; anything still duplicated across the seam (a segment mostly
+    covered by the one before it) is dropped.
+
+    :param windows: the finished windows, in order
+    :return: segments with `start`, `end`, `text`, and `words` (if present), in order
+    """
+    merged: List[Dict[str, Any]] = []
+    for window in windows:
+        offset = window["offset"]
+        for compact in window["segments"]:
+            segment = expand_segment(compact, offset)
+            midpoint = (segment["start"] + segment["end"]) / 2
+            if not window["start"] <= midpoint < window["end"]:
+                continue
+            if merged and _is_duplicate(merged[-1], segment["start"], segment["end"]):
+                continue
+            merged.append(segment)
+    return merged
+
+
+def compact_segment(segment: Dict[str, Any]) -> List[Any]:
+    """Reduce a whisper segment to `[start, end, text]` (plus `[[start, end, word], ...]`, if timed words exist)."""
+    compact = [segment["start"], segment["end"], segment["text"]]
+    if segment.get("words"):
+        compact.append([[w["start"], w["end"], w["word"]] for w in segment["words"]])
+    return compact
+
+
+def expand_segment(compact: List[Any], offset: float = 0.0) -> Dict[str, Any]:
+    """Rebuild a segment dict from a `compact_segment` entry, shifting its times by `offset` seconds."""
+    segment = {"start": compact[0] + offset, "end": compact[1] + offset, "text": compact[2]}
+    if len(compact) > 3:
+        segment["words"] = [
+            {"start": w_start + offset, "end": w_end + offset, "word": word}
+            for w_start, w_end, word in compact[3]
+        ]
+    return segment
+
+
+def restore_silences(
+    segments: Union[List[Dict[str, Any]], SegmentTable], silences: Sequence[Sequence[float]]
+) -> Union[List[Dict[str, Any]], SegmentTable]:
+    """Map segment and word times from silence-trimmed audio back onto the original recording.
+
+    A time that falls exactly on a removed span is placed after the span when it starts a segment or word, and before
+    it when it ends one.
+
+    :param segments: segments timed against the trimmed audio. a `SegmentTable` is remapped in place.
+    :param silences: the (start, end) times of the removed spans, in seconds against the original audio, in order
+    :return: segments timed against the original audio
+    """
+    cuts, shifts, removed = [], [0.0], 0.0
+    for start, end in silences:
+        cuts.append(start - removed)
+        removed += end - start
+        shifts.append(removed)
+
+    def _start(t: float) -> float:
+        return t + shifts[bisect.bisect_right(cuts, t)]
+
+    def _end(t: float) -> float:
+        return t + shifts[bisect.bisect_left(cuts, t)]
+
+    if isinstance(segments, SegmentTable):
+        segments.remap(_start, _end)
+        return segments
+
+    def _restore(item: Dict[str, Any]) -> Dict[str, Any]:
+        start = _start(item["start"])
+        return {**item, "start": start, "end": max(start, _end(item["end"]))}
+
+    restored = []
+    for segment in segments:
+        segment = _restore(segment)
+        if segment.get("words"):
+            segment["words"] = [_restore(word) for word in segment["words"]]
+        restored.append(segment)
+    return restored
+
+
+def _is_duplicate(previous: Dict[str, Any], start: float, end: float) -> bool:
+    overlap = min(previous["end"], end) - max(previous["start"], start)
+    length = end - start
+    return length > 0 and overlap / length > DUPLICATE_OVERLAP
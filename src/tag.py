@@ -1,6 +1,13 @@
 """Utility methods for creating tags."""
+from typing import Iterable, List, Tuple
+
 from steamship import Tag
 
+TIMESTAMP = "timestamp"
+WORD_TIMESTAMP = "word_timestamp"
+SOURCE_FILE = "source_file"
+TRANSCRIPTION_ERROR = "transcription_error"
+
 
 def create_timestamp(
     start_idx: int, start_offset_seconds, end_offset_seconds: float, text: str
@@ -8,9 +15,39 @@ def create_timestamp(
     """Create a Tag with a kind of 'timestamp' for the text provided."""
     # todo(douglas-reid): should we use `name` to hold the text, or also add it to `value` ?
     return Tag.CreateRequest(
-        kind="timestamp",
+        kind=TIMESTAMP,
         start_idx=start_idx,
         end_idx=start_idx + len(text),
         name=text,
         value={"start_time": start_offset_seconds, "end_time": end_offset_seconds},
     )
+
+
+def create_timestamps(
+    text: str, rows: Iterable[Tuple[int, int, float, float]], kind: str = TIMESTAMP
+) -> List[Tag.CreateRequest]:
+    """Create timestamp Tags in bulk from (start_idx, end_idx, start_time, end_time) rows over `text`.
+
+    Rows are produced internally with known-good types, so model validation is skipped: at hundreds of thousands of
+    word-level tags, validation dominates the cost of building a response.
+    """
+    return [
+        Tag.CreateRequest.construct(
+            kind=kind,
+            start_idx=start_idx,
+            end_idx=end_idx,
+            name=text[start_idx:end_idx],
+            value={"start_time": start_time, "end_time": end_time},
+        )
+        for start_idx, end_idx, start_time, end_time in rows
+    ]
+
+
+def create_source_file(name: str) -> Tag.CreateRequest:
+    """Create a Tag naming the file (within an uploaded archive) that a block was transcribed from."""
+    return Tag.CreateRequest(kind=SOURCE_FILE, name=name)
+
+
+def create_transcription_error(message: str) -> Tag.CreateRequest:
+    """Create a Tag recording why a file could not be transcribed."""
+    return Tag.CreateRequest(kind=TRANSCRIPTION_ERROR, name=message)
@@ -0,0 +1,103 @@
+"""Learned estimates of how long the backend takes to transcribe audio with each whisper model."""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+# seconds of processing per second of audio, before any observations are made.
+DEFAULT_REALTIME_FACTORS = {"tiny": 0.05, "base": 0.08, "small": 0.2, "medium": 0.4}
+
+
+@dataclass
+class ModelThroughput:
+    """Processing-time model for one whisper model: `overhead + realtime_factor * audio_seconds`.
+
+    `realtime_factor` is the learned factor as of `observed_at`; `prior_factor` is the estimate before any observations.
+    """
+
+    realtime_factor: float
+    overhead_seconds: float
+    observations: int = 0
+    prior_factor: Optional[float] = None
+    observed_at: Optional[float] = None
+
+
+class ThroughputTable:
+    """Per-model processing-time estimates, refined from observed completion times.
+
+    Observations update each model's realtime factor with an exponentially-weighted moving average, starting from the
+    prior, so estimates track the backend's current speed rather than its all-time average. Between observations, a
+    learned factor decays back toward the prior, so that a model which stops being chosen because it was once slow is
+    eventually tried, and measured, again.
+
+    Attributes
+    ----------
+    alpha : float
+        weight given to each new observation
+    half_life_seconds : float
+        time after which half of the difference between a model's learned factor and its prior is forgotten
+    """
+
+    def __init__(
+        self,
+        realtime_factors: Optional[Dict[str, float]] = None,
+        overhead_seconds: float = 10.0,
+        alpha: float = 0.2,
+        half_life_seconds: float = 6 * 60 * 60,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize the table with prior estimates.
+
+        :param realtime_factors: seconds of processing per second of audio, by model name
+        :param overhead_seconds: fixed time, independent of audio duration, for queueing and model loading
+        :param alpha: weight given to each new observation
+        :param half_life_seconds: how quickly learned factors decay back toward the priors
+        :param clock: returns the current time, in seconds
+        """
+        self.alpha = alpha
+        self.half_life_seconds = half_life_seconds
+        self._clock = clock
+        self._models = {
+            model: ModelThroughput(factor, overhead_seconds, prior_factor=factor)
+            for model, factor in (realtime_factors or DEFAULT_REALTIME_FACTORS).items()
+        }
+        self._lock = threading.Lock()
+
+    def __getitem__(self, model: str) -> ModelThroughput:
+        """Return the current estimate for `model`."""
+        return self._models[model]
+
+    def estimate(self, model: str, audio_seconds: float) -> float:
+        """Return the expected processing time, in seconds, for `audio_seconds` of audio."""
+        throughput = self._models[model]
+        return throughput.overhead_seconds + self._factor(throughput, self._clock()) * audio_seconds
+
+    def observe(self, model: str, audio_seconds: float, elapsed_seconds: float) -> None:
+        """Record that `audio_seconds` of audio took `elapsed_seconds` to transcribe."""
+        if audio_seconds <= 0 or model not in self._models:
+            return
+        with self._lock:
+            now = self._clock()
+            throughput = self._models[model]
+            factor = max(0.0, elapsed_seconds - throughput.overhead_seconds) / audio_seconds
+            current = self._factor(throughput, now)
+            throughput.realtime_factor = current + self.alpha * (factor - current)
+            throughput.observed_at = now
+            throughput.observations += 1
+
+    def _factor(self, throughput: ModelThroughput, now: float) -> float:
+        # the learned factor, decayed toward the prior for the time since it was last observed.
+        if throughput.observed_at is None or throughput.prior_factor is None:
+            return throughput.realtime_factor
+        kept = 0.5 ** (max(0.0, now - throughput.observed_at) / self.half_life_seconds)
+        prior = throughput.prior_factor
+        return prior + kept * (throughput.realtime_factor - prior)
+
+
+_shared_table = ThroughputTable()
+
+
+def shared_table() -> ThroughputTable:
+    """Return the process-wide table, which accumulates observations across requests."""
+    return _shared_table
@@ -0,0 +1,210 @@
+"""Provides an asyncio-native client for a backend running a Whisper model."""
+
+import asyncio
+from dataclasses import asdict
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+import metrics
+from banana_dev import AsyncBananaSession
+from blobs import BlobStore
+
+from .client import (
+    DEFAULT_REFERENCE_THRESHOLD_BYTES,
+    DEFAULT_STREAMING_THRESHOLD_BYTES,
+    audio_input,
+    model_options,
+    validate_model,
+)
+from .pool import DeploymentPool, tag, untag
+
+
+class AsyncWhisperClient:
+    """
+    The coroutine counterpart of `whisper.client.WhisperClient`.
+
+    All calls share one connection pool, and the session caps how many requests are in flight at once, so a single
+    worker can keep hundreds of long-poll status checks outstanding without a thread per check.
+
+    Requests are built and checks are retried exactly as by `WhisperClient`, including reference uploads to a blob
+    store. Hedged checks and the circuit breaker come with the session, and a deployment pool spreads transcriptions
+    as it does for `WhisperClient`; the hedger, breaker and pool may be the very objects a `WhisperClient` uses, so
+    that both share what they learn. Model routing and keep-warm pings are not supported: transcriptions always use
+    `_whisper_model`, and nothing pings an idle backend. Ids tagged with a deployment that is neither pooled nor
+    `_model_key` cannot be checked.
+
+    Attributes
+    ----------
+    _api_key : str
+      the API key to use for the backend
+    _model_key : str
+      the key used to identify the model in the backend
+    _whisper_model: str
+      the whisper model to use for transcription purposes. MUST be one of `tiny, base, small, or medium`.
+    _session: banana_dev.AsyncBananaSession
+      the shared connection pool used for every backend call made by this client.
+    _streaming_threshold_bytes: int
+      audio of at least this many bytes is base64-encoded in chunks while the request body is streamed.
+    _blob_store: Optional[BlobStore]
+      where audio of at least `_reference_threshold_bytes` is uploaded, so that the backend is sent its URL.
+    _pool: Optional[DeploymentPool]
+      chooses the deployment each transcription is started on, when several are pooled. see `WhisperClient`.
+    _sessions: Dict[str, banana_dev.AsyncBananaSession]
+      the session of each deployment, by model key, configured like `_session` (see `AsyncBananaSession.for_endpoint`).
+    """
+
+    def __init__(
+        self,
+        api_key,
+        model_key: str,
+        whisper_model: str = "base",
+        session: Optional[AsyncBananaSession] = None,
+        streaming_threshold_bytes: int = DEFAULT_STREAMING_THRESHOLD_BYTES,
+        blob_store: Optional[BlobStore] = None,
+        reference_threshold_bytes: int = DEFAULT_REFERENCE_THRESHOLD_BYTES,
+        deployments: Optional[DeploymentPool] = None,
+    ):
+        """Initialize client with appropriate keys.
+
+        :param api_key: the API key to use for the backend
+        :param model_key: the model key to use for the backend
+        :param whisper_model: name of the whisper model to use for transcription (tiny, base, small, or medium)
+        :param session: the session to use for backend calls. a new session is created if none is supplied.
+        :param streaming_threshold_bytes: minimum audio size for streamed uploads.
+        :param blob_store: enables reference uploads. audio of at least `reference_threshold_bytes` is stored there,
+        from a worker thread, and the backend fetches it from its URL.
+        :param reference_threshold_bytes: minimum audio size for reference uploads.
+        :param deployments: spreads transcriptions across several deployments. `model_key` is then only used to check
+        untagged ids.
+        :raises ValueError: when an unsupported `whisper_model` name is supplied.
+        """
+        self._api_key = api_key
+        self._model_key = model_key
+        self._whisper_model = validate_model(whisper_model)
+        self._session = session or AsyncBananaSession()
+        self._streaming_threshold_bytes = streaming_threshold_bytes
+        self._blob_store = blob_store
+        self._reference_threshold_bytes = reference_threshold_bytes
+        self._pool = deployments
+        self._sessions: Dict[str, AsyncBananaSession] = {}
+        for deployment in deployments.deployments if deployments else []:
+            self._sessions[deployment.model_key] = self._session.for_endpoint(
+                deployment.endpoint or self._session.endpoint
+            )
+
+    async def __aenter__(self) -> "AsyncWhisperClient":
+        """Enter an async context that closes the client on exit."""
+        return self
+
+    async def __aexit__(self, *exc):
+        """Close the client."""
+        await self.close()
+
+    async def start_transcription(
+        self,
+        raw_audio: Union[bytes, BinaryIO],
+        get_segments: bool = False,
+        word_timestamps: bool = False,
+    ) -> str:
+        """Request transcription of the supplied audio file.
+
+        :param raw_audio: the audio file bytes (unencoded), or a binary file containing them
+        :param get_segments: whether to include time-bounded segments in response ('segments').
+        :param word_timestamps: whether segments should include time-bounded words ('words').
+        :return: a transcription request identifier. this will be used to check on transcription status.
+        :raises Exception: when errors communicating with the backend model are encountered.
+        """
+
+        def build() -> Dict[str, Any]:
+            return audio_input(
+                raw_audio,
+                self._streaming_threshold_bytes,
+                self._blob_store,
+                self._reference_threshold_bytes,
+            )
+
+        # uploads block, so they run on a worker thread rather than stalling the event loop.
+        if self._blob_store is None:
+            audio = build()
+        else:
+            audio = await asyncio.get_running_loop().run_in_executor(None, metrics.wrap(build))
+        inputs = {**audio, **model_options(self._whisper_model, get_segments, word_timestamps)}
+        if self._pool is None:
+            return await self._session.start(self._api_key, self._model_key, inputs)
+
+        model_key = self._pool.choose().model_key
+        try:
+            call_id = await self._sessions[model_key].start(self._api_key, model_key, inputs)
+        except Exception as e:
+            self._pool.start_failed(model_key, e)
+            raise
+        self._pool.started(model_key, call_id)
+        return tag(model_key, call_id)
+
+    async def start_transcriptions(
+        self, raw_audios: List[bytes], get_segments: bool = False, word_timestamps: bool = False
+    ) -> List[str]:
+        """Request transcription of several audio files concurrently.
+
+        :return: the transcription request identifiers, in the same order as `raw_audios`.
+        :raises Exception: when any request could not be started.
+        """
+        return list(
+            await asyncio.gather(
+                *[self.start_transcription(a, get_segments, word_timestamps) for a in raw_audios]
+            )
+        )
+
+    async def check_transcription_request(self, transcription_id: str) -> Dict[str, Any]:
+        """Check on the status of an ongoing transcription.
+
+        :param transcription_id: the transcription request identifier that was returned from `start_transcription`
+        :return: the structured response from the backend. for details, see https://www.banana.dev/docs/rest-api
+        :raises ValueError: when the id was started on another deployment of a pool (see `whisper.pool.tag`).
+        :raises Exception: when errors communicating with the backend model are encountered.
+        """
+        model_key, call_id = untag(transcription_id)
+        if self._pool is not None and self._pool.get(model_key) is not None:
+            try:
+                out = await self._sessions[model_key].check(self._api_key, call_id)
+            except Exception as e:
+                self._pool.checked(model_key, call_id, error=e)
+                raise
+            self._pool.checked(model_key, call_id, out)
+            return out
+
+        if model_key is not None and model_key != self._model_key:
+            raise ValueError(
+                f"transcription {transcription_id} was started on deployment {model_key}; "
+                "check it with a client that pools that deployment"
+            )
+        return await self._session.check(self._api_key, call_id)
+
+    async def check_transcription_requests(
+        self, transcription_ids: List[str]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """Check on the status of several ongoing transcriptions concurrently.
+
+        :return: the structured response for each identifier, in order. A check that fails is represented by its
+        exception rather than raised.
+        """
+        return list(
+            await asyncio.gather(
+                *[self.check_transcription_request(t) for t in transcription_ids],
+                return_exceptions=True,
+            )
+        )
+
+    def backend_stats(self) -> Dict[str, Any]:
+        """Return the statistics of the hedged checks, circuit breaker and deployments, for those that are enabled."""
+        stats = self._session.stats()
+        if self._pool is not None:
+            stats["deployments"] = {
+                k: {**asdict(v), **self._sessions[k].stats()} for k, v in self._pool.stats().items()
+            }
+        return stats
+
+    async def close(self):
+        """Release the pooled connections held by this client."""
+        for session in self._sessions.values():
+            await session.close()
+        await self._session.close()
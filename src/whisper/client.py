@@ -1,9 +1,83 @@
 """Provides a thin client for a backend running a Whisper model."""
 
 import base64
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Any, BinaryIO, Dict, List, Optional, Union
 
 import banana_dev
+import metrics
+from audio import duration as audio_duration
+from banana_dev import BananaSession, StreamedBase64
+from blobs import BlobStore, blob_size
+from whisper.pool import DeploymentPool, tag, untag
+from whisper.routing import MODELS_BY_QUALITY, ModelRouter
+from whisper.warm import KeepWarm, Window
+
+# audio at least this large is streamed to the backend rather than encoded in memory.
+DEFAULT_STREAMING_THRESHOLD_BYTES = 8 * 1024 * 1024
+
+# with a blob store, audio at least this large is uploaded to it and the backend is sent its URL instead of its bytes.
+DEFAULT_REFERENCE_THRESHOLD_BYTES = 4 * 1024 * 1024
+
+# counts audio bytes sent to the backend by reference (as a blob store URL) rather than inline.
+REFERENCE_BYTES = "whisper_reference_upload_bytes_total"
+
+WHISPER_MODELS = MODELS_BY_QUALITY
+
+
+def validate_model(whisper_model: str) -> str:
+    """Return the normalized name of a whisper model.
+
+    :raises ValueError: when an unsupported `whisper_model` name is supplied.
+    """
+    if whisper_model.lower() not in WHISPER_MODELS:
+        raise ValueError(f"unknown whisper model requested: {whisper_model}")
+    return whisper_model.lower()
+
+
+def encode_audio(
+    raw_audio: Union[bytes, BinaryIO], streaming_threshold_bytes: int
+) -> Union[str, StreamedBase64]:
+    """Base64-encode audio for a request, deferring the encoding of large audio (and files) until it is sent."""
+    if not isinstance(raw_audio, (bytes, bytearray, memoryview)):
+        return StreamedBase64(raw_audio)
+    if len(raw_audio) >= streaming_threshold_bytes:
+        return StreamedBase64(raw_audio)
+    return base64.b64encode(raw_audio).decode("ISO-8859-1")
+
+
+def model_options(whisper_model: str, get_segments: bool, word_timestamps: bool) -> Dict[str, Any]:
+    """Build the transcription options included in the `modelInputs` of every request."""
+    options = {
+        "getSegments": get_segments,
+        "model": whisper_model,
+    }
+    if word_timestamps:
+        options["wordTimestamps"] = True
+    return options
+
+
+def audio_input(
+    raw_audio: Union[bytes, BinaryIO],
+    streaming_threshold_bytes: int,
+    blob_store: Optional[BlobStore] = None,
+    reference_threshold_bytes: int = DEFAULT_REFERENCE_THRESHOLD_BYTES,
+) -> Dict[str, Any]:
+    """Build the audio part of a transcription request.
+
+    With a blob store, audio of at least `reference_threshold_bytes` is uploaded and sent as its URL (`mp3Url`);
+    otherwise the audio is sent base64-encoded (`mp3BytesString`).
+    """
+    if blob_store is not None:
+        size = blob_size(raw_audio)
+        if size >= reference_threshold_bytes:
+            with metrics.span("upload"):
+                url = blob_store.put(raw_audio)
+            metrics.get_sink().increment(REFERENCE_BYTES, size)
+            return {"mp3Url": url}
+    with metrics.span("encode"):
+        return {"mp3BytesString": encode_audio(raw_audio, streaming_threshold_bytes)}
 
 
 class WhisperClient:
@@ -22,42 +96,204 @@ class WhisperClient:
     _whisper_model: str
       the whisper model to use for transcription purposes. choice of model will impact transcription time. MUST be one
       of `tiny, base, small, or medium`.
+    _session: banana_dev.BananaSession
+      the pooled, keep-alive HTTP session used for every backend call made by this client.
+    _streaming_threshold_bytes: int
+      audio of at least this many bytes is base64-encoded in chunks while the request body is streamed, instead of
+      being encoded (and JSON-serialized) in memory as a whole.
+    _max_parallel: int
+      the maximum number of backend calls made at once when starting or checking several transcriptions.
+    _router: Optional[ModelRouter]
+      in routing mode, picks a model for each request, up to `_whisper_model`, from the audio duration.
+    _blob_store: Optional[BlobStore]
+      where audio of at least `_reference_threshold_bytes` is uploaded, so that the backend is sent its URL
+      (`mp3Url`) instead of its base64 encoding.
+    _pool: Optional[DeploymentPool]
+      when set, each transcription is started on a deployment it chooses, instead of on `_model_key`, and its
+      transcription id is tagged with the deployment's model key (see `whisper.pool.tag`).
+    _sessions: Dict[str, banana_dev.BananaSession]
+      the session of each deployment, by model key. each is configured like `_session`, on the deployment's endpoint
+      (or that of `_session`), with its own hedger and circuit breaker.
+    _keep_warm: Optional[KeepWarm]
+      once `keep_warm` is called, pings the backend while it is idle so that it does not cold start.
     """
 
-    def __init__(self, api_key, model_key: str, whisper_model: str = "base"):
+    def __init__(
+        self,
+        api_key,
+        model_key: str,
+        whisper_model: str = "base",
+        session: Optional[BananaSession] = None,
+        streaming_threshold_bytes: int = DEFAULT_STREAMING_THRESHOLD_BYTES,
+        max_parallel: int = 8,
+        latency_budget_seconds: Optional[float] = None,
+        quality_floor: str = "tiny",
+        blob_store: Optional[BlobStore] = None,
+        reference_threshold_bytes: int = DEFAULT_REFERENCE_THRESHOLD_BYTES,
+        deployments: Optional[DeploymentPool] = None,
+    ):
         """Initialize client with appropriate keys.
 
         :param api_key: the API key to use for the backend
         :param model_key: the model key to use for the backend
         :param whisper_model: name of the whisper model to use for transcription (tiny, base, small, or medium)
+        :param session: the HTTP session to use for backend calls. a new session is created if none is supplied.
+        :param streaming_threshold_bytes: minimum audio size for streamed uploads.
+        :param max_parallel: maximum number of concurrent backend calls made by `start_transcriptions` and
+        `check_transcription_requests`.
+        :param latency_budget_seconds: enables routing mode. `route` then picks the most accurate model, from
+        `quality_floor` up to `whisper_model`, that is expected to finish within this many seconds.
+        :param quality_floor: the least accurate model that routing may pick.
+        :param blob_store: enables reference uploads. audio of at least `reference_threshold_bytes` is stored there,
+        and the backend fetches it from its URL.
+        :param reference_threshold_bytes: minimum audio size for reference uploads.
+        :param deployments: spreads transcriptions across several deployments. `model_key` is then unused.
         :raises ValueError: when an unsupported `whisper_model` name is supplied.
         """
         self._api_key = api_key
         self._model_key = model_key
+        self._session = session or BananaSession()
+        self._streaming_threshold_bytes = streaming_threshold_bytes
+        self._max_parallel = max_parallel
+        self._blob_store = blob_store
+        self._reference_threshold_bytes = reference_threshold_bytes
+        self._pool = deployments
+        self._sessions: Dict[str, BananaSession] = {}
+        for deployment in deployments.deployments if deployments else []:
+            self._sessions[deployment.model_key] = self._session.for_endpoint(
+                deployment.endpoint or self._session.endpoint
+            )
 
         # include for early validation / fast-failure.
-        if whisper_model.lower() not in ["tiny", "base", "small", "medium"]:
-            raise ValueError(f"unknown whisper model requested: {whisper_model}")
+        self._whisper_model = validate_model(whisper_model)
+        self._router: Optional[ModelRouter] = None
+        if latency_budget_seconds is not None:
+            self._router = ModelRouter(latency_budget_seconds, quality_floor, self._whisper_model)
+        self._keep_warm: Optional[KeepWarm] = None
 
-        self._whisper_model = whisper_model.lower()
+    def keep_warm(
+        self,
+        interval_seconds: float = 240.0,
+        windows: Optional[List[Window]] = None,
+        min_penalty_seconds: float = 5.0,
+    ) -> KeepWarm:
+        """Start pinging the backend from a background thread while it is idle, and return the component doing so.
 
-    def start_transcription(self, raw_audio: bytes, get_segments: bool = False) -> str:
-        """Request transcription of the supplied audio file.
+        Calling it again returns the component already running. See `whisper.warm.KeepWarm` for the parameters.
+        """
+        if self._keep_warm is None:
+            self._keep_warm = KeepWarm(self, interval_seconds, windows, min_penalty_seconds)
+            self._keep_warm.start()
+        return self._keep_warm
+
+    def route(self, raw_audio: bytes, audio_seconds: Optional[float] = None) -> str:
+        """Return the model to transcribe `raw_audio` with: the configured model, unless routing mode is enabled.
 
         :param raw_audio: the audio file bytes (unencoded)
+        :param audio_seconds: the duration the model must handle, when it is not that of `raw_audio` (e.g. one window
+        of audio that is transcribed in parallel windows). read from the audio when not supplied.
+        """
+        if self._router is None:
+            return self._whisper_model
+        if audio_seconds is None:
+            audio_seconds = audio_duration.estimate(raw_audio)
+        return self._router.choose(audio_seconds)
+
+    def record_completion(self, model: str, audio_seconds: float, elapsed_seconds: float) -> None:
+        """Teach routing mode that `audio_seconds` of audio took `elapsed_seconds` to transcribe with `model`."""
+        if self._router is not None:
+            self._router.table.observe(model, audio_seconds, elapsed_seconds)
+
+    def start_transcription(
+        self,
+        raw_audio: Union[bytes, BinaryIO],
+        get_segments: bool = False,
+        word_timestamps: bool = False,
+        whisper_model: Optional[str] = None,
+    ) -> str:
+        """Request transcription of the supplied audio file.
+
+        :param raw_audio: the audio file bytes (unencoded), or a binary file containing them
         :param get_segments: whether to include time-bounded segments in response ('segments').
+        :param word_timestamps: whether segments should include time-bounded words ('words').
+        :param whisper_model: the model to use instead of the client's (e.g. as chosen by `route`).
         :return: a transcription request identifier. this will be used to check on transcription status.
         :raises Exception: when errors communicating with the backend model are encountered. This includes successful
         requests that have "error" in a "message" field in their returned struct.
         """
-        encoded = base64.b64encode(raw_audio).decode("ISO-8859-1")
         model_payload = {
-            "mp3BytesString": encoded,
-            "getSegments": get_segments,
-            "model": self._whisper_model,
+            **self._audio_input(raw_audio),
+            **model_options(
+                validate_model(whisper_model) if whisper_model else self._whisper_model,
+                get_segments,
+                word_timestamps,
+            ),
         }
+        return self._start(model_payload)
 
-        return banana_dev.start(self._api_key, self._model_key, model_payload)
+    def start_transcriptions(
+        self,
+        raw_audios: List[bytes],
+        get_segments: bool = False,
+        word_timestamps: bool = False,
+        whisper_model: Optional[str] = None,
+    ) -> List[str]:
+        """Request transcription of several audio files concurrently.
+
+        :param raw_audios: the audio file bytes (unencoded) of each file
+        :param get_segments: whether to include time-bounded segments in response ('segments').
+        :param word_timestamps: whether segments should include time-bounded words ('words').
+        :param whisper_model: the model to use instead of the client's (e.g. as chosen by `route`).
+        :return: the transcription request identifiers, in the same order as `raw_audios`.
+        :raises Exception: when any request could not be started.
+        """
+
+        def start(raw_audio: bytes) -> str:
+            return self.start_transcription(raw_audio, get_segments, word_timestamps, whisper_model)
+
+        with ThreadPoolExecutor(max_workers=self._max_parallel) as executor:
+            return list(executor.map(metrics.wrap(start), raw_audios))
+
+    def start_batch_transcription(
+        self,
+        raw_audios: List[Union[bytes, BinaryIO]],
+        get_segments: bool = False,
+        word_timestamps: bool = False,
+    ) -> str:
+        """Request transcription of several audio files in a single backend request.
+
+        The backend transcribes every file in one pass and returns one entry in `modelOutputs` per file, in order;
+        see `whisper.response.get_batch_items`.
+
+        :param raw_audios: the audio file bytes (unencoded) of each file
+        :param get_segments: whether to include time-bounded segments in response ('segments').
+        :param word_timestamps: whether segments should include time-bounded words ('words').
+        :return: a transcription request identifier for the whole batch.
+        :raises Exception: when errors communicating with the backend model are encountered.
+        """
+        model_payload = {
+            "batch": [{"id": str(i), **self._audio_input(a)} for i, a in enumerate(raw_audios)],
+            **model_options(self._whisper_model, get_segments, word_timestamps),
+        }
+        return self._start(model_payload)
+
+    def start_batch_transcriptions(
+        self,
+        batches: List[List[Union[bytes, BinaryIO]]],
+        get_segments: bool = False,
+        word_timestamps: bool = False,
+    ) -> List[str]:
+        """Start several batch transcriptions concurrently.
+
+        :return: the transcription request identifiers, one per batch, in order.
+        :raises Exception: when any batch could not be started.
+        """
+
+        def start(raw_audios: List[Union[bytes, BinaryIO]]) -> str:
+            return self.start_batch_transcription(raw_audios, get_segments, word_timestamps)
+
+        with ThreadPoolExecutor(max_workers=self._max_parallel) as executor:
+            return list(executor.map(metrics.wrap(start), batches))
 
     def check_transcription_request(self, transcription_id: str) -> Dict[str, Any]:
         """Check on the status of an ongoing transcription.
@@ -67,4 +303,81 @@ class WhisperClient:
         :raises Exception: when errors communicating with the backend model are encountered. This includes successful
         requests that have "error" in a "message" field in their returned struct.
         """
-        return banana_dev.check(self._api_key, transcription_id)
+        # ids tagged by a deployment that is no longer pooled are still checked, on the client's own endpoint.
+        model_key, call_id = untag(transcription_id)
+        if self._pool is None or self._pool.get(model_key) is None:
+            return banana_dev.check(self._api_key, call_id, self._session)
+
+        try:
+            out = banana_dev.check(self._api_key, call_id, self._session_for(model_key))
+        except Exception as e:
+            self._pool.checked(model_key, call_id, error=e)
+            raise
+        self._pool.checked(model_key, call_id, out)
+        return out
+
+    def check_transcription_requests(
+        self, transcription_ids: List[str]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """Check on the status of several ongoing transcriptions concurrently.
+
+        :param transcription_ids: the transcription request identifiers to check
+        :return: the structured response for each identifier, in order. A check that fails is represented by its
+        exception rather than raised, so that one failure does not discard the results of the other checks.
+        """
+
+        def check(transcription_id: str) -> Union[Dict[str, Any], Exception]:
+            try:
+                return self.check_transcription_request(transcription_id)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self._max_parallel) as executor:
+            return list(executor.map(metrics.wrap(check), transcription_ids))
+
+    def _start(self, model_payload: Dict[str, Any]) -> str:
+        # starts a transcription on the configured model key, or on the deployment chosen by the pool.
+        if self._keep_warm is not None:
+            self._keep_warm.touch()
+        if self._pool is None:
+            return banana_dev.start(self._api_key, self._model_key, model_payload, self._session)
+
+        model_key = self._pool.choose().model_key
+        try:
+            call_id = banana_dev.start(
+                self._api_key, model_key, model_payload, self._session_for(model_key)
+            )
+        except Exception as e:
+            self._pool.start_failed(model_key, e)
+            raise
+        self._pool.started(model_key, call_id)
+        return tag(model_key, call_id)
+
+    def _session_for(self, model_key: str) -> BananaSession:
+        return self._sessions.get(model_key, self._session)
+
+    def _audio_input(self, raw_audio: Union[bytes, BinaryIO]) -> Dict[str, Any]:
+        return audio_input(
+            raw_audio,
+            self._streaming_threshold_bytes,
+            self._blob_store,
+            self._reference_threshold_bytes,
+        )
+
+    def backend_stats(self) -> Dict[str, Any]:
+        """Return the statistics of the hedged checks, circuit breaker and deployments, for those that are enabled."""
+        stats = self._session.stats()
+        if self._pool is not None:
+            stats["deployments"] = {
+                k: {**asdict(v), **self._session_for(k).stats()}
+                for k, v in self._pool.stats().items()
+            }
+        return stats
+
+    def close(self):
+        """Stop keeping the backend warm, and release the pooled connections held by this client."""
+        if self._keep_warm is not None:
+            self._keep_warm.stop()
+        for session in self._sessions.values():
+            session.close()
+        self._session.close()
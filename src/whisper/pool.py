@@ -0,0 +1,309 @@
+"""Spread transcriptions across several backend deployments (model keys), and drain the unhealthy ones."""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import banana_dev
+import metrics
+import whisper.response as whisper_response
+
+# how a deployment is chosen for each new transcription.
+STRATEGIES = ("least_outstanding", "latency")
+
+# counts deployments taken out of rotation after repeated failures, labelled with the deployment's model key.
+DEPLOYMENTS_DRAINED = "whisper_deployments_drained_total"
+
+# separates the model key from the backend call id in the transcription ids of pooled clients.
+_TAG_SEPARATOR = "/"
+
+
+@dataclass(frozen=True)
+class Deployment:
+    """One backend deployment of the whisper model.
+
+    Attributes
+    ----------
+    model_key : str
+        the key that identifies the deployment in the backend
+    weight : float
+        the deployment's share of concurrent transcriptions, relative to the others
+    endpoint : Optional[str]
+        base URL of the backend API serving it, or None for the client's own endpoint
+    """
+
+    model_key: str
+    weight: float = 1.0
+    endpoint: Optional[str] = None
+
+
+def parse_deployments(spec: str) -> List[Deployment]:
+    """Parse a comma-separated list of deployments.
+
+    Each entry is a model key, optionally followed (separated by spaces) by a weight and the URL of an endpoint, e.g.
+    `key-a 3, key-b 1 https://eu.example.com/`.
+
+    :raises ValueError: when an entry is malformed, a weight is not positive, or a model key appears twice.
+    """
+    deployments, keys = [], set()
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        model_key, weight, endpoint = None, 1.0, None
+        for token in entry.split():
+            if "://" in token:
+                endpoint = token
+                continue
+            try:
+                weight = float(token)
+            except ValueError:
+                if model_key is not None:
+                    raise ValueError(f"invalid deployment, expected one model key: {entry}")
+                model_key = token
+        if model_key is None or weight <= 0:
+            raise ValueError(
+                f"invalid deployment, expected a model key and a positive weight: {entry}"
+            )
+        if model_key in keys:
+            raise ValueError(f"model key listed twice: {model_key}")
+        keys.add(model_key)
+        deployments.append(Deployment(model_key, weight, endpoint))
+    return deployments
+
+
+def tag(model_key: str, call_id: str) -> str:
+    """Return the transcription id of backend call `call_id` made to the deployment `model_key`."""
+    return f"{model_key}{_TAG_SEPARATOR}{call_id}"
+
+
+def untag(transcription_id: str) -> Tuple[Optional[str], str]:
+    """Return the (model key, backend call id) of a transcription id; the key is None for untagged ids."""
+    model_key, separator, call_id = transcription_id.rpartition(_TAG_SEPARATOR)
+    return (model_key, call_id) if separator else (None, transcription_id)
+
+
+@dataclass
+class DeploymentStats:
+    """Counters describing one deployment.
+
+    Attributes
+    ----------
+    outstanding : int
+        transcriptions started on it by this process that have not been seen to finish
+    latency : Optional[float]
+        moving average of the time, in seconds, from start to success of its transcriptions
+    consecutive_failures : int
+        failed `start` and `check` calls since its last successful call
+    drained : bool
+        whether it is out of rotation
+    started : int
+        transcriptions started on it
+    drains : int
+        times it was taken out of rotation
+    """
+
+    outstanding: int = 0
+    latency: Optional[float] = None
+    consecutive_failures: int = 0
+    drained: bool = False
+    started: int = 0
+    drains: int = 0
+
+
+class DeploymentPool:
+    """Chooses a deployment for each new transcription.
+
+    With the "least_outstanding" strategy, the deployment with the fewest transcriptions in flight for its weight is
+    chosen; with "latency", the one whose recent transcriptions finished fastest (a deployment without any is tried
+    first). Ties go to the other measure, then to the order of `deployments`.
+
+    After `failure_threshold` consecutive calls that failed on connection errors or 5xx responses, a deployment is drained: no new transcription is sent to it for
+    `drain_seconds`, while the status of those already running is still checked. It then rejoins the rotation, and is
+    drained again at its next failure unless a call succeeds first. When every deployment is drained, the one that
+    rejoins soonest is used.
+
+    Transcriptions are only counted by the process that started them, until they are seen to finish, are reported
+    to have failed, or `outstanding_ttl_seconds` have passed. One whose completion is only seen by another process
+    stays counted until then, so with several processes the load balanced is each process's own share.
+
+    Attributes
+    ----------
+    deployments : List[Deployment]
+        the deployments, in order of preference on ties
+    strategy : str
+        one of `STRATEGIES`
+    failure_threshold : int
+        consecutive failed calls that drain a deployment
+    drain_seconds : float
+        how long a drained deployment is out of rotation
+    """
+
+    def __init__(
+        self,
+        deployments: List[Deployment],
+        strategy: str = "least_outstanding",
+        failure_threshold: int = 3,
+        drain_seconds: float = 60.0,
+        outstanding_ttl_seconds: float = 60 * 60,
+        alpha: float = 0.3,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize a pool with no history.
+
+        :param deployments: the deployments, in order of preference on ties
+        :param strategy: one of `STRATEGIES`
+        :param failure_threshold: consecutive failed calls that drain a deployment
+        :param drain_seconds: how long a drained deployment is out of rotation
+        :param outstanding_ttl_seconds: how long a started transcription counts as outstanding unless seen to finish
+        :param alpha: weight given to each new latency in the moving average
+        :param clock: returns the current time, in seconds
+        :raises ValueError: when there are no deployments, or the strategy is unknown.
+        """
+        if not deployments:
+            raise ValueError("at least one deployment is required")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown deployment strategy: {strategy}")
+        self.deployments = deployments
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.drain_seconds = drain_seconds
+        self._outstanding_ttl_seconds = outstanding_ttl_seconds
+        self._alpha = alpha
+        self._clock = clock
+        self._by_key = {d.model_key: d for d in deployments}
+        self._stats = {d.model_key: DeploymentStats() for d in deployments}
+        # the start time of each outstanding transcription, by call id, and the end of any drain, by model key.
+        self._started_at: Dict[str, Dict[str, float]] = {d.model_key: {} for d in deployments}
+        self._drained_until = {d.model_key: 0.0 for d in deployments}
+        self._lock = threading.Lock()
+
+    def get(self, model_key: Optional[str]) -> Optional[Deployment]:
+        """Return the deployment with `model_key`, or None if it is not in the pool."""
+        return self._by_key.get(model_key) if model_key is not None else None
+
+    def choose(self) -> Deployment:
+        """Return the deployment to start the next transcription on."""
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            healthy = [d for d in self.deployments if self._drained_until[d.model_key] <= now]
+            if not healthy:
+                return min(self.deployments, key=lambda d: self._drained_until[d.model_key])
+            return min(healthy, key=self._score)
+
+    def started(self, model_key: str, call_id: str) -> None:
+        """Record that a transcription was started on a deployment."""
+        with self._lock:
+            self._started_at[model_key][call_id] = self._clock()
+            self._stats[model_key].started += 1
+            self._stats[model_key].consecutive_failures = 0
+
+    def finished(self, model_key: str, call_id: str) -> None:
+        """Record that a transcription started on a deployment was seen to finish successfully."""
+        with self._lock:
+            stats = self._stats[model_key]
+            stats.consecutive_failures = 0
+            started_at = self._started_at[model_key].pop(call_id, None)
+            if started_at is not None:
+                latency = self._clock() - started_at
+                previous = stats.latency
+                stats.latency = (
+                    latency if previous is None else previous + self._alpha * (latency - previous)
+                )
+
+    def succeeded(self, model_key: str) -> None:
+        """Record a successful call to a deployment, which ends its run of failures."""
+        with self._lock:
+            self._stats[model_key].consecutive_failures = 0
+
+    def abandoned(self, model_key: str, call_id: str) -> None:
+        """Record that a transcription started on a deployment was reported to have failed.
+
+        The deployment answered, so this ends its run of failures, but the transcription's latency is not recorded.
+        """
+        with self._lock:
+            self._started_at[model_key].pop(call_id, None)
+            self._stats[model_key].consecutive_failures = 0
+
+    def failed(self, model_key: str) -> None:
+        """Record a call to a deployment that failed on a connection error or 5xx response.
+
+        The deployment is drained once it has failed too often in a row.
+        """
+        with self._lock:
+            stats = self._stats[model_key]
+            stats.consecutive_failures += 1
+            now = self._clock()
+            if (
+                stats.consecutive_failures < self.failure_threshold
+                or self._drained_until[model_key] > now
+            ):
+                return
+            self._drained_until[model_key] = now + self.drain_seconds
+            stats.drains += 1
+            failures = stats.consecutive_failures
+        logging.error(
+            f"draining deployment model_key={model_key} for {self.drain_seconds:.0f}s "
+            f"after {failures} consecutive failures"
+        )
+        metrics.get_sink().increment(DEPLOYMENTS_DRAINED, labels={"deployment": model_key})
+
+    def start_failed(self, model_key: str, error: Exception) -> None:
+        """Record a `start` call to a deployment that raised `error`. only server failures count toward draining."""
+        if banana_dev.is_server_failure(error):
+            self.failed(model_key)
+
+    def checked(
+        self,
+        model_key: str,
+        call_id: str,
+        out: Optional[Dict[str, Any]] = None,
+        error: Optional[Exception] = None,
+    ) -> None:
+        """Record the outcome of a status check on a deployment: its response `out`, or the `error` it raised.
+
+        A check that could not be answered leaves the transcription outstanding, and counts toward draining only on a
+        server failure. One reporting an error ends the transcription.
+        """
+        if error is None:
+            if whisper_response.is_success(out):
+                self.finished(model_key, call_id)
+            else:
+                self.succeeded(model_key)
+        elif not banana_dev.is_transient(error):
+            self.abandoned(model_key, call_id)
+        elif banana_dev.is_server_failure(error):
+            self.failed(model_key)
+
+    def stats(self) -> Dict[str, DeploymentStats]:
+        """Return the counters of each deployment, by model key."""
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            return {key: replace(stats) for key, stats in self._stats.items()}
+
+    def _score(self, deployment: Deployment) -> Tuple[float, float]:
+        load = (len(self._started_at[deployment.model_key]) + 1) / deployment.weight
+        latency = self._stats[deployment.model_key].latency or 0.0
+        return (load, latency) if self.strategy == "least_outstanding" else (latency, load)
+
+    def _expire(self, now: float) -> None:
+        # forgets transcriptions that were never seen to finish, and refreshes the derived counters.
+        cutoff = now - self._outstanding_ttl_seconds
+        for key, started_at in self._started_at.items():
+            for call_id in [c for c, t in started_at.items() if t <= cutoff]:
+                del started_at[call_id]
+            self._stats[key].outstanding = len(started_at)
+            self._stats[key].drained = self._drained_until[key] > now
+
+
+@lru_cache(maxsize=None)
+def get_shared_pool(
+    spec: str, strategy: str, failure_threshold: int, drain_seconds: float
+) -> DeploymentPool:
+    """Return the process-wide pool for the deployments listed in `spec`, so that its history is kept across requests.
+
+    :raises ValueError: when `spec` or `strategy` is invalid.
+    """
+    return DeploymentPool(parse_deployments(spec), strategy, failure_threshold, drain_seconds)
@@ -1,6 +1,7 @@
 """Utility methods for handling the whisper client response."""
 
-from typing import Any, Dict, List
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 
 def get_transcription(response: Dict[str, Any]) -> str:
@@ -29,6 +30,87 @@ def get_segments(response: Dict[str, Any]) -> List[Any]:
     return model_outputs[0].get("segments", [])
 
 
+class SegmentTable:
+    """Column-oriented segments: only the text and timing of each segment (and word) that assembly needs.
+
+    A backend segment carries token ids, log probabilities and other fields that are never used. The table keeps
+    segment texts in a list and times in typed arrays, so holding 10k segments costs a fraction of the decoded dicts.
+
+    Attributes
+    ----------
+    texts : List[str]
+        the text of each segment
+    starts, ends : array
+        the start and end time of each segment, in seconds
+    word_offsets : Optional[array]
+        with word timing, the index of each segment's first word in the word columns, plus a final end index
+    words : Optional[List[str]]
+        with word timing, the text of each word
+    word_starts, word_ends : Optional[array]
+        with word timing, the start and end time of each word, in seconds
+    """
+
+    __slots__ = ("texts", "starts", "ends", "word_offsets", "words", "word_starts", "word_ends")
+
+    def __init__(self, with_words: bool = False):
+        """Initialize an empty table, with word columns if `with_words`."""
+        self.texts: List[str] = []
+        self.starts = array("d")
+        self.ends = array("d")
+        self.word_offsets: Optional[array] = array("q", [0]) if with_words else None
+        self.words: Optional[List[str]] = [] if with_words else None
+        self.word_starts: Optional[array] = array("d") if with_words else None
+        self.word_ends: Optional[array] = array("d") if with_words else None
+
+    def __len__(self) -> int:
+        """Return the number of segments."""
+        return len(self.texts)
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Dict[str, Any]]) -> "SegmentTable":
+        """Build a table from whisper segment dicts, keeping word timing if any segment has it."""
+        segments = list(segments)
+        table = cls(with_words=any(segment.get("words") for segment in segments))
+        for segment in segments:
+            table.texts.append(segment["text"])
+            table.starts.append(segment["start"])
+            table.ends.append(segment["end"])
+            if table.words is not None:
+                for word in segment.get("words") or []:
+                    table.words.append(word["word"])
+                    table.word_starts.append(word["start"])
+                    table.word_ends.append(word["end"])
+                table.word_offsets.append(len(table.words))
+        return table
+
+    def segment_words(self, index: int) -> range:
+        """Return the indexes, in the word columns, of the words of segment `index`."""
+        if self.word_offsets is None:
+            return range(0)
+        return range(self.word_offsets[index], self.word_offsets[index + 1])
+
+    def remap(self, start: Callable[[float], float], end: Callable[[float], float]) -> None:
+        """Map every start time through `start` and every end time through `end`, in place.
+
+        An end time is never moved before its start time.
+        """
+        for starts, ends in [(self.starts, self.ends), (self.word_starts, self.word_ends)]:
+            if starts is None:
+                continue
+            for i in range(len(starts)):
+                starts[i] = start(starts[i])
+                ends[i] = max(starts[i], end(ends[i]))
+
+
+def get_segment_table(response: Dict[str, Any]) -> SegmentTable:
+    """Extract the segments of the backend response into a compact `SegmentTable`.
+
+    :param response: the response from `check_transcription_request()`
+    :return: the text and timing of every segment (and word, if timed words were returned)
+    """
+    return SegmentTable.from_segments(get_segments(response))
+
+
 def is_success(response: Dict[str, Any]) -> bool:
     """Determine if the backend has indicated the transcription completed successfully.
 
@@ -39,3 +121,33 @@ def is_success(response: Dict[str, Any]) -> bool:
     # modelOutputs field.
     message = response["message"].lower()
     return message == "success"
+
+
+def get_completed_at(response: Dict[str, Any]) -> Optional[float]:
+    """Return the time the backend reports for a completed transcription, in seconds since the epoch, if any.
+
+    :param response: the successful response from `check_transcription_request()`
+    :return: the response's `created` timestamp, or None when it is missing or not a number.
+    """
+    created = response.get("created")
+    if isinstance(created, bool) or not isinstance(created, (int, float)):
+        return None
+    return float(created)
+
+
+def get_batch_items(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Split a successful batch response into one response per input file, in input order.
+
+    Each item is shaped like a single-file response, so `is_success`, `get_transcription`, and `get_segments` apply
+    to it. An input that failed on its own is reported with an error message, without affecting the other items.
+
+    :param response: the response from `check_transcription_request()` for a batch transcription
+    :return: the per-file responses
+    """
+    items = []
+    for output in response.get("modelOutputs") or []:
+        if output.get("error"):
+            items.append({"message": f"error: {output['error']}"})
+        else:
+            items.append({"message": "success", "modelOutputs": [output]})
+    return items
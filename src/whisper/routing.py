@@ -0,0 +1,59 @@
+"""Choose a whisper model per request from the audio duration and a latency budget."""
+
+from typing import List, Optional
+
+from throughput import ThroughputTable, shared_table
+
+# whisper models from fastest (least accurate) to slowest (most accurate).
+MODELS_BY_QUALITY = ["tiny", "base", "small", "medium"]
+
+
+class ModelRouter:
+    """Picks the most accurate model that is expected to finish within a latency budget.
+
+    Expected processing times come from a `ThroughputTable`, which learns from observed completion times. When no model
+    in range fits the budget, the fastest one (the quality floor) is used.
+
+    Attributes
+    ----------
+    latency_budget_seconds : float
+        how long a transcription may take, from start to completion
+    models : List[str]
+        the candidate models, from the quality floor up to the quality ceiling
+    table : ThroughputTable
+        processing-time estimates
+    """
+
+    def __init__(
+        self,
+        latency_budget_seconds: float,
+        quality_floor: str = "tiny",
+        quality_ceiling: str = "medium",
+        table: Optional[ThroughputTable] = None,
+    ):
+        """Initialize a router.
+
+        :param latency_budget_seconds: how long a transcription may take, from start to completion
+        :param quality_floor: the least accurate model that may be used
+        :param quality_ceiling: the most accurate model that may be used
+        :param table: processing-time estimates. defaults to the process-wide table.
+        :raises ValueError: when a model name is unknown, or the floor is more accurate than the ceiling.
+        """
+        floor, ceiling = quality_floor.lower(), quality_ceiling.lower()
+        for model in (floor, ceiling):
+            if model not in MODELS_BY_QUALITY:
+                raise ValueError(f"unknown whisper model requested: {model}")
+        if MODELS_BY_QUALITY.index(floor) > MODELS_BY_QUALITY.index(ceiling):
+            raise ValueError(f"quality floor {floor} is above the quality ceiling {ceiling}")
+        self.latency_budget_seconds = latency_budget_seconds
+        self.models: List[str] = MODELS_BY_QUALITY[
+            MODELS_BY_QUALITY.index(floor) : MODELS_BY_QUALITY.index(ceiling) + 1
+        ]
+        self.table = table or shared_table()
+
+    def choose(self, audio_seconds: float) -> str:
+        """Return the model to transcribe `audio_seconds` of audio with."""
+        for model in reversed(self.models):
+            if self.table.estimate(model, audio_seconds) <= self.latency_budget_seconds:
+                return model
+        return self.models[0]
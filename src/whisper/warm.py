@@ -0,0 +1,274 @@
+"""Keep the backend warm between bursts of traffic, by sending it tiny synthetic transcriptions."""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import metrics
+import whisper.response as whisper_response
+from audio import wav
+
+if TYPE_CHECKING:
+    from whisper.client import WhisperClient
+
+# counts keep-warm decisions, labelled with the outcome: "pinged", "failed", "outside_window" or "not_worth_it".
+KEEP_WARM = "whisper_keep_warm_total"
+
+# a quarter second of silence: about 8 kB, and transcribed in well under a second.
+PING_AUDIO_SECONDS = 0.25
+
+# one minute-of-day range per traffic window; a window that ends before it starts wraps past midnight.
+Window = Tuple[int, int]
+
+
+def parse_windows(spec: str) -> List[Window]:
+    """Parse traffic windows written as comma-separated `HH:MM-HH:MM` ranges, in UTC.
+
+    :return: the (start, end) minute of the day of each window. an empty `spec` gives no windows.
+    :raises ValueError: when a range is malformed.
+    """
+    windows = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        try:
+            start, end = (datetime.strptime(t.strip(), "%H:%M") for t in part.split("-"))
+        except ValueError:
+            raise ValueError(f"invalid traffic window, expected HH:MM-HH:MM: {part}")
+        windows.append((start.hour * 60 + start.minute, end.hour * 60 + end.minute))
+    return windows
+
+
+def in_windows(windows: List[Window], now: float) -> bool:
+    """Return whether the epoch time `now` falls in any of `windows`, or True when there are none."""
+    if not windows:
+        return True
+    moment = datetime.fromtimestamp(now, timezone.utc)
+    minute = moment.hour * 60 + moment.minute
+    return any(
+        start <= minute < end if start <= end else minute >= start or minute < end
+        for start, end in windows
+    )
+
+
+class ColdStartModel:
+    """Learns how the time from `start` to a successful `check` grows with the time the backend was left idle.
+
+    Observations are grouped by idle time into doubling buckets (under 2s, 2-4s, 4-8s, ...), each holding an
+    exponentially-weighted moving average of latency. The fastest bucket is taken as the warm latency, and the cold-start
+    penalty of an idle time is how much slower than that its bucket is.
+
+    Attributes
+    ----------
+    alpha : float
+        weight given to each new observation
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        """Initialize a model with no observations.
+
+        :param alpha: weight given to each new observation
+        """
+        self.alpha = alpha
+        self._latencies: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bucket(idle_seconds: float) -> int:
+        """Return the bucket of `idle_seconds`."""
+        return max(0, int(math.log2(max(idle_seconds, 1.0))))
+
+    def observe(self, idle_seconds: float, latency_seconds: float) -> None:
+        """Record that a request made after `idle_seconds` of idleness succeeded `latency_seconds` after its start."""
+        key = self.bucket(idle_seconds)
+        with self._lock:
+            previous = self._latencies.get(key)
+            if previous is None:
+                self._latencies[key] = latency_seconds
+            else:
+                self._latencies[key] = previous + self.alpha * (latency_seconds - previous)
+
+    def penalty(self, idle_seconds: float) -> Optional[float]:
+        """Return the expected extra latency after `idle_seconds` of idleness, or None if it was never observed."""
+        with self._lock:
+            latency = self._latencies.get(self.bucket(idle_seconds))
+            if latency is None:
+                return None
+            return latency - min(self._latencies.values())
+
+
+@dataclass
+class WarmStats:
+    """Counters describing a keep-warm component.
+
+    Attributes
+    ----------
+    pings : int
+        synthetic transcriptions that succeeded
+    failures : int
+        synthetic transcriptions that failed
+    outside_window : int
+        pings skipped because they fell outside every traffic window
+    not_worth_it : int
+        pings skipped because the learned cold-start penalty of waiting was below the threshold
+    """
+
+    pings: int = 0
+    failures: int = 0
+    outside_window: int = 0
+    not_worth_it: int = 0
+
+
+class KeepWarm:
+    """Pings the backend with tiny synthetic transcriptions while it is idle, so that real requests find it warm.
+
+    Every `interval_seconds` within the traffic windows, the component considers a ping if the backend has been idle
+    (no transcription started by the client, and no ping) for at least `interval_seconds`. Each ping is timed from
+    `start` to a successful `check`, which teaches a `ColdStartModel` the cost of idleness (except the first, sent
+    after an unknown idle time). The ping is sent when:
+
+    - the penalty of the current idle time has not been observed yet, so that the model keeps learning; or
+    - the penalty of idling until the next opportunity (or of the current idle time) is at least `min_penalty_seconds`.
+
+    Otherwise, the backend stays warm (or cold starts are cheap) at this idle time, so a ping is not worth its cost.
+
+    Attributes
+    ----------
+    interval_seconds : float
+        time between ping opportunities, and the idle time below which no ping is sent
+    windows : List[Window]
+        the daily UTC traffic windows pings are confined to. empty means always.
+    min_penalty_seconds : float
+        the smallest expected cold-start penalty that justifies a ping
+    model : ColdStartModel
+        the learned relation between idle time and latency
+    stats : WarmStats
+        counters of pings and skipped pings
+    """
+
+    def __init__(
+        self,
+        client: "WhisperClient",
+        interval_seconds: float = 240.0,
+        windows: Optional[List[Window]] = None,
+        min_penalty_seconds: float = 5.0,
+        poll_seconds: float = 1.0,
+        timeout_seconds: float = 600.0,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """Initialize a keep-warm component for `client`. No pings are sent until `tick` is called or `start`ed.
+
+        :param client: the client whose backend is kept warm
+        :param interval_seconds: time between ping opportunities, and the idle time below which no ping is sent
+        :param windows: the daily UTC traffic windows pings are confined to. pings may be sent at any time when omitted.
+        :param min_penalty_seconds: the smallest expected cold-start penalty that justifies a ping
+        :param poll_seconds: interval between status checks of a ping
+        :param timeout_seconds: how long a ping may take before it is counted as failed
+        :param clock: returns the current time, in seconds since the epoch
+        :param sleep: function used to wait between status checks of a ping
+        """
+        self.interval_seconds = interval_seconds
+        self.windows = windows or []
+        self.min_penalty_seconds = min_penalty_seconds
+        self.model = ColdStartModel()
+        self.stats = WarmStats()
+        self._client = client
+        self._poll_seconds = poll_seconds
+        self._timeout_seconds = timeout_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._audio = wav.silent(PING_AUDIO_SECONDS)
+        self._created = clock()
+        # None until the client is used or pinged: until then, the backend may have been idle for any length of time.
+        self._last_activity: Optional[float] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def touch(self) -> None:
+        """Note that the backend was just used, so it is warm."""
+        self._last_activity = self._clock()
+
+    def idle_seconds(self) -> float:
+        """Return the time since the backend was last used, or since this component was created."""
+        return self._clock() - (
+            self._created if self._last_activity is None else self._last_activity
+        )
+
+    def due(self) -> bool:
+        """Return whether a ping should be sent now, counting the reason when it should not."""
+        now, idle = self._clock(), self.idle_seconds()
+        if idle < self.interval_seconds:
+            return False
+        if not in_windows(self.windows, now):
+            self.stats.outside_window += 1
+            metrics.get_sink().increment(KEEP_WARM, labels={"outcome": "outside_window"})
+            return False
+        current = self.model.penalty(idle)
+        upcoming = self.model.penalty(idle + self.interval_seconds)
+        if current is None or max(current, upcoming or 0.0) >= self.min_penalty_seconds:
+            return True
+        self.stats.not_worth_it += 1
+        metrics.get_sink().increment(KEEP_WARM, labels={"outcome": "not_worth_it"})
+        return False
+
+    def tick(self) -> bool:
+        """Send a ping if one is due, waiting for it to finish.
+
+        :return: whether a ping was sent
+        """
+        if not self.due():
+            return False
+        self.ping()
+        return True
+
+    def ping(self) -> Optional[float]:
+        """Transcribe a fraction of a second of silence, and learn from how long it took.
+
+        :return: the time from `start` to a successful `check`, or None when the ping failed
+        """
+        started, idle = self._clock(), self.idle_seconds()
+        learn = self._last_activity is not None
+        try:
+            transcription_id = self._client.start_transcription(self._audio)
+            while True:
+                out = self._client.check_transcription_request(transcription_id)
+                if whisper_response.is_success(out):
+                    break
+                if self._clock() - started > self._timeout_seconds:
+                    raise TimeoutError(f"ping still running after {self._timeout_seconds:.0f}s")
+                self._sleep(self._poll_seconds)
+        except Exception as e:
+            logging.warning(f"keep-warm ping failed error={e}")
+            self.stats.failures += 1
+            metrics.get_sink().increment(KEEP_WARM, labels={"outcome": "failed"})
+            return None
+
+        latency = self._clock() - started
+        if learn:
+            self.model.observe(idle, latency)
+        self._last_activity = self._clock()
+        self.stats.pings += 1
+        metrics.get_sink().increment(KEEP_WARM, labels={"outcome": "pinged"})
+        logging.info(f"keep-warm ping idle={idle:.0f}s latency={latency:.1f}s")
+        return latency
+
+    def start(self) -> None:
+        """Call `tick` every `interval_seconds` from a daemon thread, until `stop` is called."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="keep-warm", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread started by `start`, without waiting for a ping in progress."""
+        self._stopped.set()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                self.tick()
+            except Exception as e:  # pragma: no cover - tick only fails on bugs; the thread must survive them.
+                logging.error(f"keep-warm tick failed error={e}")
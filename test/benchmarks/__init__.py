@@ -0,0 +1,10 @@
+"""Benchmarks, run as scripts from the repository root, e.g. `python -m test.benchmarks.bench_session`.
+
+These are not collected by pytest. Like `test/conftest.py`, importing this package puts `test` and `src` on the path.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.absolute()))
+sys.path.append(str(Path(__file__).parent.parent.parent.absolute() / "src"))
@@ -0,0 +1,62 @@
+"""Compare the original quadratic transcript assembly with the linear-time assembler.
+
+Run with `python -m test.benchmarks.bench_assembly`. The original loop is only timed up to 10k segments, beyond which
+it takes minutes.
+"""
+
+import random
+import time
+
+from test_assembly import legacy_assemble
+
+from assembly import assemble
+
+SIZES = [1_000, 10_000, 100_000]
+LEGACY_LIMIT = 10_000
+WORDS = ["why", "hello", "there", "general", "kenobi", "you", "are", "a", "bold", "one"]
+
+
+def synthetic_segments(count: int, seed: int = 0):
+    """Build `count` segments of 8-12 words each, with word timing."""
+    rng = random.Random(seed)
+    segments = []
+    now = 0.0
+    for _ in range(count):
+        words = []
+        for word in rng.choices(WORDS, k=rng.randint(8, 12)):
+            words.append({"start": now, "end": now + 0.3, "word": f" {word}"})
+            now += 0.3
+        text = "".join(w["word"] for w in words)
+        segments.append({"start": words[0]["start"], "end": now, "text": text, "words": words})
+    return segments
+
+
+def _time(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    """Run the benchmark."""
+    print(
+        f"{'segments':>9} {'legacy':>12} {'text':>10} {'seg tags':>10} {'word table':>11} {'word tags':>10}"
+    )
+    for size in SIZES:
+        segments = synthetic_segments(size)
+        legacy = "-"
+        if size <= LEGACY_LIMIT:
+            legacy = f"{_time(lambda: legacy_assemble(segments)):.1f}ms"
+        text_only = _time(lambda: assemble(segments))
+        with_tags = _time(lambda: assemble(segments).tags())
+        transcript = assemble(segments, words=True)
+        word_table = _time(lambda: assemble(segments, words=True))
+        word_tags = _time(lambda: transcript.words.to_tags(transcript.text))
+        print(
+            f"{size:>9} {legacy:>12} {text_only:>8.1f}ms {with_tags:>8.1f}ms {word_table:>9.1f}ms "
+            f"{word_tags:>8.1f}ms  ({len(transcript.words)} words)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Measure decoding of large `check` responses: JSON parsing, segment extraction, and assembly, with memory use.
+
+Run with `python -m test.benchmarks.bench_decode [segments ...]`. Each response is a synthetic whisper result whose
+segments carry the token ids and log probabilities the backend returns. The dict path parses with the standard library
+and keeps the decoded segment dicts; the columnar path parses with `banana_dev.codec` (orjson, when installed) and keeps
+only a `SegmentTable`.
+"""
+
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from assembly import assemble
+from banana_dev import codec
+from whisper import response as whisper_response
+
+SIZES = [10_000, 50_000]
+WORDS = ["why", "hello", "there", "general", "kenobi", "you", "are", "a", "bold", "one"]
+
+
+def synthetic_body(count: int, seed: int = 0) -> bytes:
+    """Build the JSON body of a successful `check` response with `count` segments."""
+    rng = random.Random(seed)
+    segments, now = [], 0.0
+    for i in range(count):
+        text = " " + " ".join(rng.choices(WORDS, k=rng.randint(8, 12)))
+        segments.append(
+            {
+                "id": i,
+                "seek": int(now * 100),
+                "start": now,
+                "end": now + 3.0,
+                "text": text,
+                "tokens": [rng.randint(0, 50000) for _ in range(rng.randint(10, 20))],
+                "temperature": 0.0,
+                "avg_logprob": -rng.random(),
+                "compression_ratio": 1 + rng.random(),
+                "no_speech_prob": rng.random() / 10,
+            }
+        )
+        now += 3.0
+    text = "".join(s["text"] for s in segments)
+    out = {"message": "success", "modelOutputs": [{"text": text, "segments": segments}]}
+    return json.dumps(out).encode("utf-8")
+
+
+def _time(fn, repeat: int = 3) -> float:
+    # best of `repeat` runs, in ms.
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def _memory(fn):
+    # returns the result, the peak MB allocated while running, and the MB still held by the result.
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 1e6, held / 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"fast json parser: {'orjson' if codec.FAST_JSON else 'unavailable (stdlib json)'}")
+    print(
+        f"{'segments':>9} {'body':>8} {'path':>8} {'parse':>9} {'extract':>9} {'assemble':>9} "
+        f"{'peak':>9} {'held':>9}"
+    )
+    for size in sizes:
+        body = synthetic_body(size)
+        for name, loads, extract in [
+            ("dicts", json.loads, whisper_response.get_segments),
+            ("columns", codec.loads, whisper_response.get_segment_table),
+        ]:
+            out = loads(body)
+            parse_ms = _time(lambda: loads(body))
+            extract_ms = _time(lambda: extract(out))
+            segments, peak, held = _memory(lambda: extract(loads(body)))
+            assemble_ms = _time(lambda: assemble(segments).tags())
+            print(
+                f"{size:>9} {len(body) / 1e6:>6.1f}MB {name:>8} {parse_ms:>7.1f}ms {extract_ms:>7.1f}ms "
+                f"{assemble_ms:>7.1f}ms {peak:>7.1f}MB {held:>7.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Measure audio fingerprinting throughput, and near-duplicate lookup time as the index grows.
+
+Run with `python -m test.benchmarks.bench_fingerprint [seconds]`.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from test_fingerprint import make_melody, reencode, to_wav
+
+import fingerprints
+from audio import fingerprint
+
+FORMATS = [(16000, 1), (44100, 2)]
+INDEX_SIZES = [10, 100, 1000]
+
+
+def main() -> None:
+    """Run the benchmark."""
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 600.0
+    melody = make_melody(seconds)
+
+    print(f"{'format':>14} {'audio':>8} {'time':>9} {'realtime':>9} {'fingerprint':>12}")
+    for rate, channels in FORMATS:
+        samples = melody if rate == 16000 else make_melody(seconds, rate)
+        data = to_wav(samples, rate, channels)
+        started = time.perf_counter()
+        fp = fingerprint.from_wav(data)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{f'{rate}Hz/{channels}ch':>14} {seconds:>7.0f}s {elapsed * 1000:>7.1f}ms "
+            f"{seconds / elapsed:>8.0f}x {fp.nbytes / 1e3:>10.1f}kB"
+        )
+
+    # entries are 60s each; the query is a re-encoded copy of one of them with its first 5s trimmed.
+    entries = [fingerprint.from_wav(to_wav(make_melody(60, seed=seed))) for seed in range(10)]
+    query = fingerprint.from_wav(reencode(make_melody(60, seed=3)[5 * 16000 :]))
+    print(f"\n{'entries':>8} {'add':>9} {'lookup':>9} {'offset':>8} {'similarity':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        index = fingerprints.FingerprintIndex(str(Path(directory) / "index.sqlite3"))
+        added = 0
+        for size in INDEX_SIZES:
+            started = time.perf_counter()
+            while added < size:
+                entry = index.add(entries[added % len(entries)], "base-segments")
+                index.complete(entry, {"segments": []})
+                added += 1
+            add_ms = (time.perf_counter() - started) * 1000 / size
+            started = time.perf_counter()
+            hit = index.lookup(query, "base-segments")
+            lookup_ms = (time.perf_counter() - started) * 1000
+            offset = f"{hit.offset_seconds:.3f}s" if hit else "-"
+            similarity = f"{hit.similarity:.3f}" if hit else "-"
+            print(f"{size:>8} {add_ms:>7.1f}ms {lookup_ms:>7.1f}ms {offset:>8} {similarity:>11}")
+
+
+if __name__ == "__main__":
+    main()
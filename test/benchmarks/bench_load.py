@@ -0,0 +1,169 @@
+"""Drive the plugin's `handler` end to end against a local stand-in for banana.dev, and report latency and throughput.
+
+Run with `python -m test.benchmarks.bench_load [options]` (see `--help`). Each task is a full plugin lifecycle: a
+`blockify` invocation followed by status-check invocations every `--poll-interval` seconds until the task finishes,
+exactly as the Steamship engine would drive it. The stub server runs in a child process so that it shares neither the
+GIL nor the peak RSS figure with the plugin.
+"""
+
+import argparse
+import base64
+import logging
+import multiprocessing
+import resource
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from stub_banana import StubBanana, segment_outputs
+from test_audio import make_wav
+
+from api import handler
+
+
+def _serve(conn, stub_kwargs: Dict[str, Any]) -> None:
+    with StubBanana(**stub_kwargs) as stub:
+        conn.send(stub.endpoint)
+        conn.recv()
+        conn.send((len(stub.requests), stub.errors))
+
+
+def _event(config: Dict[str, Any], arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "clientConfig": {
+            "apiKey": "benchmark",
+            "workspaceHandle": "benchmark",
+            "workspaceId": "benchmark",
+        },
+        "invocation": {
+            "httpVerb": "POST",
+            "invocationPath": "blockify",
+            "config": config,
+            "arguments": arguments,
+        },
+        "loggingConfig": {"loggingHost": "none", "loggingPort": "none"},
+        "invocationContext": {},
+    }
+
+
+class _Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.invocations: List[float] = []
+        self.tasks: List[float] = []
+        self.failures = 0
+
+    def invoke(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = handler(event)
+        with self.lock:
+            self.invocations.append((time.perf_counter() - started) * 1000)
+        return result
+
+
+def _run_task(
+    recorder: _Recorder, config: Dict[str, Any], audio: str, poll_interval: float
+) -> None:
+    started = time.perf_counter()
+    arguments = {"data": {"data": audio, "defaultMimeType": "audio/wav"}, "isStatusCheck": False}
+    result = recorder.invoke(_event(config, arguments))
+    while (result.get("status") or {}).get("state") == "running":
+        time.sleep(poll_interval)
+        arguments = {"status": result["status"], "isStatusCheck": True}
+        result = recorder.invoke(_event(config, arguments))
+    with recorder.lock:
+        if (result.get("status") or {}).get("state") == "failed":
+            recorder.failures += 1
+        else:
+            recorder.tasks.append((time.perf_counter() - started) * 1000)
+
+
+def _percentiles(name: str, timings: List[float]) -> str:
+    if not timings:
+        return f"{name}: -"
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    return f"{name}: p50={cuts[49]:.1f}ms p95={cuts[94]:.1f}ms p99={cuts[98]:.1f}ms max={max(timings):.1f}ms"
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--tasks", type=int, default=200, help="number of transcription tasks to run"
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="tasks in flight at once")
+    parser.add_argument(
+        "--audio-seconds", type=float, default=30.0, help="length of the WAV audio per task"
+    )
+    parser.add_argument(
+        "--segments", type=int, default=20, help="segments in each canned transcription"
+    )
+    parser.add_argument(
+        "--queue-delay", type=float, default=0.5, help="seconds until a backend call finishes"
+    )
+    parser.add_argument(
+        "--long-poll", type=float, default=0.0, help="seconds a check of a running call is held"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of backend calls that fail"
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=0.25, help="seconds between status checks"
+    )
+    parser.add_argument(
+        "--word-timestamps", action="store_true", help="request and tag word timing"
+    )
+    args = parser.parse_args()
+
+    # the steamship package configures root logging on import; the handler logs every response at INFO.
+    logging.getLogger().setLevel(logging.CRITICAL)
+    stub_kwargs = {
+        "model_outputs": segment_outputs(args.segments),
+        "queue_delay": args.queue_delay,
+        "long_poll": args.long_poll,
+        "error_rate": args.error_rate,
+    }
+    conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve, args=(child_conn, stub_kwargs), daemon=True)
+    server.start()
+    endpoint = conn.recv()
+
+    config = {
+        "whisper_model": "base",
+        "get_segments": True,
+        "word_timestamps": args.word_timestamps,
+        "banana_dev_endpoint": endpoint,
+    }
+    audio = base64.b64encode(make_wav(args.audio_seconds, rate=16000)).decode("ascii")
+    recorder = _Recorder()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [
+            pool.submit(_run_task, recorder, config, audio, args.poll_interval)
+            for _ in range(args.tasks)
+        ]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    conn.send("stop")
+    backend_calls, injected_errors = conn.recv()
+    server.join()
+
+    print(
+        f"tasks={args.tasks} concurrency={args.concurrency} audio={args.audio_seconds:.0f}s "
+        f"queue_delay={args.queue_delay}s long_poll={args.long_poll}s error_rate={args.error_rate}"
+    )
+    print(_percentiles("task latency      ", recorder.tasks))
+    print(_percentiles("invocation latency", recorder.invocations))
+    print(
+        f"throughput: {len(recorder.tasks) / elapsed:.1f} tasks/s {len(recorder.invocations) / elapsed:.1f} "
+        f"invocations/s, {backend_calls} backend calls ({injected_errors} injected errors), "
+        f"{recorder.failures} failed tasks"
+    )
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
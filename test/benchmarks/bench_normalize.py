@@ -0,0 +1,36 @@
+"""Measure the bytes saved and time spent by pre-upload audio normalization.
+
+Run with `python -m test.benchmarks.bench_normalize [seconds]`.
+"""
+
+import sys
+import time
+
+from test_audio import make_tone
+
+from audio import normalize
+from banana_dev.streaming import StreamedBase64
+
+FORMATS = [(48000, 2, 2), (44100, 2, 2), (48000, 2, 3), (22050, 1, 2), (16000, 1, 2)]
+
+
+def main() -> None:
+    """Run the benchmark."""
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 60.0
+    print(f"{'format':>18} {'input':>10} {'output':>10} {'upload saved':>13} {'time':>9}")
+    for rate, channels, sample_width in FORMATS:
+        data = make_tone(seconds, rate, channels, 440, sample_width)
+        started = time.perf_counter()
+        normalized = normalize.normalize(data)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        output = normalized or data
+        saved = len(StreamedBase64(data)) - len(StreamedBase64(output))
+        label = f"{rate}Hz/{channels}ch/{8 * sample_width}bit"
+        print(
+            f"{label:>18} {len(data) / 1e6:>8.2f}MB {len(output) / 1e6:>8.2f}MB "
+            f"{saved / 1e6:>11.2f}MB {elapsed_ms:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare per-call latency of banana `check` calls with and without a pooled session.
+
+Run with `python -m test.benchmarks.bench_session [calls]`. The stub server is plain HTTP on localhost, so the
+difference shown here is only the TCP handshake; against the real API each unpooled call also pays for TLS.
+"""
+
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+import requests
+from stub_banana import StubBanana
+
+import banana_dev
+from banana_dev import BananaSession
+
+
+class _UnpooledSession(BananaSession):
+    """Mimics the original transport: a bare `requests.post` per call."""
+
+    def _post(self, route, payload, read_timeout):
+        return requests.post(self.endpoint + route, json=payload, timeout=read_timeout)
+
+
+def _measure(call: Callable[[], None], calls: int) -> List[float]:
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _report(name: str, timings: List[float], connections: int) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{name:>10}: mean={statistics.mean(timings):.3f}ms p50={statistics.median(timings):.3f}ms "
+        f"p95={p95:.3f}ms connections={connections}"
+    )
+
+
+def main(calls: int = 500) -> None:
+    """Run the benchmark."""
+    for name, session_cls in [("unpooled", _UnpooledSession), ("pooled", BananaSession)]:
+        with StubBanana() as stub:
+            session = session_cls(endpoint=stub.endpoint)
+            timings = _measure(lambda: banana_dev.check("key", "call-1", session), calls)
+            session.close()
+            _report(name, timings, stub.connections)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
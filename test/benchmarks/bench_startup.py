@@ -0,0 +1,80 @@
+"""Measure the cold start of the plugin: import time, and the latency of the first and later `handler` invocations.
+
+Run with `python -m test.benchmarks.bench_startup [runs]`. Every run is a fresh interpreter, as in a serverless
+deployment. Each one imports `api`, then invokes `handler` with status checks for a transcription that the local
+banana.dev stand-in has already finished.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from stub_banana import StubBanana, segment_outputs
+
+ROOT = Path(__file__).parent.parent.parent
+WARM_CALLS = 20
+
+# run in the child interpreter: argv[1] is the stub endpoint.
+CHILD = """
+import json, logging, sys, time
+started = time.perf_counter()
+from api import handler
+imported = time.perf_counter()
+logging.getLogger().setLevel(logging.CRITICAL)
+
+config = {"whisper_model": "base", "get_segments": True, "banana_dev_endpoint": sys.argv[1]}
+status = {"state": "running", "remoteStatusInput": {"transcription_id": "call-1"}}
+event = {
+    "clientConfig": {"apiKey": "benchmark", "workspaceHandle": "benchmark", "workspaceId": "benchmark"},
+    "invocation": {
+        "httpVerb": "POST",
+        "invocationPath": "blockify",
+        "config": config,
+        "arguments": {"status": status, "isStatusCheck": True},
+    },
+    "loggingConfig": {"loggingHost": "none", "loggingPort": "none"},
+    "invocationContext": {},
+}
+timings = []
+for _ in range(int(sys.argv[2]) + 1):
+    call_started = time.perf_counter()
+    assert handler(event)["status"]["state"] == "succeeded"
+    timings.append(time.perf_counter() - call_started)
+print(json.dumps({"import": imported - started, "first": timings[0], "warm": timings[1:]}))
+"""
+
+
+def main(runs: int = 10) -> None:
+    """Run the benchmark."""
+    imports, firsts, warms, processes = [], [], [], []
+    with StubBanana(segment_outputs(20)) as stub:
+        for _ in range(runs):
+            started = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, "-c", CHILD, stub.endpoint, str(WARM_CALLS)],
+                cwd=ROOT / "src",
+                capture_output=True,
+                check=True,
+                text=True,
+            )
+            processes.append(time.perf_counter() - started)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            imports.append(result["import"])
+            firsts.append(result["first"])
+            warms.extend(result["warm"])
+
+    def ms(values):
+        return f"median={statistics.median(values) * 1000:.1f}ms max={max(values) * 1000:.1f}ms"
+
+    print(f"runs={runs}")
+    print(f"import api:               {ms(imports)}")
+    print(f"first invocation:         {ms(firsts)}")
+    print(f"later invocations:        {ms(warms)}")
+    print(f"interpreter start to end: {ms(processes)}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,71 @@
+"""Compare inline (base64) and reference (blob store URL) uploads of large audio.
+
+Run with `python -m test.benchmarks.bench_upload [megabytes ...]`. The backend and the blob store are local stubs over
+plain HTTP, so times reflect encoding and copying rather than network bandwidth. Against a real deployment, the
+reference path sends a third fewer bytes and the blob can be uploaded close to where the backend runs.
+"""
+
+import os
+import sys
+import time
+from typing import Callable, List
+
+from stub_banana import StubBanana
+from stub_blobs import StubBlobServer
+
+from banana_dev import BananaSession
+from blobs import HttpBlobStore
+from whisper.client import WhisperClient
+
+
+def _best_ms(call: Callable[[], None], runs: int = 3) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def _report(name: str, size: int, request_bytes: int, upload_bytes: int, elapsed_ms: float) -> None:
+    print(
+        f"{size / 1e6:>7.0f}MB {name:>16} {request_bytes / 1e3:>11.1f}kB {upload_bytes / 1e6:>10.2f}MB "
+        f"{(request_bytes + upload_bytes) / 1e6:>10.2f}MB {elapsed_ms:>9.1f}ms"
+    )
+
+
+def main(sizes: List[int]) -> None:
+    """Run the benchmark."""
+    print(
+        f"{'audio':>9} {'mode':>16} {'start body':>14} {'blob upload':>12} {'total sent':>12} {'time':>11}"
+    )
+    for megabytes in sizes:
+        audio = os.urandom(megabytes * 1_000_000)
+        with StubBanana() as stub, StubBlobServer() as blob_server:
+            stub.max_parsed_body = 1024 * 1024
+            session = BananaSession(endpoint=stub.endpoint)
+            inline = WhisperClient("key", "model", session=session)
+            elapsed = _best_ms(lambda: inline.start_transcription(audio))
+            _report("inline", len(audio), stub.body_sizes[-1], 0, elapsed)
+
+            store = HttpBlobStore(blob_server.endpoint)
+            reference = WhisperClient("key", "model", session=session, blob_store=store)
+
+            # the stub forgets every blob before each run, so that every run uploads it.
+            def first_upload() -> None:
+                blob_server.blobs.clear()
+                reference.start_transcription(audio)
+
+            elapsed = _best_ms(first_upload)
+            uploaded = store.stats.bytes_uploaded // 3
+            _report("reference", len(audio), stub.body_sizes[-1], uploaded, elapsed)
+
+            # an unchanged blob is found with a HEAD request and not uploaded again.
+            elapsed = _best_ms(lambda: reference.start_transcription(audio))
+            _report("reference repeat", len(audio), stub.body_sizes[-1], 0, elapsed)
+            store.close()
+            session.close()
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 8, 32])
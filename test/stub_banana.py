@@ -0,0 +1,185 @@
+"""A local stand-in for the banana.dev HTTP API, for use in tests and benchmarks."""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+DEFAULT_OUTPUTS = [{"text": "why, hello there!"}]
+
+
+def segment_outputs(count: int, seconds: float = 2.0) -> List[Dict[str, Any]]:
+    """Build canned `modelOutputs` with `count` consecutive segments of `seconds` each."""
+    segments = [
+        {"start": i * seconds, "end": (i + 1) * seconds, "text": f" segment number {i}."}
+        for i in range(count)
+    ]
+    return [{"text": "".join(s["text"] for s in segments), "segments": segments}]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stub.lock:
+            self.server.stub.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):  # noqa: N802
+        stub = self.server.stub
+        length = int(self.headers.get("Content-Length") or 0)
+        if stub.max_parsed_body is not None and length > stub.max_parsed_body:
+            # drain large bodies without holding them, so the stub does not skew memory measurements.
+            remaining = length
+            while remaining > 0:
+                remaining -= len(self.rfile.read(min(remaining, 64 * 1024)))
+            payload = {}
+        else:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        with stub.lock:
+            stub.body_sizes.append(length)
+            stub.in_flight += 1
+            stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+        try:
+            if self.path.startswith("/check/"):
+                if stub.check_delay:
+                    time.sleep(stub.check_delay)
+                stub.wait_for(payload.get("callID"))
+            status, out = stub.handle(self.path, payload)
+        finally:
+            with stub.lock:
+                stub.in_flight -= 1
+        data = json.dumps(out).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubBanana:
+    """Serves `start/v4/` and `check/v4/` on localhost from a background thread.
+
+    Attributes
+    ----------
+    endpoint : str
+        the base URL to pass to a `BananaSession`
+    connections : int
+        number of TCP connections accepted so far
+    requests : List[Dict[str, Any]]
+        (path, payload) of every request received
+    check_failures : List[int]
+        status codes to return, in order, before `check` calls start succeeding
+    body_sizes : List[int]
+        the `Content-Length` of every request received
+    max_parsed_body : Optional[int]
+        request bodies larger than this are read and discarded rather than parsed
+    check_delay : float
+        seconds each `check` call waits before answering, simulating a long poll
+    max_in_flight : int
+        the largest number of requests that were being handled at the same time
+    queue_delay : float
+        seconds after `start` before a call's outputs are ready; until then, `check` reports it as running
+    long_poll : float
+        seconds a `check` of a running call is held open waiting for it to finish, like the real API's `longPoll`
+    error_rate : float
+        fraction of `start` and `check` calls, chosen at random, that fail with a 500
+    errors : int
+        number of errors injected so far
+    cold_start_seconds : float
+        extra seconds before the outputs of a call started while the backend is cold are ready
+    warm_seconds : float
+        how long the backend stays warm after the outputs of its last call are ready. it starts cold.
+    cold_starts : int
+        number of calls that were started while the backend was cold
+    """
+
+    def __init__(
+        self,
+        model_outputs: Optional[List[Dict[str, Any]]] = None,
+        queue_delay: float = 0.0,
+        long_poll: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        cold_start_seconds: float = 0.0,
+        warm_seconds: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.model_outputs = model_outputs or DEFAULT_OUTPUTS
+        self.queue_delay = queue_delay
+        self.long_poll = long_poll
+        self.error_rate = error_rate
+        self.errors = 0
+        self.cold_start_seconds = cold_start_seconds
+        self.warm_seconds = warm_seconds
+        self.cold_starts = 0
+        self._warm_until = 0.0
+        self._clock = clock
+        self._random = random.Random(seed)
+        self._ready_at: Dict[str, float] = {}
+        self.connections = 0
+        self.requests = []
+        self.check_failures: List[int] = []
+        self.body_sizes: List[int] = []
+        self.max_parsed_body: Optional[int] = None
+        self.check_delay = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self.endpoint = f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def __enter__(self) -> "StubBanana":
+        """Start serving requests."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        """Stop serving requests and close the listening socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def wait_for(self, call_id: Optional[str]) -> None:
+        """Hold a `check` of a running call for up to `long_poll` seconds, until the call is ready."""
+        with self.lock:
+            ready_at = self._ready_at.get(call_id, 0.0)
+        remaining = ready_at - self._clock()
+        if self.long_poll and remaining > 0:
+            time.sleep(min(remaining, self.long_poll))
+
+    def handle(self, path: str, payload: Dict[str, Any]):
+        """Return the (status code, JSON body) for a request."""
+        with self.lock:
+            self.requests.append((path, payload))
+            if path.startswith("/check/") and self.check_failures:
+                return self.check_failures.pop(0), {"message": "unavailable"}
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return 500, {"message": "error: injected failure"}
+
+            if path.startswith("/start/"):
+                call_id = str(uuid4())
+                now = self._clock()
+                ready_at = now + self.queue_delay
+                if self.cold_start_seconds and now > self._warm_until:
+                    self.cold_starts += 1
+                    ready_at += self.cold_start_seconds
+                self._ready_at[call_id] = ready_at
+                self._warm_until = max(self._warm_until, ready_at + self.warm_seconds)
+                return 200, {"message": "", "callID": call_id}
+            if path.startswith("/check/"):
+                # calls this stub did not start are treated as finished.
+                if self._ready_at.get(payload.get("callID"), 0.0) > self._clock():
+                    return 200, {"message": "", "callID": payload.get("callID")}
+                return 200, {"message": "success", "modelOutputs": self.model_outputs}
+        return 404, {"message": "error: not found"}
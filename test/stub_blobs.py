@@ -0,0 +1,82 @@
+"""A local stand-in for an HTTP blob store, for use in tests and benchmarks."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_PUT(self):  # noqa: N802
+        stub = self.server.stub
+        data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with stub.lock:
+            stub.blobs[self.path] = data
+            stub.uploads.append(self.path)
+            stub.authorizations.append(self.headers.get("Authorization"))
+        self._reply(201, b"")
+
+    def do_DELETE(self):  # noqa: N802
+        with self.server.stub.lock:
+            data = self.server.stub.blobs.pop(self.path, None)
+        self._reply(404 if data is None else 204, b"")
+
+    def do_HEAD(self):  # noqa: N802
+        with self.server.stub.lock:
+            data = self.server.stub.blobs.get(self.path)
+        self._reply(404 if data is None else 200, b"", 0 if data is None else len(data))
+
+    def do_GET(self):  # noqa: N802
+        with self.server.stub.lock:
+            data = self.server.stub.blobs.get(self.path)
+        self._reply(404, b"") if data is None else self._reply(200, data)
+
+    def _reply(self, status: int, data: bytes, length: int = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data) if length is None else length))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+
+class StubBlobServer:
+    """Accepts `PUT` uploads and serves them back with `GET` and `HEAD`, on localhost from a background thread.
+
+    Attributes
+    ----------
+    endpoint : str
+        the base URL to pass to an `HttpBlobStore`
+    blobs : Dict[str, bytes]
+        the uploaded blobs, by URL path
+    uploads : List[str]
+        the URL path of every upload received
+    authorizations : List[Optional[str]]
+        the `Authorization` header of every upload received
+    """
+
+    def __init__(self):
+        self.blobs: Dict[str, bytes] = {}
+        self.uploads: List[str] = []
+        self.authorizations: List[Optional[str]] = []
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self.endpoint = f"http://127.0.0.1:{self._server.server_address[1]}/blobs/"
+
+    def __enter__(self) -> "StubBlobServer":
+        """Start serving requests."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        """Stop serving requests and close the listening socket."""
+        self._server.shutdown()
+        self._server.server_close()
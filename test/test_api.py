@@ -1,6 +1,9 @@
 """Unit tests for the whisper-s2t-blockifier."""
 
+import time
 from typing import Any, Dict
+from urllib.parse import urlparse
+from urllib.request import urlopen
 
 import pytest
 from steamship import Block, File, SteamshipError
@@ -9,8 +12,17 @@ from steamship.invocable import InvocableResponse
 from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
 from steamship.plugin.outputs.block_and_tag_plugin_output import BlockAndTagPluginOutput
 from steamship.plugin.request import PluginRequest
+from stub_banana import StubBanana, segment_outputs
+from stub_blobs import StubBlobServer
+from test_audio import make_speech, make_tone, make_wav, read_mono
+from test_batching import make_zip
+from test_fingerprint import make_melody, reencode, to_wav
+from test_polling import FakeClock
 
-from api import WhisperBlockifier, tag
+import metrics
+import tag
+from api import WhisperBlockifier
+from throughput import ThroughputTable
 
 NEW_TRANSCRIPTION_ID = "foo-new1234"
 NEW_TRANSCRIPTION_REQUEST = PluginRequest[RawDataPluginInput]()
@@ -131,7 +143,9 @@ class MockWhisperClient:
         },
     }
 
-    def start_transcription(self, raw_audio: bytes, use_segments: bool) -> str:
+    def start_transcription(
+        self, raw_audio: bytes, use_segments: bool, word_timestamps: bool, whisper_model=None
+    ) -> str:
         """Mock method."""
         return NEW_TRANSCRIPTION_ID
 
@@ -203,3 +217,738 @@ def test_run(plugin_request, expected_response, get_segments, want_exception, mo
         assert got_response == expected_response, "run() produced incorrect results"
     except SteamshipError as e:
         assert want_exception is True, f"run() produced unexpected exception: {str(e)}"
+
+
+def test_run_cached(mocker, tmp_path):
+    """A second request for the same audio is answered from the cache without calling the backend."""
+    config = {
+        "whisper_model": "base",
+        "get_segments": False,
+        "cache_results": True,
+        "cache_dir": str(tmp_path),
+    }
+    blockifier = WhisperBlockifier(config=config)
+    client = MockWhisperClient()
+    mocker.patch.object(blockifier, "_client", client)
+    start = mocker.spy(client, "start_transcription")
+
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(data=b"some audio", defaultMimeType="audio/wav")
+    request.is_status_check = False
+    got_response = blockifier.run(request)
+    cache_key = got_response.status.remote_status_input["cache_key"]
+    assert start.call_count == 1
+
+    status_request = PluginRequest[RawDataPluginInput]()
+    status_request.is_status_check = True
+    status_request.status = Task(
+        state=TaskState.running,
+        remote_status_input={"transcription_id": COMPLETE_TRANSCRIPTION_ID, "cache_key": cache_key},
+    )
+    assert blockifier.run(status_request) == COMPLETE_RESPONSE
+
+    blockifier = WhisperBlockifier(config=config)
+    mocker.patch.object(blockifier, "_client", client)
+    assert blockifier.run(request) == COMPLETE_RESPONSE
+    assert start.call_count == 1
+
+
+def test_run_cached_split_blocks(mocker, tmp_path):
+    """Results are cached separately with and without `split_blocks`, as they are built into different blocks."""
+    config = {
+        "whisper_model": "base",
+        "get_segments": True,
+        "cache_results": True,
+        "cache_dir": str(tmp_path),
+    }
+    split_config = {**config, "split_blocks": True, "block_max_chars": 12}
+    client = MockWhisperClient()
+    start = mocker.spy(client, "start_transcription")
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(data=b"some audio", defaultMimeType="audio/wav")
+    request.is_status_check = False
+
+    blocks = {}
+    for name, blockifier_config in [("whole", config), ("split", split_config)]:
+        blockifier = WhisperBlockifier(config=blockifier_config)
+        mocker.patch.object(blockifier, "_client", client)
+        cache_key = blockifier.run(request).status.remote_status_input["cache_key"]
+        status_request = PluginRequest[RawDataPluginInput]()
+        status_request.is_status_check = True
+        status_request.status = Task(
+            state=TaskState.running,
+            remote_status_input={"transcription_id": COMPLETE_SEGMENTS_ID, "cache_key": cache_key},
+        )
+        blockifier.run(status_request)
+        blocks[name] = [b.text for b in blockifier.run(request).data.file.blocks]
+
+    assert start.call_count == 2
+    assert blocks == {"whole": ["why, hello there!"], "split": ["why, hello", "there!"]}
+
+
+def test_run_completed_store(mocker, tmp_path):
+    """Repeated status checks of a finished transcription are answered without calling the backend."""
+    config = {
+        "whisper_model": "base",
+        "get_segments": False,
+        "store_completed": True,
+        "completed_dir": str(tmp_path),
+    }
+    client = MockWhisperClient()
+    check = mocker.spy(client, "check_transcription_request")
+    status_request = PluginRequest[RawDataPluginInput]()
+    status_request.is_status_check = True
+    status_request.status = Task(
+        state=TaskState.running,
+        remote_status_input={"transcription_id": COMPLETE_TRANSCRIPTION_ID},
+    )
+
+    for _ in range(3):
+        blockifier = WhisperBlockifier(config=config)
+        mocker.patch.object(blockifier, "_client", client)
+        assert blockifier.run(status_request) == COMPLETE_RESPONSE
+    assert check.call_count == 1
+
+
+class MockWindowedWhisperClient:
+    """Mock client that transcribes each window of a 25-second recording, one window per status check."""
+
+    window_segments = [
+        [
+            {"start": 1.0, "end": 8.5, "text": " why, hello"},
+            {"start": 8.5, "end": 10.0, "text": " th"},
+        ],
+        [
+            {"start": 0.5, "end": 3.0, "text": " there!"},
+            {"start": 8.5, "end": 10.5, "text": " how"},
+        ],
+        [{"start": 1.0, "end": 3.0, "text": " how are you?"}],
+    ]
+
+    def __init__(self):
+        self.checks = 0
+
+    def start_transcriptions(self, raw_audios, get_segments, word_timestamps, whisper_model=None):
+        """Mock method."""
+        assert get_segments is True
+        return [f"window-{i}" for i in range(len(raw_audios))]
+
+    def check_transcription_requests(self, transcription_ids):
+        """Mock method."""
+        self.checks += 1
+        outs = []
+        for transcription_id in transcription_ids:
+            i = int(transcription_id.split("-")[1])
+            if i >= self.checks:
+                outs.append({"message": "transcription is running"})
+            else:
+                segments = self.window_segments[i]
+                outs.append({"message": "success", "modelOutputs": [{"segments": segments}]})
+        return outs
+
+
+def test_run_windowed(mocker):
+    """Long audio is transcribed in overlapping windows whose segments are stitched into one block."""
+    config = {
+        "whisper_model": "base",
+        "get_segments": True,
+        "split_long_audio": True,
+        "long_audio_window_seconds": 10,
+        "long_audio_overlap_seconds": 2,
+    }
+    blockifier = WhisperBlockifier(config=config)
+    mocker.patch.object(blockifier, "_client", MockWindowedWhisperClient())
+
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(data=make_wav(25), defaultMimeType="audio/wav")
+    request.is_status_check = False
+    response = blockifier.run(request)
+    while response.status is not None and response.status.state == TaskState.running:
+        assert len(response.status.remote_status_input["windows"]) == 3
+        status_request = PluginRequest[RawDataPluginInput]()
+        status_request.is_status_check = True
+        status_request.status = response.status
+        response = blockifier.run(status_request)
+
+    text = "why, hello there! how are you?"
+    assert response == InvocableResponse(
+        data=BlockAndTagPluginOutput(
+            file=File.CreateRequest(
+                blocks=[
+                    Block.CreateRequest(
+                        text=text,
+                        tags=[
+                            tag.create_timestamp(0, 1.0, 8.5, "why, hello"),
+                            tag.create_timestamp(11, 8.5, 11.0, "there!"),
+                            tag.create_timestamp(18, 17.0, 19.0, "how are you?"),
+                        ],
+                    )
+                ]
+            )
+        )
+    )
+
+
+def test_run_windowed_word_timestamps(mocker):
+    """Windows request word timing only when segments are returned, like a single request does."""
+    for get_segments in [False, True]:
+        config = {
+            "whisper_model": "base",
+            "get_segments": get_segments,
+            "word_timestamps": True,
+            "split_long_audio": True,
+            "long_audio_window_seconds": 10,
+            "long_audio_overlap_seconds": 2,
+        }
+        blockifier = WhisperBlockifier(config=config)
+        client = MockWindowedWhisperClient()
+        mocker.patch.object(blockifier, "_client", client)
+        start = mocker.spy(client, "start_transcriptions")
+        request = PluginRequest[RawDataPluginInput]()
+        request.data = RawDataPluginInput(data=make_wav(25), defaultMimeType="audio/wav")
+        request.is_status_check = False
+        blockifier.run(request)
+        assert start.call_args.args[2] is get_segments
+
+
+def test_run_adaptive_polling(mocker):
+    """An imminent transcription is waited on in-process; a distant one returns an ETA hint."""
+    blockifier = WhisperBlockifier(
+        config={"whisper_model": "base", "get_segments": False, "adaptive_polling": True}
+    )
+    client = MockWhisperClient()
+    mocker.patch.object(blockifier, "_client", client)
+    clock = FakeClock()
+    mocker.patch.object(blockifier._polling, "clock", clock)
+    mocker.patch.object(blockifier._polling, "sleep", clock.sleep)
+    mocker.patch.object(blockifier._polling, "table", ThroughputTable({"base": 0.1}, 10.0))
+
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(data=make_wav(600), defaultMimeType="audio/wav")
+    request.is_status_check = False
+    response = blockifier.run(request)
+    status_input = response.status.remote_status_input
+    assert status_input["audio_seconds"] == 600
+    assert status_input["eta_seconds"] == 70
+    assert status_input["next_check_seconds"] == 35
+    assert clock.sleeps == []
+
+    # the job is seconds from completion: wait in-process and check once more.
+    clock.now += 67
+    checks = iter(
+        [
+            {"message": "transcription is running"},
+            client.ids_to_responses[COMPLETE_TRANSCRIPTION_ID],
+        ]
+    )
+    mocker.patch.object(client, "check_transcription_request", lambda _: next(checks))
+    status_request = PluginRequest[RawDataPluginInput]()
+    status_request.is_status_check = True
+    status_request.status = response.status
+    assert blockifier.run(status_request) == COMPLETE_RESPONSE
+    assert clock.sleeps == [pytest.approx(3)]
+    assert blockifier._polling.table["base"].observations == 1
+
+
+def test_run_routed(mocker):
+    """In routing mode the model is picked from the audio duration and recorded with the task."""
+    blockifier = WhisperBlockifier(
+        config={
+            "whisper_model": "medium",
+            "get_segments": False,
+            "route_models": True,
+            "routing_latency_budget_seconds": 60,
+        }
+    )
+    client = MockWhisperClient()
+    mocker.patch.object(blockifier, "_client", client)
+    client.route = lambda raw_audio, audio_seconds: "tiny" if audio_seconds > 300 else "medium"
+    client.record_completion = mocker.Mock()
+    start = mocker.spy(client, "start_transcription")
+
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(data=make_wav(600), defaultMimeType="audio/wav")
+    request.is_status_check = False
+    response = blockifier.run(request)
+    assert response.status.remote_status_input["model"] == "tiny"
+    assert start.call_args.args[-1] == "tiny"
+
+    status_request = PluginRequest[RawDataPluginInput]()
+    status_request.is_status_check = True
+    status_request.status = Task(
+        state=TaskState.running,
+        remote_status_input={
+            **response.status.remote_status_input,
+            "transcription_id": COMPLETE_TRANSCRIPTION_ID,
+        },
+    )
+    assert blockifier.run(status_request) == COMPLETE_RESPONSE
+    assert client.record_completion.call_args.args[:2] == ("tiny", 600)
+
+
+@pytest.mark.parametrize(
+    "data,error",
+    [
+        (b"", "empty"),
+        (b"definitely not audio", "not a valid"),
+        (make_wav(0), "no audio"),
+        (make_wav(600), "too long"),
+    ],
+    ids=["empty", "corrupt", "silent", "too_long"],
+)
+def test_run_probe_rejects_bad_audio(mocker, data, error):
+    """With `probe_audio`, bad or oversized audio is rejected before anything is uploaded."""
+    blockifier = WhisperBlockifier(
+        config={
+            "whisper_model": "base",
+            "get_segments": False,
+            "probe_audio": True,
+            "max_audio_seconds": 300,
+        }
+    )
+    client = MockWhisperClient()
+    mocker.patch.object(blockifier, "_client", client)
+    start = mocker.spy(client, "start_transcription")
+
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(data=data, defaultMimeType="audio/wav")
+    request.is_status_check = False
+    with pytest.raises(SteamshipError, match=error):
+        blockifier.run(request)
+    assert start.call_count == 0
+
+    request.data = RawDataPluginInput(data=make_wav(60), defaultMimeType="audio/wav")
+    assert blockifier.run(request).status.state == TaskState.running
+
+    # audio in a format the probe cannot parse is sent unchecked.
+    request.data = RawDataPluginInput(data=b"latm", defaultMimeType="audio/mp4a-latm")
+    assert blockifier.run(request).status.state == TaskState.running
+
+
+def test_run_split_blocks(mocker):
+    """With `split_blocks`, the transcript is returned as several blocks, each with tags over its own text."""
+    config = {
+        "whisper_model": "base",
+        "get_segments": True,
+        "split_blocks": True,
+        "block_max_chars": 12,
+    }
+    blockifier = WhisperBlockifier(config=config)
+    mocker.patch.object(blockifier, "_client", MockWhisperClient())
+    blocks = blockifier.run(COMPLETE_SEGMENTS_REQUEST).data.file.blocks
+
+    assert [b.text for b in blocks] == ["why, hello", "there!"]
+    for split_block in blocks:
+        (timestamp,) = split_block.tags
+        assert (timestamp.start_idx, timestamp.end_idx) == (0, len(split_block.text))
+    assert blocks[1].tags[0].value == {"start_time": 2.30, "end_time": 4.0345}
+
+
+def test_run_normalized(mocker):
+    """With `normalize_audio`, 48 kHz stereo WAV audio is uploaded as 16 kHz mono."""
+    blockifier = WhisperBlockifier(
+        config={"whisper_model": "base", "get_segments": False, "normalize_audio": True}
+    )
+    client = MockWhisperClient()
+    mocker.patch.object(blockifier, "_client", client)
+    start = mocker.spy(client, "start_transcription")
+
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(data=make_tone(1, 48000, 2, 440), defaultMimeType="audio/wav")
+    request.is_status_check = False
+    blockifier.run(request)
+
+    rate, samples = read_mono(start.call_args.args[0])
+    assert (rate, samples.size) == (16000, 16000)
+
+
+def test_run_trimmed_silence(mocker):
+    """With `trim_silence`, long silences are cut before upload and segment times are mapped back onto the original."""
+    config = {"whisper_model": "base", "get_segments": True, "trim_silence": True}
+    blockifier = WhisperBlockifier(config=config)
+    client = MockWhisperClient()
+    mocker.patch.object(blockifier, "_client", client)
+    mocker.patch.object(client, "start_transcription", return_value=COMPLETE_SEGMENTS_ID)
+
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(
+        data=make_speech([(0.0, 1.0), (4.0, 6.0)], 6.0), defaultMimeType="audio/wav"
+    )
+    request.is_status_check = False
+    response = blockifier.run(request)
+
+    # 1.25s..3.75s is removed, so the backend transcribes 3.5s of audio.
+    rate, samples = read_mono(client.start_transcription.call_args.args[0])
+    assert samples.size / rate == pytest.approx(3.5)
+    times = [
+        (t.value["start_time"], t.value["end_time"]) for t in response.data.file.blocks[0].tags
+    ]
+    assert times == [pytest.approx((1.034, 4.8)), pytest.approx((4.8, 6.5345))]
+
+
+def test_run_collects_metrics():
+    """Each phase is timed, backend calls and payload bytes are counted, and status checks continue the trace."""
+    sink = metrics.MemorySink()
+    previous = metrics.set_sink(sink)
+    try:
+        with StubBanana(segment_outputs(2), queue_delay=0.3) as stub:
+            config = {
+                "whisper_model": "base",
+                "get_segments": True,
+                "collect_metrics": True,
+                "banana_dev_endpoint": stub.endpoint,
+            }
+            request = PluginRequest[RawDataPluginInput]()
+            request.data = RawDataPluginInput(data=make_wav(1), defaultMimeType="audio/wav")
+            request.is_status_check = False
+            response = WhisperBlockifier(config=config).run(request)
+            assert response.status.state == TaskState.running
+            trace_id = response.status.remote_status_input["trace_id"]
+
+            while response.status is not None and response.status.state == TaskState.running:
+                time.sleep(0.1)
+                status_request = PluginRequest[RawDataPluginInput]()
+                status_request.is_status_check = True
+                status_request.status = response.status
+                response = WhisperBlockifier(config=config).run(status_request)
+            exported = WhisperBlockifier(config=config).get_metrics()
+    finally:
+        metrics.set_sink(previous)
+
+    assert len(response.data.file.blocks[0].tags) == 2
+    runs = [s for s in sink.spans if s.name in ("blockify", "status_check")]
+    assert {s.trace_id for s in runs} == {trace_id}
+    assert all(s.attributes["transcription_id"] for s in runs)
+    for phase in [
+        "mime_check",
+        "preprocess",
+        "submit",
+        "encode",
+        "banana_start",
+        "banana_check",
+        "assembly",
+    ]:
+        assert sink.histogram(metrics.tracing.SPAN_SECONDS, span=phase, outcome="ok").count >= 1
+    assert sink.counter("whisper_backend_calls_total", call="check", outcome="success") == 1
+    assert sink.counter("whisper_payload_bytes_total", call="start", direction="sent") > len(
+        make_wav(1)
+    )
+    assert (
+        sink.counter("whisper_transcriptions_total", phase="status_check", outcome="succeeded") == 1
+    )
+    assert sink.histogram("whisper_transcription_seconds", model="base").count == 1
+    assert 'whisper_span_seconds_bucket{outcome="ok",span="submit",le="+Inf"} 1' in exported.data
+
+
+def test_blockifiers_share_process_state():
+    """Blockifiers with the same effective config share their config and client."""
+    first = WhisperBlockifier(config={"whisper_model": "base", "get_segments": True})
+    second = WhisperBlockifier(
+        config={"get_segments": True, "whisper_model": "base", "cache_dir": ""}
+    )
+    other = WhisperBlockifier(config={"whisper_model": "tiny", "get_segments": True})
+
+    assert first.config is second.config
+    assert first._client is second._client
+    assert other._client is not first._client
+    assert other.config.whisper_model == "tiny"
+
+
+def test_run_coalesced(mocker, tmp_path):
+    """Identical submissions share one backend transcription, even from separate blockifiers."""
+    config = {
+        "whisper_model": "base",
+        "get_segments": False,
+        "coalesce_submissions": True,
+        "coalesce_db_path": str(tmp_path / "inflight.sqlite3"),
+    }
+    client = MockWhisperClient()
+    start = mocker.spy(client, "start_transcription")
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(data=b"some audio", defaultMimeType="audio/wav")
+    request.is_status_check = False
+
+    responses = []
+    for _ in range(2):
+        blockifier = WhisperBlockifier(config=config)
+        mocker.patch.object(blockifier, "_client", client)
+        responses.append(blockifier.run(request))
+    assert start.call_count == 1
+    assert responses[0] == responses[1]
+
+    request.data = RawDataPluginInput(data=b"other audio", defaultMimeType="audio/wav")
+    blockifier.run(request)
+    assert start.call_count == 2
+
+
+def test_run_coalesced_failure_is_not_joined(mocker, tmp_path):
+    """Once the backend reports a coalesced transcription failed, an identical submission starts a new one."""
+    config = {
+        "whisper_model": "base",
+        "get_segments": False,
+        "coalesce_submissions": True,
+        "coalesce_db_path": str(tmp_path / "inflight.sqlite3"),
+    }
+    blockifier = WhisperBlockifier(config=config)
+    client = MockWhisperClient()
+    mocker.patch.object(blockifier, "_client", client)
+    mocker.patch.object(
+        client, "start_transcription", side_effect=[ERROR_TRANSCRIPTION_ID, NEW_TRANSCRIPTION_ID]
+    )
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(data=b"some audio", defaultMimeType="audio/wav")
+    request.is_status_check = False
+
+    with pytest.raises(SteamshipError):
+        blockifier.run(request)
+    response = blockifier.run(request)
+
+    assert client.start_transcription.call_count == 2
+    assert response.status.remote_status_input["transcription_id"] == NEW_TRANSCRIPTION_ID
+
+
+def test_run_scheduled(mocker, tmp_path):
+    """A submission that is not admitted in time is queued with a running status, and submitted by a status check."""
+    config = {
+        "whisper_model": "base",
+        "get_segments": False,
+        "schedule_submissions": True,
+        "submission_rate_per_second": 0.001,
+        "submission_burst": 1,
+        "submission_bulk_reserve": 0,
+        "submission_max_wait_seconds": 0,
+        "scheduler_db_path": str(tmp_path / "scheduler.sqlite3"),
+    }
+    blockifier = WhisperBlockifier(config=config)
+    client = MockWhisperClient()
+    mocker.patch.object(blockifier, "_client", client)
+    start = mocker.spy(client, "start_transcription")
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(data=b"some audio", defaultMimeType="audio/wav")
+    request.is_status_check = False
+
+    assert (
+        blockifier.run(request).status.remote_status_input["transcription_id"]
+        == NEW_TRANSCRIPTION_ID
+    )
+    request.data = RawDataPluginInput(data=b"more audio", defaultMimeType="audio/wav")
+    queued = blockifier.run(request)
+    assert queued.status.state == TaskState.running
+    assert "queued behind 0" in queued.status.remote_status_message
+    assert start.call_count == 1
+
+    status_request = PluginRequest[RawDataPluginInput]()
+    status_request.is_status_check = True
+    status_request.status = queued.status
+    assert blockifier.run(status_request).status.remote_status_input["queued"]
+    assert start.call_count == 1
+
+    blockifier._scheduler.rate_per_second = 1000
+    response = blockifier.run(status_request)
+    assert response.status.remote_status_input["transcription_id"] == NEW_TRANSCRIPTION_ID
+    assert "queued" not in response.status.remote_status_input
+    assert start.call_args.args[0] == b"more audio"
+
+    # the parked audio was discarded once it was submitted.
+    with pytest.raises(SteamshipError, match="no longer available"):
+        blockifier.run(status_request)
+    with pytest.raises(SteamshipError, match="submission_priority"):
+        WhisperBlockifier(config={**config, "submission_priority": "urgent"})
+
+
+class MockBatchWhisperClient:
+    """Mock client for batch transcriptions: the first batch succeeds (with one bad file), the second fails."""
+
+    def __init__(self):
+        self.batches = []
+
+    def start_batch_transcriptions(self, batches, get_segments, word_timestamps):
+        """Mock method."""
+        self.batches = batches
+        return [f"batch-{i}" for i in range(len(batches))]
+
+    def check_transcription_requests(self, transcription_ids):
+        """Mock method."""
+        outs = []
+        for transcription_id in transcription_ids:
+            if transcription_id == "batch-0":
+                outputs = [{"text": "why, hello there!"}, {"error": "could not decode audio"}]
+                outs.append({"message": "success", "modelOutputs": outputs})
+            else:
+                outs.append(Exception("ERROR: model crashed"))
+        return outs
+
+
+def test_run_batch(mocker):
+    """Files in an archive are packed into batches, and each file gets its own block."""
+    blockifier = WhisperBlockifier(
+        config={
+            "whisper_model": "base",
+            "get_segments": False,
+            "batch_mode": True,
+            "batch_max_items": 2,
+        }
+    )
+    client = MockBatchWhisperClient()
+    mocker.patch.object(blockifier, "_client", client)
+
+    request = PluginRequest[RawDataPluginInput]()
+    archive = make_zip([("a.wav", make_wav(1)), ("b.wav", b"garbage"), ("c.wav", make_wav(1))])
+    request.data = RawDataPluginInput(data=archive, defaultMimeType="application/zip")
+    request.is_status_check = False
+    response = blockifier.run(request)
+
+    assert [len(batch) for batch in client.batches] == [2, 1]
+    assert response == InvocableResponse(
+        data=BlockAndTagPluginOutput(
+            file=File.CreateRequest(
+                blocks=[
+                    Block.CreateRequest(
+                        text="why, hello there!", tags=[tag.create_source_file("a.wav")]
+                    ),
+                    Block.CreateRequest(
+                        text="",
+                        tags=[
+                            tag.create_source_file("b.wav"),
+                            tag.create_transcription_error("error: could not decode audio"),
+                        ],
+                    ),
+                    Block.CreateRequest(
+                        text="",
+                        tags=[
+                            tag.create_source_file("c.wav"),
+                            tag.create_transcription_error("ERROR: model crashed"),
+                        ],
+                    ),
+                ]
+            )
+        )
+    )
+
+
+def test_run_batch_requires_batch_mode():
+    """Archives are rejected unless batch mode is enabled."""
+    blockifier = WhisperBlockifier(config={"whisper_model": "base", "get_segments": False})
+    request = PluginRequest[RawDataPluginInput]()
+    request.data = RawDataPluginInput(
+        data=make_zip([("a.wav", b"")]), defaultMimeType="application/zip"
+    )
+    request.is_status_check = False
+    with pytest.raises(SteamshipError):
+        blockifier.run(request)
+
+
+def test_run_reference_upload():
+    """With reference uploads, large audio is stored in the blob store and the backend is sent its URL."""
+    audio = make_wav(1)
+    with StubBanana() as stub, StubBlobServer() as blob_server:
+        config = {
+            "whisper_model": "base",
+            "get_segments": False,
+            "banana_dev_endpoint": stub.endpoint,
+            "reference_upload": True,
+            "reference_threshold_bytes": 1024,
+            "blob_store_url": blob_server.endpoint,
+            "blob_ttl_seconds": 3600,
+        }
+        blockifier = WhisperBlockifier(config=config)
+        stale = blockifier._blob_store.put(b"old audio").rsplit("/", 1)[1]
+        blockifier._blob_store._stored_at[stale] -= 7200
+        request = PluginRequest[RawDataPluginInput]()
+        request.data = RawDataPluginInput(data=audio, defaultMimeType="audio/wav")
+        request.is_status_check = False
+        blockifier.run(request)
+
+        inputs = stub.requests[0][1]["modelInputs"]
+        assert "mp3BytesString" not in inputs
+        assert urlopen(inputs["mp3Url"]).read() == audio
+        # completing the transcription expired the blob stored before the TTL, and kept its own.
+        assert list(blob_server.blobs) == [urlparse(inputs["mp3Url"]).path]
+
+    # the backend cannot fetch from a local directory, so only http(s):// stores are accepted.
+    for url in ["", "file:///tmp/blobs", "s3://bucket/audio"]:
+        with pytest.raises(SteamshipError):
+            WhisperBlockifier(config={**config, "blob_store_url": url})
+
+
+def test_keep_warm_config():
+    """Keep-warm starts once for the process-wide client, with the configured traffic windows."""
+    config = {
+        "whisper_model": "base",
+        "get_segments": False,
+        "banana_dev_whisper_model_key": "keep-warm",
+        "keep_warm": True,
+        "keep_warm_windows": "08:00-18:00",
+    }
+    blockifier = WhisperBlockifier(config=config)
+    warm = blockifier._client._keep_warm
+    try:
+        assert warm.windows == [(480, 1080)]
+        assert WhisperBlockifier(config=config)._client._keep_warm is warm
+    finally:
+        warm.stop()
+
+    with pytest.raises(SteamshipError, match="keep_warm_windows"):
+        WhisperBlockifier(config={**config, "keep_warm_windows": "morning"})
+
+
+def test_run_model_key_pool():
+    """With a pool of model keys, the chosen key is carried in the status input and its endpoint is checked."""
+    with StubBanana(queue_delay=60) as first, StubBanana() as second:
+        config = {
+            "whisper_model": "base",
+            "get_segments": False,
+            "banana_dev_whisper_model_keys": f"key-a {first.endpoint}, key-b {second.endpoint}",
+        }
+        blockifier = WhisperBlockifier(config=config)
+        request = PluginRequest[RawDataPluginInput]()
+        request.data = RawDataPluginInput(data=make_wav(1), defaultMimeType="audio/wav")
+        request.is_status_check = False
+        running = blockifier.run(request)
+        done = blockifier.run(request)
+
+        status_request = PluginRequest[RawDataPluginInput]()
+        status_request.is_status_check = True
+        status_request.status = running.status
+        blockifier.run(status_request)
+
+    assert running.status.remote_status_input["transcription_id"].startswith("key-a/")
+    assert done.status.state == TaskState.succeeded
+    assert second.requests[0][1]["modelKey"] == "key-b"
+    assert [path for path, _ in first.requests].count("/check/v4/") == 2
+    assert [path for path, _ in second.requests].count("/check/v4/") == 1
+
+    with pytest.raises(SteamshipError, match="model key pool"):
+        WhisperBlockifier(config={**config, "model_key_strategy": "random"})
+
+
+def test_run_fingerprint_reuse(tmp_path):
+    """A re-encoded copy with its intro trimmed reuses the earlier transcript, retimed, without a backend call."""
+    melody = make_melody(30)
+    with StubBanana(model_outputs=segment_outputs(10, 3.0)) as stub:
+        config = {
+            "whisper_model": "base",
+            "get_segments": True,
+            "banana_dev_endpoint": stub.endpoint,
+            "fingerprint_cache": True,
+            "fingerprint_db_path": str(tmp_path / "fingerprints.sqlite3"),
+        }
+        blockifier = WhisperBlockifier(config=config)
+        request = PluginRequest[RawDataPluginInput]()
+        request.data = RawDataPluginInput(data=to_wav(melody), defaultMimeType="audio/wav")
+        request.is_status_check = False
+        first = blockifier.run(request)
+
+        request.data = RawDataPluginInput(
+            data=reencode(melody[6 * 16000 :]), defaultMimeType="audio/wav"
+        )
+        reused = blockifier.run(request)
+
+    assert [path for path, _ in stub.requests].count("/start/v4/") == 1
+    assert first.data.file.blocks[0].text.startswith("segment number 0.")
+    (reused_block,) = reused.data.file.blocks
+    assert reused_block.text.startswith("segment number 2.")
+    times = [t.value for t in reused_block.tags if t.kind == tag.TIMESTAMP]
+    assert len(times) == 8
+    assert times[0]["start_time"] == pytest.approx(0.0, abs=0.05)
+    assert times[1]["start_time"] == pytest.approx(3.0, abs=0.05)
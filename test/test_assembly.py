@@ -0,0 +1,152 @@
+"""Unit tests for transcript assembly."""
+
+import pytest
+
+import tag
+from assembly import assemble, split
+from whisper.response import SegmentTable
+
+SEGMENTS = [
+    {"start": 0.0, "end": 1.0, "text": " why, hello"},
+    {"start": 1.0, "end": 1.5, "text": "   "},
+    {"start": 1.5, "end": 3.0, "text": " there! "},
+]
+
+
+def legacy_assemble(segments):
+    """The original quadratic assembly loop, kept as the reference behaviour."""
+    tags = []
+    transcription_text = ""
+    for segment in segments:
+        segment_text = segment["text"].strip()
+        transcription_text = f"{transcription_text} {segment_text}".strip()
+        tags.append(
+            tag.create_timestamp(
+                len(transcription_text) - len(segment_text),
+                segment["start"],
+                segment["end"],
+                segment_text,
+            )
+        )
+    return transcription_text, tags
+
+
+@pytest.mark.parametrize(
+    "segments",
+    [SEGMENTS, SEGMENTS[1:], [], [{"start": 0.0, "end": 1.0, "text": ""}]],
+    ids=["mixed", "leading_blank", "none", "only_blank"],
+)
+def test_assemble_matches_legacy(segments):
+    """Text and segment tags are identical to those of the original implementation."""
+    transcript = assemble(segments)
+    assert (transcript.text, transcript.tags()) == legacy_assemble(segments)
+    assert transcript.words is None
+
+    table = assemble(SegmentTable.from_segments(segments))
+    assert (table.text, table.tags()) == legacy_assemble(segments)
+
+
+def test_assemble_words():
+    """Word tags cover each word's characters in the transcript."""
+    segments = [
+        {
+            "start": 0.0,
+            "end": 1.0,
+            "text": " why, hello",
+            "words": [
+                {"start": 0.0, "end": 0.4, "word": " why,"},
+                {"start": 0.5, "end": 1.0, "word": " hello"},
+            ],
+        },
+        {
+            "start": 1.0,
+            "end": 2.0,
+            "text": " hello there!",
+            "words": [
+                {"start": 1.0, "end": 1.4, "word": " hello"},
+                {"start": 1.4, "end": 1.6, "word": " missing"},
+                {"start": 1.6, "end": 2.0, "word": " there!"},
+            ],
+        },
+    ]
+    transcript = assemble(segments, words=True)
+    assert assemble(SegmentTable.from_segments(segments), words=True).tags() == transcript.tags()
+
+    assert transcript.text == "why, hello hello there!"
+    word_tags = [t for t in transcript.tags() if t.kind == tag.WORD_TIMESTAMP]
+    assert [(t.name, t.start_idx, t.end_idx) for t in word_tags] == [
+        ("why,", 0, 4),
+        ("hello", 5, 10),
+        ("hello", 11, 16),
+        ("there!", 17, 23),
+    ]
+    assert word_tags[-1].value == {"start_time": 1.6, "end_time": 2.0}
+    assert all(transcript.text[t.start_idx : t.end_idx] == t.name for t in transcript.tags())
+
+
+def _segments(gaps):
+    # one-second segments, each followed by the given pause.
+    segments, start = [], 0.0
+    for i, gap in enumerate(gaps):
+        segments.append(
+            {
+                "start": start,
+                "end": start + 1.0,
+                "text": f" segment {i:02d}.",
+                "words": [{"start": start, "end": start + 1.0, "word": f" {i:02d}."}],
+            }
+        )
+        start += 1.0 + gap
+    return segments
+
+
+def test_split_bounds_parts():
+    """Parts stay within both bounds, cover every segment once, and carry tags re-based onto their own text."""
+    segments = _segments([0.1] * 40)
+    transcript = assemble(segments, words=True)
+    parts = split(transcript, max_chars=60, max_seconds=100, pause_seconds=5)
+
+    assert " ".join(part.text for part in parts) == transcript.text
+    assert sum(len(part.segments) for part in parts) == len(segments)
+    for part in parts:
+        assert len(part.text) <= 60
+        for tag_ in part.tags():
+            assert part.text[tag_.start_idx : tag_.end_idx] == tag_.name
+        assert part.segments.start_times[0] >= 0
+    assert [t.name for t in parts[1].tags()][:2] == ["segment 05.", "segment 06."]
+    assert len(parts[1].words) == len(parts[1].segments)
+
+    by_duration = split(transcript, max_chars=10_000, max_seconds=10, pause_seconds=5)
+    assert all(p.segments.end_times[-1] - p.segments.start_times[0] <= 10 for p in by_duration)
+    assert split(transcript, 10_000, 10_000, 5)[0].text == transcript.text
+
+
+def test_split_prefers_pauses():
+    """A full part ends at the longest pause in its second half, and a long pause ends a half-full part early."""
+    gaps = [0.1] * 9
+    gaps[6] = 1.0
+    parts = split(
+        assemble(_segments(gaps + [0.1])), max_chars=10_000, max_seconds=9, pause_seconds=5
+    )
+    assert [len(p.segments) for p in parts] == [7, 3]
+
+    gaps = [0.1] * 9
+    gaps[2], gaps[5] = 6.0, 6.0
+    parts = split(
+        assemble(_segments(gaps + [0.1])), max_chars=10_000, max_seconds=20, pause_seconds=5
+    )
+    assert [len(p.segments) for p in parts] == [6, 4]
+
+
+def test_split_oversized_and_blank_segments():
+    """A segment larger than the bounds forms its own part, and blank segments never start a part with a space."""
+    segments = [
+        {"start": 0.0, "end": 1.0, "text": " short."},
+        {"start": 1.0, "end": 30.0, "text": " a very long segment indeed."},
+        {"start": 30.0, "end": 31.0, "text": " "},
+        {"start": 31.0, "end": 32.0, "text": " end."},
+    ]
+    parts = split(assemble(segments), max_chars=12, max_seconds=10, pause_seconds=5)
+    assert [p.text for p in parts] == ["short.", "a very long segment indeed.", "end."]
+    assert [(t.start_idx, t.end_idx) for t in parts[2].tags()] == [(0, 0), (0, 4)]
+    assert split(assemble([]), 10, 10, 5)[0].text == ""
@@ -0,0 +1,159 @@
+"""Unit tests for the asyncio client, run against a local stub server."""
+
+import asyncio
+import base64
+import time
+
+import pytest
+from stub_banana import StubBanana
+
+import banana_dev
+from banana_dev import AsyncBananaSession, BananaSession, CircuitBreaker, CircuitOpenError, Hedger
+from blobs import LocalBlobStore, blob_name
+from whisper.async_client import AsyncWhisperClient
+from whisper.pool import DeploymentPool, parse_deployments, tag, untag
+
+
+def test_start_and_check():
+    """Transcriptions can be started (with streamed audio) and checked."""
+    audio = bytes(range(256)) * 100
+
+    async def run(endpoint):
+        session = AsyncBananaSession(endpoint=endpoint)
+        async with AsyncWhisperClient(
+            "key", "model", session=session, streaming_threshold_bytes=0
+        ) as client:
+            transcription_id = await client.start_transcription(audio, get_segments=True)
+            return transcription_id, await client.check_transcription_request(transcription_id)
+
+    with StubBanana() as stub:
+        transcription_id, out = asyncio.run(run(stub.endpoint))
+
+    assert transcription_id
+    assert out["message"] == "success"
+    _, payload = stub.requests[0]
+    assert base64.b64decode(payload["modelInputs"]["mp3BytesString"]) == audio
+    assert payload["modelInputs"]["getSegments"] is True
+
+
+def test_concurrent_checks_are_capped():
+    """Hundreds of concurrent checks share a small pool and never exceed the in-flight limit."""
+
+    async def run(endpoint):
+        session = AsyncBananaSession(endpoint=endpoint, pool_size=10, max_in_flight=10)
+        async with AsyncWhisperClient("key", "model", session=session) as client:
+            return await client.check_transcription_requests([f"call-{i}" for i in range(200)])
+
+    with StubBanana() as stub:
+        stub.check_delay = 0.01
+        outs = asyncio.run(run(stub.endpoint))
+
+    assert [out["message"] for out in outs] == ["success"] * 200
+    assert stub.max_in_flight <= 10
+    assert stub.connections <= 10
+
+
+def test_check_retries_and_reports_errors():
+    """Retryable failures are retried; exhausted retries surface as server errors in place."""
+
+    async def run(endpoint):
+        session = AsyncBananaSession(endpoint=endpoint, check_retries=1, backoff_base=0.001)
+        async with AsyncWhisperClient("key", "model", session=session) as client:
+            first = await client.check_transcription_requests(["call-1"])
+            second = await client.check_transcription_requests(["call-2"])
+            return first + second
+
+    with StubBanana() as stub:
+        stub.check_failures = [503, 503, 503]
+        outs = asyncio.run(run(stub.endpoint))
+
+    assert isinstance(outs[0], Exception) and str(outs[0]) == "server error: status code 503"
+    assert outs[1]["message"] == "success"
+
+
+def test_reference_upload_and_tagged_ids(tmp_path):
+    """Large audio is uploaded like the sync client does; ids tagged with another deployment are rejected."""
+    audio = b"a" * 1000
+    store = LocalBlobStore(str(tmp_path))
+
+    async def run(endpoint):
+        session = AsyncBananaSession(endpoint=endpoint)
+        async with AsyncWhisperClient(
+            "key", "model", session=session, blob_store=store, reference_threshold_bytes=1000
+        ) as client:
+            await client.start_transcription(audio)
+            own = await client.check_transcription_request(tag("model", "call-1"))
+            with pytest.raises(ValueError):
+                await client.check_transcription_request(tag("other", "call-2"))
+            return own
+
+    with StubBanana() as stub:
+        own = asyncio.run(run(stub.endpoint))
+
+    assert own["message"] == "success"
+    (_, start), (_, check) = stub.requests
+    assert start["modelInputs"]["mp3Url"] == store.url(blob_name(audio))
+    assert check["callID"] == "call-1"
+
+
+def test_hedger_and_breaker_are_shared_with_sync_sessions():
+    """A hedger and breaker learn from async and sync calls alike."""
+    hedger = Hedger(min_delay=0.05, min_samples=10)
+    for _ in range(10):
+        hedger.call(lambda: "fast")
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            await asyncio.sleep(5)
+            return "stuck"
+        return "hedge"
+
+    started = time.monotonic()
+    assert asyncio.run(hedger.call_async(call)) == "hedge"
+    assert time.monotonic() - started < 1.0
+    assert (hedger.stats.calls, hedger.stats.hedged, hedger.stats.hedge_wins) == (11, 1, 1)
+    hedger.close()
+
+    breaker = CircuitBreaker(failure_threshold=2)
+
+    async def run(endpoint):
+        async with AsyncWhisperClient(
+            "key", "model", session=AsyncBananaSession(endpoint=endpoint, breaker=breaker)
+        ) as client:
+            for _ in range(2):
+                with pytest.raises(Exception, match="status code 500"):
+                    await client.start_transcription(b"audio")
+
+    with StubBanana(error_rate=1.0) as stub:
+        asyncio.run(run(stub.endpoint))
+        session = BananaSession(endpoint=stub.endpoint, breaker=breaker)
+        with pytest.raises(CircuitOpenError):
+            banana_dev.start("key", "model", {"getSegments": False}, session)
+        session.close()
+    assert stub.errors == 2
+
+
+def test_pooled_deployments():
+    """Transcriptions are spread across pooled deployments, and transient check failures keep them outstanding."""
+
+    async def run(pool, endpoint, stub):
+        session = AsyncBananaSession(endpoint=endpoint, check_retries=0)
+        async with AsyncWhisperClient("key", "unused", session=session, deployments=pool) as client:
+            ids = [await client.start_transcription(b"audio") for _ in range(4)]
+            stub.check_failures = [503]
+            with pytest.raises(Exception, match="status code 503"):
+                await client.check_transcription_request(ids[0])
+            outstanding = pool.stats()["a"].outstanding
+            return ids, outstanding, await client.check_transcription_requests(ids)
+
+    with StubBanana() as first, StubBanana() as second:
+        pool = DeploymentPool(parse_deployments(f"a, b {second.endpoint}"))
+        ids, outstanding, outs = asyncio.run(run(pool, first.endpoint, first))
+
+    assert [untag(i)[0] for i in ids] == ["a", "b", "a", "b"]
+    assert outstanding == 2
+    assert all(out["message"] == "success" for out in outs)
+    assert [s.outstanding for s in pool.stats().values()] == [0, 0]
+    assert second.requests[0][1]["modelKey"] == "b"
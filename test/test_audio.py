@@ -0,0 +1,271 @@
+"""Unit tests for audio container handling."""
+
+import io
+import struct
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from audio import mp3, normalize, probe, silence, wav, windows
+from stitch import restore_silences
+
+# MPEG-1 layer III, 128 kbps, 44.1 kHz, no padding: 417 bytes and 1152 samples per frame.
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+MP3_FRAME_SECONDS = 1152 / 44100
+
+
+def make_wav(seconds: float, rate: int = 8000, channels: int = 1) -> bytes:
+    """Build a silent 16-bit PCM WAV file."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(b"\x00\x00" * channels * int(seconds * rate))
+    return out.getvalue()
+
+
+def make_mp3(frames: int) -> bytes:
+    """Build an MP3 file with an ID3v2 tag followed by `frames` identical frames."""
+    id3 = b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    return id3 + MP3_FRAME * frames
+
+
+def test_plan():
+    """Windows overlap by the requested amount and cover the whole recording."""
+    assert windows.plan(25, 10, 2) == [(0, 10), (8, 18), (16, 25)]
+    assert windows.plan(10, 10, 2) == [(0, 10)]
+    with pytest.raises(ValueError):
+        windows.plan(25, 2, 2)
+
+
+def test_split_wav():
+    """WAV windows are standalone files whose ownership spans tile the recording."""
+    got = windows.split(make_wav(25), window_seconds=10, overlap_seconds=2)
+
+    assert [w.offset for w in got] == [0, 8, 16]
+    assert [(w.start, w.end) for w in got] == [(0, 9), (9, 17), (17, 25)]
+    assert [wav.duration(w.data) for w in got] == [10, 10, 9]
+
+
+def test_split_mp3():
+    """MP3 windows are cut on frame boundaries."""
+    data = make_mp3(1000)
+    assert mp3.is_mp3(data)
+    assert mp3.duration(data) == pytest.approx(1000 * MP3_FRAME_SECONDS)
+
+    got = windows.split(data, window_seconds=10, overlap_seconds=2)
+    assert len(got) == 4
+    assert got[0].start == 0 and got[-1].end == pytest.approx(1000 * MP3_FRAME_SECONDS)
+    for w in got:
+        assert len(w.data) % len(MP3_FRAME) == 0
+        assert w.offset == pytest.approx(round(w.offset / MP3_FRAME_SECONDS) * MP3_FRAME_SECONDS)
+    for before, after in zip(got, got[1:]):
+        assert before.end == after.start
+        assert after.offset < before.end < before.offset + mp3.duration(before.data)
+
+
+@pytest.mark.parametrize(
+    "data", [make_wav(5), b"not audio at all", b""], ids=["short", "unknown", "empty"]
+)
+def test_split_unsupported(data):
+    """Short or unrecognized audio is not split."""
+    assert windows.split(data, window_seconds=10, overlap_seconds=2) is None
+
+
+def make_tone(
+    seconds: float, rate: int, channels: int, frequency: float, sample_width: int = 2
+) -> bytes:
+    """Build a half-scale sine tone WAV file, identical on every channel."""
+    t = np.arange(int(seconds * rate)) / rate
+    scale = (1 << (8 * sample_width - 1)) - 1
+    samples = np.round(0.5 * scale * np.sin(2 * np.pi * frequency * t)).astype("<i4")
+    frames = np.repeat(samples, channels).view(np.uint8).reshape(-1, 4)[:, :sample_width]
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(sample_width)
+        writer.setframerate(rate)
+        writer.writeframes(frames.tobytes())
+    return out.getvalue()
+
+
+def read_mono(data: bytes):
+    """Read a 16-bit mono WAV file into its sample rate and float samples."""
+    with wave.open(io.BytesIO(data)) as reader:
+        assert (reader.getnchannels(), reader.getsampwidth()) == (1, 2)
+        frames = reader.readframes(reader.getnframes())
+        return reader.getframerate(), np.frombuffer(frames, dtype="<i2") / 32768.0
+
+
+@pytest.mark.parametrize("sample_width", [2, 3])
+def test_normalize(sample_width):
+    """Stereo 48 kHz audio becomes 16 kHz mono, keeping in-band tones and rejecting out-of-band ones."""
+    speech = make_tone(1, 48000, 2, 440, sample_width)
+    rate, samples = read_mono(normalize.normalize(speech))
+    assert rate == 16000
+    assert samples.size == 16000
+    assert np.abs(samples[100:-100]).max() == pytest.approx(0.5, abs=0.01)
+    assert len(normalize.normalize(speech)) < len(speech) / (3 * sample_width) + 100
+
+    # a 12 kHz tone is above the 8 kHz Nyquist frequency of the output, and must not alias into the speech band.
+    _, aliased = read_mono(normalize.normalize(make_tone(1, 48000, 1, 12000)))
+    assert np.abs(aliased[100:-100]).max() < 0.01
+
+
+def test_normalize_skips_compact_audio():
+    """Audio that is already compact, or that is not PCM WAV, is left alone."""
+    assert normalize.normalize(make_wav(1, rate=16000)) is None
+    assert normalize.normalize(make_wav(1, rate=8000)) is None
+    assert normalize.normalize(make_mp3(10)) is None
+
+    # low-rate stereo is downmixed, but never upsampled.
+    rate, samples = read_mono(normalize.normalize(make_wav(1, rate=8000, channels=2)))
+    assert (rate, samples.size) == (8000, 8000)
+
+
+def make_speech(spans, seconds: float, rate: int = 16000, seed: int = 0) -> bytes:
+    """Build a 16-bit mono WAV file of tone bursts at (start, end) `spans` over a -70 dBFS noise floor."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    signal = rng.normal(scale=10 ** (-70 / 20), size=t.size)
+    for start, end in spans:
+        burst = (t >= start) & (t < end)
+        signal[burst] += 0.3 * np.sin(2 * np.pi * 300 * t[burst])
+    pcm = np.round(signal * 32767).astype("<i2")
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+def test_trim_silence():
+    """Long silent runs are removed, keeping padding; short pauses are kept; speech maps back to original times."""
+    speech = [(0.0, 1.0), (4.0, 5.0), (5.5, 6.5)]
+    trimmed, silences = silence.trim(
+        make_speech(speech, 8.5), threshold_db=-45, min_seconds=1.0, padding_seconds=0.25
+    )
+
+    assert silences == [
+        pytest.approx((1.25, 3.75), abs=silence.FRAME_SECONDS),
+        pytest.approx((6.75, 8.25), abs=silence.FRAME_SECONDS),
+    ]
+    assert wav.duration(trimmed) == pytest.approx(8.5 - 2.5 - 1.5, abs=2 * silence.FRAME_SECONDS)
+
+    # find the bursts in the trimmed audio, then map them back onto the original recording.
+    rate, samples = read_mono(trimmed)
+    loud = np.flatnonzero(
+        np.diff(np.concatenate(([0], np.abs(samples) > 0.1, [0])).astype(np.int8))
+    )
+    bursts = [
+        {"start": s / rate, "end": e / rate, "text": ""} for s, e in zip(loud[0::2], loud[1::2])
+    ]
+    merged = [bursts[0]]
+    for burst in bursts[1:]:
+        if burst["start"] - merged[-1]["end"] < 0.01:
+            merged[-1]["end"] = burst["end"]
+        else:
+            merged.append(burst)
+    restored = restore_silences(merged, silences)
+    assert [(s["start"], s["end"]) for s in restored] == [
+        pytest.approx(span, abs=0.01) for span in speech
+    ]
+
+
+def test_trim_silence_nothing_to_remove():
+    """Audio without long silences, and audio that is not PCM WAV, is left alone."""
+    assert silence.trim(make_speech([(0.0, 1.0), (1.5, 3.0)], 3.0)) is None
+    assert silence.trim(make_mp3(10)) is None
+
+
+def _box(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(body)) + kind + body
+
+
+def make_mp4(seconds: float, rate: int = 44100, channels: int = 2) -> bytes:
+    """Build the boxes of an M4A file with a video-less AAC track, its `moov` after the media data."""
+    mvhd = _box(b"mvhd", bytes(12) + struct.pack(">II", 1000, int(seconds * 1000)) + bytes(80))
+    mdhd = _box(b"mdhd", bytes(12) + struct.pack(">II", rate, int(seconds * rate)) + bytes(4))
+    hdlr = _box(b"hdlr", bytes(8) + b"soun" + bytes(12))
+    entry = _box(b"mp4a", bytes(16) + struct.pack(">HHHHI", channels, 16, 0, 0, rate << 16))
+    stsd = _box(b"stsd", bytes(4) + struct.pack(">I", 1) + entry)
+    minf = _box(b"minf", _box(b"stbl", stsd))
+    trak = _box(b"trak", _box(b"mdia", mdhd + hdlr + minf))
+    return (
+        _box(b"ftyp", b"M4A " + bytes(4)) + _box(b"mdat", bytes(4096)) + _box(b"moov", mvhd + trak)
+    )
+
+
+def _element(element_id: int, body: bytes) -> bytes:
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + (0x0100000000000000 | len(body)).to_bytes(8, "big") + body
+
+
+def make_webm(seconds: float, rate: int = 48000, channels: int = 2) -> bytes:
+    """Build the EBML headers of a WebM file with an Opus track, followed by an empty cluster."""
+    info = _element(0x2AD7B1, (1_000_000).to_bytes(3, "big")) + _element(
+        0x4489, struct.pack(">d", seconds * 1000)
+    )
+    audio = _element(0xB5, struct.pack(">f", rate)) + _element(0x9F, bytes([channels]))
+    track = _element(0x83, b"\x02") + _element(0x86, b"A_OPUS") + _element(0xE1, audio)
+    segment = (
+        _element(0x1549A966, info)
+        + _element(0x1654AE6B, _element(0xAE, track))
+        + _element(0x1F43B675, bytes(4096))
+    )
+    return _element(0x1A45DFA3, _element(0x4282, b"webm")) + _element(0x18538067, segment)
+
+
+@pytest.mark.parametrize(
+    "data,expected",
+    [
+        (make_wav(2.5, rate=16000, channels=2), probe.AudioInfo("wav", "pcm", 2.5, 16000, 2)),
+        (make_mp3(100), probe.AudioInfo("mp3", "mp3", 100 * MP3_FRAME_SECONDS, 44100, 2)),
+        (make_mp4(12.5), probe.AudioInfo("mp4", "mp4a", 12.5, 44100, 2)),
+        (make_webm(7.25), probe.AudioInfo("webm", "A_OPUS", 7.25, 48000, 2)),
+    ],
+    ids=["wav", "mp3", "mp4", "webm"],
+)
+def test_probe(data, expected):
+    """Container, codec, duration, sample rate and channels are read from the headers."""
+    info = probe.probe(data)
+    assert (info.container, info.codec, info.sample_rate, info.channels) == (
+        expected.container,
+        expected.codec,
+        expected.sample_rate,
+        expected.channels,
+    )
+    # without a frame count, the duration of MP3 audio is estimated from its bitrate.
+    assert info.duration == pytest.approx(expected.duration, rel=0.01)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"not audio at all", make_wav(1)[:30], make_mp4(1)[:40], make_webm(1)[:20]],
+    ids=["empty", "unknown", "truncated_wav", "truncated_mp4", "truncated_webm"],
+)
+def test_probe_rejects_unreadable(data):
+    """Data that is not a readable WAV, MP3, MP4 or WebM file probes as None."""
+    assert probe.probe(data) is None
+
+
+def test_probe_resyncs_mp3():
+    """MP3 frames are found past padding or junk before the first one, but stray sync bytes alone are not audio."""
+    data = make_mp3(10)
+    info = probe.probe(b"\0" * 300 + b"\xff\xfb junk" + data)
+    assert (info.container, info.sample_rate, info.channels) == ("mp3", 44100, 2)
+    assert probe.probe(b"junk \xff\xfb\x90\x00 more junk") is None
+
+
+def test_probe_reads_headers_only():
+    """Probing long audio takes no longer than probing short audio, as the samples are never read."""
+    data = make_wav(600, rate=16000)
+    started = time.perf_counter()
+    info = probe.probe(data)
+    assert time.perf_counter() - started < 0.01
+    assert info.duration == 600
@@ -0,0 +1,170 @@
+"""Unit tests for the banana.dev transport, run against a local stub server."""
+
+import threading
+import time
+
+import pytest
+from stub_banana import StubBanana, segment_outputs
+
+import banana_dev
+from banana_dev import BananaSession, CircuitBreaker, CircuitOpenError, Hedger
+
+
+def test_session_reuses_connections():
+    """Repeated calls through one session share a single keep-alive connection."""
+    with StubBanana() as stub:
+        session = BananaSession(endpoint=stub.endpoint)
+        call_id = banana_dev.start("key", "model", {"getSegments": False}, session)
+        for _ in range(5):
+            out = banana_dev.check("key", call_id, session)
+            assert out["message"] == "success"
+        session.close()
+
+    assert len(stub.requests) == 6
+    assert stub.connections == 1
+
+
+def test_check_retries_transient_errors():
+    """Idempotent checks are retried after retryable status codes."""
+    delays = []
+    with StubBanana() as stub:
+        stub.check_failures = [503, 502]
+        session = BananaSession(endpoint=stub.endpoint, sleep=delays.append)
+        out = banana_dev.check("key", "call-1", session)
+
+    assert out["message"] == "success"
+    assert len(stub.requests) == 3
+    assert len(delays) == 2
+    assert all(0 <= d <= 8.0 for d in delays)
+
+
+def test_check_gives_up_after_retries():
+    """Once retries are exhausted the status code is reported as a server error."""
+    with StubBanana() as stub:
+        stub.check_failures = [503, 503, 503]
+        session = BananaSession(endpoint=stub.endpoint, check_retries=2, sleep=lambda _: None)
+        with pytest.raises(Exception, match="server error: status code 503"):
+            banana_dev.check("key", "call-1", session)
+
+    assert len(stub.requests) == 3
+
+
+def test_backoff_is_bounded():
+    """Jittered delays never exceed the configured cap."""
+    session = BananaSession(backoff_base=1.0, backoff_max=4.0)
+    assert all(0 <= session.backoff(attempt) <= 4.0 for attempt in range(10) for _ in range(20))
+
+
+def test_stub_queueing_and_long_poll():
+    """The stub reports a call as running until its queue delay passes; long polls wait for it to finish."""
+    with StubBanana(segment_outputs(2), queue_delay=0.2) as stub:
+        session = BananaSession(endpoint=stub.endpoint)
+        call_id = banana_dev.start("key", "model", {"getSegments": True}, session)
+        assert banana_dev.check("key", call_id, session)["message"] == ""
+
+        stub.long_poll = 1.0
+        started = time.monotonic()
+        out = banana_dev.check("key", call_id, session)
+        assert out["message"] == "success"
+        assert time.monotonic() - started < 1.0
+        assert [s["end"] for s in out["modelOutputs"][0]["segments"]] == [2.0, 4.0]
+        session.close()
+
+
+def test_stub_error_injection():
+    """With an error rate of one, every call fails with a 500."""
+    with StubBanana(error_rate=1.0) as stub:
+        session = BananaSession(endpoint=stub.endpoint, check_retries=0)
+        with pytest.raises(Exception, match="server error: status code 500"):
+            banana_dev.start("key", "model", {"getSegments": False}, session)
+        session.close()
+
+    assert stub.errors == 1
+
+
+def test_hedger_duplicates_slow_calls():
+    """A call slower than the learned percentile is duplicated, and the first answer is used."""
+    hedger = Hedger(quantile=0.9, min_delay=0.05, min_samples=10)
+    for _ in range(10):
+        assert hedger.call(lambda: "fast") == "fast"
+    assert hedger.stats.hedged == 0
+
+    stuck = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            stuck.wait(5)
+            return "stuck"
+        return "hedge"
+
+    started = time.monotonic()
+    assert hedger.call(call) == "hedge"
+    assert time.monotonic() - started < 1.0
+    assert hedger.stats.hedged == 1
+    assert hedger.stats.hedge_wins == 1
+    stuck.set()
+    hedger.close()
+
+
+def test_hedger_runs_concurrent_calls_at_once():
+    """Concurrent calls up to the hedger's size all run at once, rather than queueing for a worker."""
+    hedger = Hedger(min_delay=5.0, min_samples=1, max_workers=4)
+    hedger.call(lambda: None)
+    barrier = threading.Barrier(4, timeout=2)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(hedger.call(barrier.wait))) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [0, 1, 2, 3]
+    hedger.close()
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Consecutive failures open the circuit; after the reset period one trial call may close it again."""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=lambda: now[0])
+
+    def fail():
+        raise Exception("server error: status code 503")
+
+    for _ in range(2):
+        with pytest.raises(Exception, match="status code 503"):
+            breaker.call(fail, lambda _: False)
+    assert breaker.stats.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok", lambda _: False)
+
+    now[0] += 31
+    with pytest.raises(Exception, match="status code 503"):
+        breaker.call(fail, lambda _: False)
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok", lambda _: False)
+
+    now[0] += 31
+    assert breaker.call(lambda: "ok", lambda _: False) == "ok"
+    assert breaker.stats.state == "closed"
+    assert breaker.stats.opened == 2
+    assert breaker.stats.rejected == 2
+
+
+def test_session_circuit_breaker_fails_fast():
+    """During an outage, starts are rejected without being sent once the circuit opens."""
+    with StubBanana(error_rate=1.0) as stub:
+        session = BananaSession(endpoint=stub.endpoint, breaker=CircuitBreaker(3))
+        for _ in range(5):
+            with pytest.raises(Exception, match="server error"):
+                banana_dev.start("key", "model", {"getSegments": False}, session)
+        stats = session.stats()
+        session.close()
+
+    assert stub.errors == 3
+    assert stats == {
+        "circuit": {"state": "open", "consecutive_failures": 3, "opened": 1, "rejected": 2}
+    }
@@ -0,0 +1,67 @@
+"""Unit tests for batch packing and batch responses."""
+
+import io
+import zipfile
+
+import pytest
+
+import whisper.response as whisper_response
+from batching import BatchItem, pack, read_archive
+
+
+def make_zip(files) -> bytes:
+    """Build a ZIP archive from (name, bytes) pairs."""
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+    return out.getvalue()
+
+
+def test_pack_respects_budgets():
+    """Items are packed in order, starting a new batch when any budget would be exceeded."""
+    items = [
+        BatchItem(str(i), b"x" * size, seconds)
+        for i, (size, seconds) in enumerate(
+            [(10, 1), (10, 1), (10, 1), (50, 1), (10, 20), (10, 1), (10, 1), (10, 1)]
+        )
+    ]
+    assert pack(items, max_bytes=40, max_seconds=10, max_items=3) == [
+        [0, 1, 2],
+        [3],
+        [4],
+        [5, 6, 7],
+    ]
+
+
+def test_read_archive():
+    """Files are returned in archive order, skipping directories and resource forks."""
+    data = make_zip([("b.wav", b"bbb"), ("dir/", b""), ("a.mp3", b"a"), ("__MACOSX/._a.mp3", b"?")])
+    assert read_archive(data) == [("b.wav", b"bbb"), ("a.mp3", b"a")]
+
+
+def test_read_archive_limits():
+    """Archives that would decompress to too much, or that compress implausibly well, are rejected unread."""
+    data = make_zip([("a.wav", b"a" * 600), ("b.wav", b"b" * 600)])
+    assert len(read_archive(data, max_bytes=1200)) == 2
+    with pytest.raises(ValueError, match="add up to more than 1000 bytes"):
+        read_archive(data, max_bytes=1000)
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("bomb.wav", bytes(4 * 1024 * 1024))
+    with pytest.raises(ValueError, match="compressed more than 100:1"):
+        read_archive(out.getvalue())
+
+
+def test_get_batch_items():
+    """Each file's output becomes its own response; failures are isolated to their own item."""
+    response = {
+        "message": "success",
+        "modelOutputs": [{"text": "one"}, {"error": "could not decode"}, {"text": "three"}],
+    }
+    items = whisper_response.get_batch_items(response)
+
+    assert [whisper_response.is_success(item) for item in items] == [True, False, True]
+    assert whisper_response.get_transcription(items[2]) == "three"
+    assert items[1]["message"] == "error: could not decode"
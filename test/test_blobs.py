@@ -0,0 +1,110 @@
+"""Test the blob stores used for reference uploads."""
+
+import io
+import os
+import time
+
+import pytest
+import requests
+from stub_blobs import StubBlobServer
+
+from blobs import HttpBlobStore, LocalBlobStore, blob_name, from_url
+
+
+def test_blob_name_of_file(tmp_path):
+    """Files are named by their content, like bytes, and left at their start."""
+    path = tmp_path / "audio.mp3"
+    path.write_bytes(b"audio" * 1000)
+    with path.open("rb") as f:
+        assert blob_name(f) == blob_name(b"audio" * 1000)
+        assert f.tell() == 0
+
+
+def test_local_blob_store(tmp_path):
+    """Blobs are written once per content and addressed by file or base URLs."""
+    store = LocalBlobStore(str(tmp_path / "blobs"))
+    url = store.put(b"audio")
+    assert url == (tmp_path / "blobs" / blob_name(b"audio")).as_uri()
+    assert (tmp_path / "blobs" / blob_name(b"audio")).read_bytes() == b"audio"
+
+    path = tmp_path / "audio.mp3"
+    path.write_bytes(b"audio")
+    with path.open("rb") as f:
+        assert store.put(f) == url
+    assert (store.stats.puts, store.stats.uploads, store.stats.reused) == (2, 1, 1)
+
+    served = LocalBlobStore(str(tmp_path / "blobs"), "http://blobs.local/audio")
+    assert served.put(b"audio") == f"http://blobs.local/audio/{blob_name(b'audio')}"
+
+
+def test_local_blob_store_expiry(tmp_path):
+    """Blobs not stored or reused within the TTL are deleted, along with abandoned temporary files."""
+    store = LocalBlobStore(str(tmp_path))
+    for data in (b"old", b"recent", b"reused"):
+        store.put(data)
+    stale = time.time() - 7200
+    for name in (blob_name(b"old"), blob_name(b"reused")):
+        os.utime(tmp_path / name, (stale, stale))
+    (tmp_path / "abandoned.tmp").write_bytes(b"partial")
+    os.utime(tmp_path / "abandoned.tmp", (stale, stale))
+    store.put(b"reused")
+
+    assert store.expire(3600) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [blob_name(b"recent"), blob_name(b"reused")]
+    )
+    assert store.stats.deleted == 1
+
+
+def test_local_blob_store_failed_write(tmp_path):
+    """A write that fails part-way leaves no temporary file behind."""
+
+    class Broken(io.BytesIO):
+        def read(self, size=-1):
+            raise OSError("disk error")
+
+    store = LocalBlobStore(str(tmp_path))
+    with pytest.raises(OSError):
+        store.put(Broken(b"audio"))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_http_blob_store(tmp_path):
+    """Blobs are uploaded with PUT, skipped when already present, and served back at their URL."""
+    path = tmp_path / "audio.mp3"
+    path.write_bytes(b"streamed" * 1000)
+    with StubBlobServer() as server:
+        store = HttpBlobStore(server.endpoint)
+        url = store.put(b"audio")
+        assert store.put(bytearray(b"audio")) == url
+        with path.open("rb") as f:
+            file_url = store.put(f)
+        assert requests.get(url).content == b"audio"
+        assert requests.get(file_url).content == b"streamed" * 1000
+        store.close()
+
+    assert len(server.uploads) == 2
+    assert store.stats.bytes_uploaded == 5 + 8000
+
+
+def test_http_blob_store_auth_and_delete():
+    """Configured headers are sent with every upload, and expired blobs are deleted with DELETE."""
+    with StubBlobServer() as server:
+        store = from_url(server.endpoint, {"Authorization": "Bearer token"})
+        url = store.put(b"audio")
+        assert store.expire(3600) == 0
+        assert store.expire(0) == 1
+        assert requests.get(url).status_code == 404
+        store.delete(blob_name(b"audio"))
+        store.close()
+
+    assert server.authorizations == ["Bearer token"]
+    assert store.stats.deleted == 2
+
+
+def test_from_url(tmp_path):
+    """Stores are built from file and http(s) URLs."""
+    assert isinstance(from_url((tmp_path / "blobs").as_uri()), LocalBlobStore)
+    assert isinstance(from_url("https://blobs.example.com/audio/"), HttpBlobStore)
+    with pytest.raises(ValueError):
+        from_url("s3://bucket/audio")
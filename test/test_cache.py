@@ -0,0 +1,117 @@
+"""Unit tests for the transcription result cache."""
+
+from steamship import Block, File
+from steamship.plugin.outputs.block_and_tag_plugin_output import BlockAndTagPluginOutput
+
+from cache import DiskCache, MemoryCache, TieredCache, content_key, transcription_key
+
+
+def _output(text: str) -> BlockAndTagPluginOutput:
+    return BlockAndTagPluginOutput(file=File.CreateRequest(blocks=[Block.CreateRequest(text=text)]))
+
+
+class FakeClock:
+    """Manually-advanced clock used to test expiry."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_content_key():
+    """Keys depend on the audio and on every option that changes the transcription."""
+    key = content_key(b"audio", "base", "text")
+    assert key == content_key(b"audio", "BASE", "text")
+    assert key != content_key(b"other", "base", "text")
+    assert key != content_key(b"audio", "tiny", "text")
+    assert key != content_key(b"audio", "base", "segments")
+    assert content_key(b"audio", "base", "segments") != content_key(b"audio", "base", "words")
+
+
+def test_transcription_key():
+    """Keys of finished transcriptions depend on the id and on the shape of the requested output."""
+    key = transcription_key("call-1", "segments")
+    assert key != transcription_key("call-2", "segments")
+    assert key != transcription_key("call-1", "text")
+    assert key != transcription_key("call-1", "words")
+
+
+def test_memory_cache_lru_eviction():
+    """The least-recently-used entry is evicted first."""
+    cache = MemoryCache(max_entries=2)
+    cache.put("a", _output("a"))
+    cache.put("b", _output("b"))
+    assert cache.get("a") == _output("a")
+    cache.put("c", _output("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == _output("a")
+    assert cache.get("c") == _output("c")
+    assert cache.stats.hits == 3
+    assert cache.stats.misses == 1
+    assert cache.stats.evictions == 1
+
+
+def test_disk_cache_round_trip(tmp_path):
+    """Results survive a new cache instance over the same directory."""
+    DiskCache(str(tmp_path)).put("a", _output("why, hello there!"))
+    assert DiskCache(str(tmp_path)).get("a") == _output("why, hello there!")
+
+
+def test_disk_cache_compressed(tmp_path):
+    """Compressed entries round-trip and take less space than plain JSON."""
+    output = _output("why, hello there! " * 100)
+    DiskCache(str(tmp_path / "plain")).put("a", output)
+    DiskCache(str(tmp_path / "compressed"), compress=True).put("a", output)
+
+    assert DiskCache(str(tmp_path / "compressed"), compress=True).get("a") == output
+    plain = (tmp_path / "plain" / "a.json").stat().st_size
+    compressed = (tmp_path / "compressed" / "a.json.z").stat().st_size
+    assert compressed * 10 < plain
+
+
+def test_disk_cache_ttl(tmp_path):
+    """Entries older than the TTL are treated as misses and removed."""
+    clock = FakeClock()
+    cache = DiskCache(str(tmp_path), ttl_seconds=60, clock=clock)
+    cache.put("a", _output("a"))
+
+    clock.now += 30
+    assert cache.get("a") is not None
+    clock.now += 61
+    assert cache.get("a") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_disk_cache_size_eviction(tmp_path):
+    """Least-recently-used entries are removed once the directory exceeds its size budget."""
+    clock = FakeClock()
+    entry_size = len(_output("a" * 100).json(by_alias=True, exclude_none=True))
+    cache = DiskCache(str(tmp_path), max_bytes=entry_size * 2, clock=clock)
+    for key in ["a", "b"]:
+        cache.put(key, _output(key * 100))
+        clock.now += 1
+    assert cache.get("a") is not None
+    clock.now += 1
+    cache.put("c", _output("c" * 100))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    """A disk hit is copied into memory so the next read does not touch disk."""
+    DiskCache(str(tmp_path)).put("a", _output("a"))
+    cache = TieredCache(MemoryCache(), DiskCache(str(tmp_path)))
+
+    assert cache.get("a") == _output("a")
+    assert cache.memory.stats.misses == 1
+    assert cache.disk.stats.hits == 1
+
+    assert cache.get("a") == _output("a")
+    assert cache.memory.stats.hits == 1
+    assert cache.disk.stats.hits == 1
+    assert cache.stats.hits == 2
@@ -0,0 +1,103 @@
+"""Unit tests for single-flight coalescing of identical submissions."""
+
+import threading
+
+import pytest
+from test_polling import FakeClock
+
+from coalesce import InflightRegistry, SubmissionPendingError
+
+
+def test_concurrent_submissions_share_one_start(tmp_path):
+    """Identical submissions that race each other start one transcription and all receive its id."""
+    registry = InflightRegistry(str(tmp_path / "inflight.sqlite3"), poll_seconds=0.01)
+    release = threading.Event()
+    starts = []
+
+    def start():
+        starts.append(1)
+        release.wait(5)
+        return "call-1"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.start("audio", start)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(starts) == 1
+    assert sorted(results) == [("call-1", False)] + [("call-1", True)] * 7
+
+
+def test_registries_on_one_file_share_entries(tmp_path):
+    """Registries opened on the same file, as in separate worker processes, join each other's transcriptions."""
+    path = str(tmp_path / "inflight.sqlite3")
+    first, second = InflightRegistry(path), InflightRegistry(path)
+
+    assert first.start("audio", lambda: "call-1") == ("call-1", False)
+    assert second.start("audio", lambda: "call-2") == ("call-1", True)
+    assert second.start("other audio", lambda: "call-3") == ("call-3", False)
+
+
+def test_entries_expire(tmp_path):
+    """A transcription can be joined until its entry expires; an abandoned claim stops blocking after claim_seconds."""
+    clock = FakeClock()
+    path = str(tmp_path / "inflight.sqlite3")
+    registry = InflightRegistry(path, 60, 5, 300, clock=clock, sleep=clock.sleep)
+
+    assert registry.start("audio", lambda: "call-1") == ("call-1", False)
+    clock.now += 59
+    assert registry.start("audio", lambda: "call-2") == ("call-1", True)
+    clock.now += 1
+    assert registry.start("audio", lambda: "call-2") == ("call-2", False)
+
+    # a claim whose owner died without recording an id.
+    assert registry._claim("abandoned") == (True, None)
+    clock.now += 290
+    assert registry._claim("abandoned") == (False, None)
+    clock.now += 10
+    assert registry.start("abandoned", lambda: "call-3") == ("call-3", False)
+
+
+def test_waiters_never_duplicate_a_slow_start(tmp_path):
+    """A caller that gives up waiting on a slow start raises instead of starting the same audio again."""
+    clock = FakeClock()
+    registry = InflightRegistry(
+        str(tmp_path / "inflight.sqlite3"), 60, 5, clock=clock, sleep=clock.sleep
+    )
+    assert registry._claim("audio") == (True, None)
+
+    starts = []
+    with pytest.raises(SubmissionPendingError):
+        registry.start("audio", lambda: starts.append(1) or "call-2")
+    assert not starts
+    assert clock.sleeps and sum(clock.sleeps) <= 5 + registry._poll_seconds
+    registry._record("audio", "call-1")
+    assert registry.start("audio", lambda: "call-2") == ("call-1", True)
+
+
+def test_failed_start_releases_claim(tmp_path):
+    """When starting the transcription fails, the next identical submission tries again."""
+    registry = InflightRegistry(str(tmp_path / "inflight.sqlite3"))
+
+    def fail():
+        raise RuntimeError("backend unavailable")
+
+    with pytest.raises(RuntimeError):
+        registry.start("audio", fail)
+    assert registry.start("audio", lambda: "call-1") == ("call-1", False)
+
+
+def test_release_keeps_newer_transcription(tmp_path):
+    """Releasing a transcription that is no longer recorded for the key leaves the newer one in place."""
+    registry = InflightRegistry(str(tmp_path / "inflight.sqlite3"))
+    registry.start("audio", lambda: "call-1")
+    registry.release("audio", "call-1")
+    registry.start("audio", lambda: "call-2")
+    registry.release("audio", "call-1")
+    assert registry.start("audio", lambda: "call-3") == ("call-2", True)
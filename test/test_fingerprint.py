@@ -0,0 +1,130 @@
+"""Unit tests for audio fingerprints and the near-duplicate transcript index."""
+
+import io
+import wave
+
+import numpy as np
+import pytest
+from test_polling import FakeClock
+
+import fingerprints
+from audio import fingerprint
+
+
+def make_melody(seconds: float, rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """Build a signal of three random tones at a time, changing every 150 ms."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    signal = np.zeros(t.size)
+    note = int(0.15 * rate)
+    for start in range(0, t.size, note):
+        span = slice(start, start + note)
+        for frequency in rng.uniform(300, 3000, 3):
+            signal[span] += rng.uniform(0.05, 0.25) * np.sin(2 * np.pi * frequency * t[span])
+    return signal
+
+
+def to_wav(
+    signal: np.ndarray, rate: int = 16000, channels: int = 1, sample_width: int = 2
+) -> bytes:
+    """Encode a float signal as a PCM WAV file, identical on every channel."""
+    if sample_width == 1:
+        frames = np.round(signal * 127 + 128).astype(np.uint8)
+    else:
+        frames = np.round(signal * 32767).astype("<i2")
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(sample_width)
+        writer.setframerate(rate)
+        writer.writeframes(np.repeat(frames, channels).tobytes())
+    return out.getvalue()
+
+
+def reencode(signal: np.ndarray, rate: int = 16000) -> bytes:
+    """Degrade a signal the way another encoder might: halve its gain, add noise, and store it as 8-bit stereo."""
+    noise = np.random.default_rng(1).normal(scale=0.005, size=signal.size)
+    resampled = np.interp(np.arange(0, signal.size, 16000 / 11025), np.arange(signal.size), signal)
+    return to_wav(0.5 * resampled + noise[: resampled.size], 11025, 2, 1)
+
+
+def test_fingerprint_robust_to_reencoding():
+    """Re-encoded audio keeps most fingerprint bits; unrelated audio agrees on about half."""
+    melody = make_melody(30)
+    reference = fingerprint.from_wav(to_wav(melody))
+    assert reference.dtype == np.uint32
+    assert reference.size == pytest.approx(30 / fingerprint.FRAME_SECONDS, abs=10)
+
+    degraded = fingerprint.from_wav(reencode(melody))
+    assert fingerprint.refine(degraded, reference, 0).similarity > 0.8
+    unrelated = fingerprint.from_wav(to_wav(make_melody(30, seed=7)))
+    assert fingerprint.refine(unrelated, reference, 0).similarity < 0.6
+
+    assert fingerprint.from_wav(b"not audio") is None
+    assert fingerprint.from_wav(to_wav(melody[:1000])) is None
+
+
+def _index(tmp_path, **kwargs) -> fingerprints.FingerprintIndex:
+    return fingerprints.FingerprintIndex(str(tmp_path / "fingerprints.sqlite3"), **kwargs)
+
+
+def test_index_finds_trimmed_near_duplicate(tmp_path):
+    """Re-encoded audio with its intro trimmed is found, with the length of the trimmed intro."""
+    melody = make_melody(60)
+    index = _index(tmp_path)
+    transcript = {"segments": [[0.0, 5.0, "hello"]]}
+    entry = index.add(fingerprint.from_wav(to_wav(melody)), "base-segments")
+    trimmed = fingerprint.from_wav(reencode(melody[5 * 16000 :]))
+
+    # entries only match once their transcript is known.
+    assert index.lookup(trimmed, "base-segments") is None
+    index.complete(entry, transcript)
+    hit = index.lookup(trimmed, "base-segments")
+    assert hit.entry == entry
+    assert hit.offset_seconds == pytest.approx(5.0, abs=fingerprint.FRAME_SECONDS)
+    assert hit.similarity > 0.8
+    assert hit.transcript == transcript
+
+    assert index.lookup(trimmed, "tiny-segments") is None
+    # audio that only partly overlaps the entry needs its own transcript.
+    extended = np.concatenate([melody[5 * 16000 :], make_melody(10, seed=3)])
+    assert index.lookup(fingerprint.from_wav(to_wav(extended)), "base-segments") is None
+    # an untimed transcript can only be reused for the whole recording.
+    text_entry = index.add(fingerprint.from_wav(to_wav(melody)), "base-text")
+    index.complete(text_entry, {"text": "hello"})
+    assert index.lookup(trimmed, "base-text") is None
+    assert index.lookup(fingerprint.from_wav(reencode(melody)), "base-text").entry == text_entry
+
+
+def test_index_eviction(tmp_path):
+    """The oldest entries beyond the limit, and entries past their time to live, are dropped."""
+    clock = FakeClock()
+    index = _index(tmp_path, max_entries=2, ttl_seconds=100, clock=clock)
+    fps = [fingerprint.from_wav(to_wav(make_melody(10, seed=seed))) for seed in range(3)]
+    for fp in fps:
+        index.complete(index.add(fp, "base-text"), {"text": "x"})
+    assert index.lookup(fps[0], "base-text") is None
+    assert index.lookup(fps[2], "base-text") is not None
+
+    # a match keeps its entry alive.
+    clock.now += 60
+    assert index.lookup(fps[2], "base-text") is not None
+    clock.now += 60
+    assert index.lookup(fps[1], "base-text") is None
+    assert index.lookup(fps[2], "base-text") is not None
+
+
+def test_shift():
+    """Segments are retimed against the trimmed audio, and cropped to it."""
+    segments = [
+        [0.0, 4.0, " before"],
+        [4.0, 8.0, " one two", [[4.0, 4.9, " one"], [5.5, 8.0, " two"]]],
+        [8.0, 12.0, " after"],
+        [12.0, 15.0, " beyond"],
+    ]
+    shifted = fingerprints.shift(segments, 5.0, 6.0)
+    assert [(s["start"], s["end"], s["text"]) for s in shifted] == [
+        (0.0, 3.0, "two"),
+        (3.0, 6.0, " after"),
+    ]
+    assert shifted[0]["words"] == [{"start": 0.5, "end": 3.0, "word": " two"}]
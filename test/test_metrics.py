@@ -0,0 +1,97 @@
+"""Unit tests for metrics sinks, the Prometheus exporter, and tracing spans."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def sink():
+    """Install a fresh in-memory sink for the duration of a test."""
+    sink = metrics.MemorySink(buckets=(0.1, 1.0))
+    previous = metrics.set_sink(sink)
+    yield sink
+    metrics.set_sink(previous)
+
+
+def test_memory_sink_aggregates():
+    """Histograms bucket observations per label set; counters sum increments."""
+    sink = metrics.MemorySink(buckets=(0.1, 1.0))
+    for value in [0.05, 0.5, 0.5, 3.0]:
+        sink.observe("latency", value, {"phase": "a"})
+    sink.increment("bytes", 10, {"direction": "sent"})
+    sink.increment("bytes", 5, {"direction": "sent"})
+
+    histogram = sink.histogram("latency", phase="a")
+    assert histogram.counts == [1, 2, 1]
+    assert (histogram.count, histogram.sum) == (4, 4.05)
+    assert sink.histogram("latency", phase="b") is None
+    assert sink.counter("bytes", direction="sent") == 15
+
+
+def test_prometheus_render():
+    """Buckets are cumulative and end with +Inf; label values are escaped."""
+    sink = metrics.MemorySink(buckets=(0.1, 1.0))
+    sink.observe("latency_seconds", 0.05, {"phase": 'say "hi"'})
+    sink.observe("latency_seconds", 2.0, {"phase": 'say "hi"'})
+    sink.increment("calls_total", 3)
+    sink.set_gauge("queue_depth", 4, {"priority": "bulk"})
+    sink.set_gauge("queue_depth", 2, {"priority": "bulk"})
+
+    assert sink.gauge("queue_depth", priority="bulk") == 2
+    assert sink.gauge("queue_depth") is None
+    assert metrics.render(sink) == "\n".join(
+        [
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{phase="say \\"hi\\"",le="0.1"} 1',
+            'latency_seconds_bucket{phase="say \\"hi\\"",le="1"} 1',
+            'latency_seconds_bucket{phase="say \\"hi\\"",le="+Inf"} 2',
+            'latency_seconds_sum{phase="say \\"hi\\""} 2.05',
+            'latency_seconds_count{phase="say \\"hi\\""} 2',
+            "# TYPE calls_total counter",
+            "calls_total 3",
+            "# TYPE queue_depth gauge",
+            'queue_depth{priority="bulk"} 2',
+            "",
+        ]
+    )
+
+
+def test_spans_nest_and_inherit_attributes(sink):
+    """Child spans join their parent's trace and inherit its attributes, including ones annotated later."""
+    with metrics.span("run", transcription_id="t-1") as run:
+        metrics.annotate(model="base")
+        with metrics.span("inner") as inner:
+            pass
+        with pytest.raises(ValueError):
+            with metrics.span("failing"):
+                raise ValueError()
+
+    assert (inner.trace_id, inner.parent_id) == (run.trace_id, run.span_id)
+    assert inner.attributes == {"transcription_id": "t-1", "model": "base"}
+    assert [s.name for s in sink.spans] == ["inner", "failing", "run"]
+    assert sink.histogram(metrics.tracing.SPAN_SECONDS, span="failing", outcome="error").count == 1
+    assert metrics.current_span() is None
+
+
+def test_span_continues_trace(sink):
+    """A span given a trace id joins that trace rather than starting a new one."""
+    with metrics.span("status_check", trace_id="abc") as check:
+        pass
+    assert check.trace_id == "abc"
+
+
+def test_wrap_carries_span_to_worker_threads(sink):
+    """Spans started on worker threads through `wrap` are children of the caller's span."""
+
+    def work(i):
+        with metrics.span("work") as child:
+            return child
+
+    with metrics.span("run") as run:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            children = list(executor.map(metrics.wrap(work), range(8)))
+
+    assert all(c.trace_id == run.trace_id and c.parent_id == run.span_id for c in children)
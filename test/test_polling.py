@@ -0,0 +1,119 @@
+"""Unit tests for duration-aware status polling."""
+
+import pytest
+
+from polling import PollingPolicy, checked, elapsed_seconds
+from throughput import ThroughputTable
+
+
+class FakeClock:
+    """Manually-advanced clock, whose `sleep` advances time instantly."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _policy(clock: FakeClock, **kwargs) -> PollingPolicy:
+    table = ThroughputTable({"base": 0.1}, overhead_seconds=10.0, clock=clock)
+    return PollingPolicy(table, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_throughput_table_learns():
+    """Observations are blended into the prior, one at a time."""
+    clock = FakeClock()
+    table = ThroughputTable({"base": 0.1}, overhead_seconds=10.0, alpha=0.5, clock=clock)
+    assert table.estimate("base", 100) == pytest.approx(20)
+
+    table.observe("base", 100, 50)
+    assert table["base"].realtime_factor == pytest.approx(0.25)
+    table.observe("base", 100, 30)
+    assert table["base"].realtime_factor == pytest.approx(0.225)
+    assert table.estimate("base", 100) == pytest.approx(32.5)
+
+
+def test_throughput_table_decays_to_prior():
+    """A model that is no longer observed drifts back toward its prior, so that it is tried again."""
+    clock = FakeClock()
+    table = ThroughputTable(
+        {"base": 0.1}, overhead_seconds=10.0, alpha=1.0, half_life_seconds=60, clock=clock
+    )
+    table.observe("base", 100, 50)
+    assert table.estimate("base", 100) == pytest.approx(50)
+    clock.now += 60
+    assert table.estimate("base", 100) == pytest.approx(35)
+    clock.now += 6000
+    assert table.estimate("base", 100) == pytest.approx(20)
+
+
+def test_elapsed_seconds_bounded_by_checks():
+    """Completion time comes from the backend when it is plausible, else the middle of the last polling interval."""
+    status_input = {"started_at": 100.0, "checked_at": 150.0}
+    assert elapsed_seconds(status_input, 170.0) == pytest.approx(60)
+    assert elapsed_seconds(status_input, 170.0, 155.0) == pytest.approx(55)
+    assert elapsed_seconds(status_input, 170.0, 90.0) == pytest.approx(60)
+    assert elapsed_seconds({"started_at": 100.0}, 120.0) == pytest.approx(10)
+    assert checked({"started_at": 100.0}, 150.0)["checked_at"] == 150.0
+    assert checked({}, 150.0) == {}
+
+
+def test_plan_far_from_completion():
+    """Long jobs get a next-check hint proportional to the remaining time, and no in-process wait."""
+    clock = FakeClock()
+    policy = _policy(clock, max_interval_seconds=60)
+    status_input = policy.started("base", 3600)
+
+    plan = policy.plan(status_input)
+    assert plan.eta_seconds == pytest.approx(370)
+    assert plan.wait_seconds == 0
+    assert plan.next_check_seconds == 60
+
+    clock.now += 340
+    plan = policy.plan(status_input)
+    assert plan.eta_seconds == pytest.approx(30)
+    assert plan.next_check_seconds == pytest.approx(15)
+
+
+def test_plan_imminent_completion():
+    """When completion is imminent the policy waits in-process instead."""
+    clock = FakeClock()
+    policy = _policy(clock, max_inline_wait_seconds=5)
+    status_input = policy.started("base", 10)
+
+    clock.now += 8
+    plan = policy.plan(status_input)
+    assert plan.eta_seconds == pytest.approx(3)
+    assert plan.wait_seconds == pytest.approx(3)
+
+    clock.now += 100
+    assert policy.plan(status_input).eta_seconds == 0
+
+
+def test_untracked_status_input():
+    """Transcriptions started without the policy are not planned or learned from."""
+    policy = _policy(FakeClock())
+    assert policy.plan({"transcription_id": "foo"}) is None
+    policy.completed({"transcription_id": "foo"})
+    assert policy.table["base"].observations == 0
+
+
+def test_completed_updates_estimates():
+    """Observed completion times feed back into later estimates."""
+    clock = FakeClock()
+    table = ThroughputTable({"base": 0.1}, overhead_seconds=10.0, alpha=1.0, clock=clock)
+    policy = PollingPolicy(table, clock=clock, sleep=clock.sleep)
+    status_input = policy.started("base", 100)
+    clock.now += 50
+    status_input = policy.checked(status_input)
+    clock.now += 20
+    policy.completed(status_input)
+
+    assert policy.table["base"].realtime_factor == pytest.approx(0.5)
+    assert policy.plan(policy.started("base", 100)).eta_seconds == pytest.approx(60)
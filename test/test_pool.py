@@ -0,0 +1,176 @@
+"""Unit tests for spreading transcriptions across several deployments."""
+
+import pytest
+from stub_banana import StubBanana
+from test_polling import FakeClock
+
+from banana_dev import BananaSession, CircuitBreaker, Hedger, Timeouts
+from whisper.client import WhisperClient
+from whisper.pool import Deployment, DeploymentPool, parse_deployments, tag, untag
+
+
+def test_parse_deployments():
+    """Entries are model keys with an optional weight and endpoint, in any order."""
+    assert parse_deployments("key-a 3, https://eu.example.com/ key-b, key-c") == [
+        Deployment("key-a", 3.0),
+        Deployment("key-b", 1.0, "https://eu.example.com/"),
+        Deployment("key-c"),
+    ]
+    assert untag(tag("key-a", "call-1")) == ("key-a", "call-1")
+    assert untag("call-1") == (None, "call-1")
+    for spec in ["key-a key-b", "key-a 0", "3", "key-a, key-a 2"]:
+        with pytest.raises(ValueError):
+            parse_deployments(spec)
+
+
+def test_least_outstanding():
+    """Transcriptions go where the fewest are in flight for the deployment's weight."""
+    pool = DeploymentPool(parse_deployments("a 2, b"), clock=FakeClock())
+    chosen = []
+    for i in range(6):
+        key = pool.choose().model_key
+        pool.started(key, f"call-{i}")
+        chosen.append(key)
+    assert chosen == ["a", "a", "b", "a", "a", "b"]
+
+    pool.finished("b", "call-2")
+    pool.finished("b", "call-5")
+    assert pool.choose().model_key == "b"
+    assert pool.stats()["a"].outstanding == 4
+
+
+def test_latency_strategy():
+    """With the latency strategy, the deployment that finished its transcriptions fastest is chosen."""
+    clock = FakeClock()
+    pool = DeploymentPool(parse_deployments("a, b"), strategy="latency", clock=clock)
+    pool.started("a", "1")
+    pool.started("b", "2")
+    clock.now += 10
+    pool.finished("a", "1")
+    clock.now += 20
+    pool.finished("b", "2")
+    assert pool.stats()["b"].latency == pytest.approx(30)
+    assert pool.choose().model_key == "a"
+    with pytest.raises(ValueError):
+        DeploymentPool(parse_deployments("a"), strategy="random")
+
+
+def test_unhealthy_deployments_are_drained():
+    """Repeated failures drain a deployment until its drain ends; its next failure drains it again."""
+    clock = FakeClock()
+    pool = DeploymentPool(
+        parse_deployments("a, b"), failure_threshold=2, drain_seconds=30, clock=clock
+    )
+    pool.failed("a")
+    assert pool.choose().model_key == "a"
+    pool.failed("a")
+    assert pool.stats()["a"].drained
+    assert [pool.choose().model_key for _ in range(3)] == ["b"] * 3
+
+    clock.now += 30
+    assert pool.choose().model_key == "a"
+    pool.failed("a")
+    assert pool.choose().model_key == "b"
+    assert pool.stats()["a"].drains == 2
+
+    # with every deployment drained, the one that rejoins soonest is used.
+    pool.failed("b")
+    pool.failed("b")
+    assert pool.choose().model_key == "a"
+
+
+def test_failed_transcriptions_stop_counting():
+    """A transcription reported to have failed is no longer outstanding, and does not count against its deployment."""
+    pool = DeploymentPool(parse_deployments("a"), failure_threshold=5)
+    pool.started("a", "call-1")
+    pool.started("a", "call-2")
+    pool.failed("a")
+    pool.abandoned("a", "call-1")
+    stats = pool.stats()["a"]
+    assert (stats.outstanding, stats.consecutive_failures, stats.latency) == (1, 0, None)
+
+
+def test_transient_check_failures_keep_counting():
+    """A check that cannot reach the backend leaves its transcription outstanding; a 4xx does not count against it."""
+    with StubBanana() as stub:
+        pool = DeploymentPool(parse_deployments("a"), failure_threshold=5)
+        session = BananaSession(endpoint=stub.endpoint, check_retries=0)
+        client = WhisperClient("key", "unused", session=session, deployments=pool)
+        transcription_id = client.start_transcription(b"audio")
+        stub.check_failures = [503, 404]
+        outcomes = []
+        for _ in range(2):
+            with pytest.raises(Exception) as error:
+                client.check_transcription_request(transcription_id)
+            outcomes.append((str(error.value), pool.stats()["a"]))
+        client.check_transcription_request(transcription_id)
+        final = pool.stats()["a"]
+        client.close()
+
+    assert [message for message, _ in outcomes] == [
+        "server error: status code 503",
+        "server error: status code 404",
+    ]
+    assert [(s.outstanding, s.consecutive_failures) for _, s in outcomes] == [(1, 1), (1, 1)]
+    assert (final.outstanding, final.consecutive_failures) == (0, 0)
+    assert final.latency is not None
+
+
+def test_client_spreads_across_endpoints():
+    """A pooled client tags its transcription ids, checks each on its deployment, and drains a failing one."""
+    with StubBanana() as first, StubBanana() as second, StubBanana(error_rate=1.0) as broken:
+        deployments = parse_deployments(
+            f"a {first.endpoint}, b {second.endpoint}, c {broken.endpoint}"
+        )
+        pool = DeploymentPool(deployments, failure_threshold=1)
+        client = WhisperClient(
+            "key", "unused", session=BananaSession(endpoint=broken.endpoint), deployments=pool
+        )
+        ids = []
+        for _ in range(5):
+            try:
+                ids.append(client.start_transcription(b"audio"))
+            except Exception:
+                pass
+        outs = client.check_transcription_request(ids[0]), client.check_transcription_request(
+            ids[1]
+        )
+        stats = client.backend_stats()["deployments"]
+        client.close()
+
+    assert [untag(i)[0] for i in ids] == ["a", "b", "a", "b"]
+    assert all(out["message"] == "success" for out in outs)
+    assert [path for path, _ in first.requests] == ["/start/v4/", "/start/v4/", "/check/v4/"]
+    assert second.requests[0][1]["modelKey"] == "b"
+    assert len(broken.requests) == 1
+    assert stats["c"]["drained"]
+    assert stats["a"]["outstanding"] == 1
+
+
+def test_deployment_sessions_copy_settings():
+    """Each deployment's session has the client session's settings, and a hedger and breaker of its own."""
+    timeouts = Timeouts(connect=1.0, start=2.0, check=3.0)
+    session = BananaSession(
+        endpoint="https://main.example.com/",
+        pool_size=4,
+        timeouts=timeouts,
+        check_retries=7,
+        backoff_base=0.1,
+        backoff_max=2.0,
+        hedger=Hedger(quantile=0.9, min_samples=5),
+        breaker=CircuitBreaker(failure_threshold=2, reset_seconds=10.0),
+    )
+    pool = DeploymentPool(parse_deployments("a, b https://eu.example.com/"))
+    client = WhisperClient("key", "unused", session=session, deployments=pool)
+    a, b = client._session_for("a"), client._session_for("b")
+    client.close()
+
+    assert (a.endpoint, b.endpoint) == ("https://main.example.com/", "https://eu.example.com/")
+    for copy in (a, b):
+        assert copy.timeouts == timeouts
+        assert copy.check_retries == 7
+        assert (copy._pool_size, copy._backoff_base, copy._backoff_max) == (4, 0.1, 2.0)
+        assert (copy.hedger.quantile, copy.hedger.min_samples) == (0.9, 5)
+        assert (copy.breaker.failure_threshold, copy.breaker.reset_seconds) == (2, 10.0)
+    assert len({id(s.hedger) for s in (session, a, b)}) == 3
+    assert len({id(s.breaker) for s in (session, a, b)}) == 3
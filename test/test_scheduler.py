@@ -0,0 +1,115 @@
+"""Unit tests for the shared rate limiter and priority queue of backend submissions."""
+
+import pytest
+from test_polling import FakeClock
+
+import metrics
+from scheduler import SubmissionScheduler
+
+
+def _scheduler(path, clock: FakeClock, **kwargs) -> SubmissionScheduler:
+    kwargs = {"rate_per_second": 1.0, "burst": 4, "reserve": 1, "max_wait_seconds": 0, **kwargs}
+    return SubmissionScheduler(
+        str(path / "scheduler.sqlite3"), clock=clock, sleep=clock.sleep, **kwargs
+    )
+
+
+def test_token_bucket_limits_rate(tmp_path):
+    """The bucket admits a burst, then one submission per token refilled; waiting submissions keep their place."""
+    clock = FakeClock()
+    scheduler = _scheduler(tmp_path, clock)
+
+    assert [scheduler.acquire("interactive").admitted for _ in range(5)] == [True] * 4 + [False]
+    queued = scheduler.acquire("interactive")
+    assert (queued.admitted, queued.position) == (False, 1)
+    assert scheduler.depth() == {"interactive": 2, "bulk": 0}
+
+    clock.now += 1.5
+    admitted = scheduler.acquire("interactive", ticket=queued.ticket)
+    assert admitted.admitted
+    assert admitted.waited_seconds == pytest.approx(1.5)
+
+    # a caller that waits is admitted as soon as a token is refilled.
+    waiting = _scheduler(tmp_path, clock, max_wait_seconds=5).acquire("interactive", 2)
+    assert waiting.admitted
+    assert waiting.waited_seconds == pytest.approx(1.5, abs=0.1)
+
+
+def test_large_submissions_are_charged_in_full(tmp_path):
+    """A submission needing more tokens than the burst is admitted from a full bucket, and the excess is repaid."""
+    clock = FakeClock()
+    scheduler = _scheduler(tmp_path, clock)
+
+    assert scheduler.acquire("bulk", 10).admitted
+    assert not scheduler.acquire("interactive").admitted
+    clock.now += 6.5
+    assert not scheduler.acquire("interactive").admitted
+    clock.now += 1
+    assert scheduler.acquire("interactive").admitted
+
+
+def test_priorities(tmp_path):
+    """Bulk submissions leave a reserve for interactive ones and wait behind interactive callers that are waiting."""
+    clock = FakeClock()
+    scheduler = _scheduler(tmp_path, clock)
+
+    # bulk submissions may take the bucket down to the reserve, which only interactive submissions can use.
+    assert scheduler.acquire("bulk", 3).admitted
+    assert not scheduler.acquire("bulk").admitted
+    assert scheduler.acquire("interactive").admitted
+
+    # a queued interactive submission whose caller is not waiting does not hold up bulk submissions...
+    parked = scheduler.acquire("interactive")
+    clock.now += 2
+    bulk = scheduler.acquire("bulk")
+    assert bulk.admitted
+
+    # ...but one that is waiting does, and is admitted first.
+    clock.now += 2
+    blocking = _scheduler(tmp_path, clock, max_wait_seconds=60)
+    assert not blocking._try(parked.ticket, 0, 4, clock.now + 60)[0]
+    assert not scheduler.acquire("bulk").admitted
+    assert scheduler.acquire("interactive", ticket=parked.ticket).admitted
+
+    with pytest.raises(ValueError):
+        scheduler.acquire("urgent")
+    with pytest.raises(ValueError):
+        _scheduler(tmp_path, clock, burst=2, reserve=2)
+
+
+def test_parked_audio(tmp_path):
+    """Audio of a queued submission is kept until it is discarded or expires."""
+    clock = FakeClock()
+    scheduler = _scheduler(tmp_path, clock, ticket_ttl_seconds=60)
+    scheduler.park("ticket1", b"audio")
+    assert scheduler.unpark("ticket1") == b"audio"
+    assert scheduler.unpark("../scheduler.sqlite3") is None
+
+    scheduler.discard("ticket1")
+    assert scheduler.unpark("ticket1") is None
+
+    scheduler.park("ticket2", b"audio")
+    clock.now += 120
+    scheduler.park("ticket3", b"other audio")
+    assert scheduler.unpark("ticket2") is None
+
+
+def test_scheduler_metrics(tmp_path):
+    """Queue depth is reported as a gauge, and the wait of every admitted submission as a histogram."""
+    sink = metrics.MemorySink()
+    previous = metrics.set_sink(sink)
+    try:
+        clock = FakeClock()
+        scheduler = _scheduler(tmp_path, clock, burst=2, reserve=0)
+        scheduler.acquire("bulk", 2)
+        queued = scheduler.acquire("bulk")
+        assert sink.gauge("whisper_submission_queue_depth", priority="bulk") == 1
+        clock.now += 3
+        scheduler.acquire("bulk", ticket=queued.ticket)
+    finally:
+        metrics.set_sink(previous)
+
+    assert sink.gauge("whisper_submission_queue_depth", priority="bulk") == 0
+    assert sink.counter("whisper_submissions_deferred_total", priority="bulk") == 1
+    waits = sink.histogram("whisper_submission_wait_seconds", priority="bulk")
+    assert (waits.count, waits.sum) == (2, pytest.approx(3))
@@ -0,0 +1,58 @@
+"""Unit tests for merging overlapping transcription windows."""
+
+from stitch import merge_windows, restore_silences
+from whisper.response import SegmentTable
+
+
+def test_merge_windows():
+    """Segments are shifted by their window offset and de-duplicated across the seam."""
+    windows = [
+        {
+            "offset": 0,
+            "start": 0,
+            "end": 9,
+            "segments": [[0, 4, "one"], [4, 8.5, "two"], [8.5, 10, "thr"]],
+        },
+        {
+            "offset": 8,
+            "start": 9,
+            "end": 20,
+            "segments": [[0, 0.5, "two"], [0.4, 2, "three"], [2, 5, "four"]],
+        },
+    ]
+    assert merge_windows(windows) == [
+        {"start": 0, "end": 4, "text": "one"},
+        {"start": 4, "end": 8.5, "text": "two"},
+        {"start": 8.4, "end": 10, "text": "three"},
+        {"start": 10, "end": 13, "text": "four"},
+    ]
+
+
+def test_merge_drops_mostly_covered_duplicates():
+    """A segment kept by the next window that repeats most of the previous segment is dropped."""
+    windows = [
+        {"offset": 0, "start": 0, "end": 9, "segments": [[7, 10.5, "hello there"]]},
+        {"offset": 8, "start": 9, "end": 20, "segments": [[0.9, 1.4, "there"], [2.5, 4, "friend"]]},
+    ]
+    assert [s["text"] for s in merge_windows(windows)] == ["hello there", "friend"]
+
+
+def test_restore_silences():
+    """Times after each removed span are shifted by the total removed before them; boundaries stay in their segment."""
+    silences = [[1.0, 3.0], [4.0, 5.0]]
+    segments = [
+        {"start": 0.5, "end": 1.0, "text": "a", "words": [{"start": 0.5, "end": 1.0, "word": "a"}]},
+        {"start": 1.0, "end": 2.0, "text": "b"},
+        {"start": 2.0, "end": 2.5, "text": "c"},
+    ]
+    assert restore_silences(segments, silences) == [
+        {"start": 0.5, "end": 1.0, "text": "a", "words": [{"start": 0.5, "end": 1.0, "word": "a"}]},
+        {"start": 3.0, "end": 4.0, "text": "b"},
+        {"start": 5.0, "end": 5.5, "text": "c"},
+    ]
+    assert restore_silences(segments, []) == segments
+
+    table = restore_silences(SegmentTable.from_segments(segments), silences)
+    assert (list(table.starts), list(table.ends)) == ([0.5, 3.0, 5.0], [1.0, 4.0, 5.5])
+    assert (list(table.word_starts), list(table.word_ends)) == ([0.5], [1.0])
+    assert [list(table.segment_words(i)) for i in range(3)] == [[0], [], []]
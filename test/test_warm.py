@@ -0,0 +1,143 @@
+"""Unit tests for keeping the backend warm."""
+
+
+import pytest
+from stub_banana import StubBanana
+from test_polling import FakeClock
+
+import metrics
+from banana_dev import BananaSession
+from whisper.client import WhisperClient
+from whisper.warm import ColdStartModel, KeepWarm, in_windows, parse_windows
+
+# 1970-01-12 13:46:40 UTC, FakeClock's default time.
+NOON = 1_000_000.0
+
+
+class FakeBackend:
+    """Stands in for a `WhisperClient` whose backend takes `latency(idle)` to answer after `idle` seconds idle."""
+
+    def __init__(self, clock: FakeClock, latency):
+        self.clock = clock
+        self.latency = latency
+        self.last_used = clock()
+        self.started = []
+
+    def start_transcription(self, raw_audio: bytes) -> str:
+        self.started.append(self.clock())
+        self.clock.now += self.latency(self.clock() - self.last_used)
+        self.last_used = self.clock()
+        return "call"
+
+    def check_transcription_request(self, transcription_id: str):
+        return {"message": "success", "modelOutputs": [{"text": ""}]}
+
+
+def _keep_warm(clock: FakeClock, latency, **kwargs) -> KeepWarm:
+    backend = FakeBackend(clock, latency)
+    return KeepWarm(
+        backend,
+        interval_seconds=60,
+        min_penalty_seconds=5,
+        clock=clock,
+        sleep=clock.sleep,
+        **kwargs,
+    )
+
+
+def _run(warm: KeepWarm, clock: FakeClock, ticks: int) -> None:
+    for _ in range(ticks):
+        clock.now += warm.interval_seconds
+        warm.tick()
+
+
+def test_parse_windows():
+    """Windows are minute-of-day ranges in UTC, and may wrap past midnight."""
+    windows = parse_windows("13:00-14:00, 22:00-02:00")
+    assert windows == [(780, 840), (1320, 120)]
+    assert in_windows(windows, NOON)
+    assert in_windows(windows, NOON + 10 * 3600)  # 23:46
+    assert in_windows(windows, NOON + 12 * 3600)  # 01:46
+    assert not in_windows(windows, NOON + 3600)
+    assert in_windows([], NOON)
+    with pytest.raises(ValueError):
+        parse_windows("9-17")
+
+
+def test_cold_start_model():
+    """The penalty of an idle time is how much slower its requests are than the fastest."""
+    model = ColdStartModel(alpha=0.5)
+    assert model.penalty(60) is None
+    model.observe(60, 2.0)
+    model.observe(600, 32.0)
+    model.observe(700, 22.0)
+    assert model.penalty(50) == pytest.approx(0.0)
+    assert model.penalty(650) == pytest.approx(25.0)
+    assert model.penalty(5000) is None
+
+
+def test_keeps_warm_when_idling_is_costly():
+    """Once the backend is seen to cold start after two minutes idle, it is pinged before it gets there."""
+    clock = FakeClock()
+    warm = _keep_warm(clock, lambda idle: 21.0 if idle >= 100 else 1.0)
+    _run(warm, clock, 20)
+
+    # one opportunity is skipped while learning the latency after one and two minutes idle; every other one pings.
+    assert warm.stats.pings == 19
+    assert warm.stats.not_worth_it == 1
+    assert warm.model.penalty(120) == pytest.approx(20.0)
+
+
+def test_stops_pinging_when_not_worth_it():
+    """A backend that never cold starts is only pinged while learning that, ever more rarely."""
+    sink = metrics.MemorySink()
+    previous = metrics.set_sink(sink)
+    try:
+        clock = FakeClock()
+        warm = _keep_warm(clock, lambda idle: 1.0)
+        _run(warm, clock, 100)
+    finally:
+        metrics.set_sink(previous)
+
+    # one ping per doubling of the idle time, from one minute up to 100 minutes.
+    assert warm.stats.pings == 8
+    assert warm.stats.not_worth_it == 100 - warm.stats.pings
+    assert sink.counter("whisper_keep_warm_total", outcome="pinged") == warm.stats.pings
+
+
+def test_pings_only_within_windows():
+    """No ping is sent outside the traffic windows, nor while the backend is in use."""
+    clock = FakeClock()
+    warm = _keep_warm(clock, lambda idle: 1.0, windows=parse_windows("00:00-01:00"))
+    _run(warm, clock, 10)
+    assert warm.stats.pings == 0
+    assert warm.stats.outside_window == 10
+
+    warm.windows = []
+    clock.now += warm.interval_seconds
+    warm.touch()
+    clock.now += warm.interval_seconds / 2
+    assert not warm.tick()
+
+
+def test_keep_warm_stub_cold_starts():
+    """Against a backend with simulated cold starts, pings learn the penalty and then prevent cold starts."""
+    clock = FakeClock()
+    with StubBanana(cold_start_seconds=30, warm_seconds=150, clock=clock) as stub:
+        client = WhisperClient("key", "model", session=BananaSession(endpoint=stub.endpoint))
+        warm = KeepWarm(
+            client, interval_seconds=60, min_penalty_seconds=5, clock=clock, sleep=clock.sleep
+        )
+        _run(warm, clock, 20)
+        # the backend starts cold, and is let go cold once more to learn what three minutes idle costs.
+        assert stub.cold_starts == 2
+        assert warm.model.penalty(180) == pytest.approx(30, abs=1)
+
+        _run(warm, clock, 40)
+        client.start_transcription(b"audio")
+        client.close()
+
+    assert stub.cold_starts == 2
+    assert warm.stats.failures == 0
+    # from then on, every other opportunity pings: two minutes idle is safe, three minutes is not.
+    assert warm.stats.pings == 30
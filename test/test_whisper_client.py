@@ -0,0 +1,157 @@
+"""Unit tests for the whisper client, run against a local stub server."""
+
+import base64
+import tracemalloc
+
+import pytest
+from stub_banana import StubBanana
+from test_audio import make_wav
+
+from banana_dev import BananaSession, StreamedBase64
+from banana_dev.streaming import JsonBody
+from blobs import LocalBlobStore, blob_name
+from throughput import ThroughputTable
+from whisper.client import WhisperClient
+from whisper.routing import ModelRouter
+
+AUDIO_SIZE = 16 * 1024 * 1024
+
+
+def _peak_upload_bytes(client: WhisperClient, audio: bytes) -> int:
+    tracemalloc.start()
+    try:
+        client.start_transcription(audio)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("threshold", [0, 1024 * 1024], ids=["streamed", "inline"])
+def test_start_transcription_payload(threshold):
+    """Streamed and inline uploads send the same JSON payload."""
+    audio = bytes(range(256)) * 1000
+    with StubBanana() as stub:
+        client = WhisperClient(
+            "key",
+            "model",
+            session=BananaSession(endpoint=stub.endpoint),
+            streaming_threshold_bytes=threshold,
+        )
+        client.start_transcription(audio, get_segments=True)
+
+    path, payload = stub.requests[0]
+    assert path == "/start/v4/"
+    assert base64.b64decode(payload["modelInputs"]["mp3BytesString"]) == audio
+    assert payload["modelInputs"]["getSegments"] is True
+    assert payload["modelInputs"]["model"] == "base"
+
+
+def test_reference_upload(tmp_path):
+    """Audio at or above the reference threshold is stored and sent as a URL; smaller audio is sent inline."""
+    small, large = b"a" * 100, b"b" * 1000
+    store = LocalBlobStore(str(tmp_path))
+    with StubBanana() as stub:
+        client = WhisperClient(
+            "key",
+            "model",
+            session=BananaSession(endpoint=stub.endpoint),
+            blob_store=store,
+            reference_threshold_bytes=1000,
+        )
+        client.start_transcription(small)
+        client.start_transcription(large, get_segments=True)
+        client.start_batch_transcription([small, large])
+
+    inline, reference, batch = [payload["modelInputs"] for _, payload in stub.requests]
+    assert base64.b64decode(inline["mp3BytesString"]) == small
+    assert "mp3BytesString" not in reference
+    assert reference["mp3Url"] == store.url(blob_name(large))
+    assert reference["getSegments"] is True
+    assert "mp3Url" not in batch["batch"][0]
+    assert batch["batch"][1] == {"id": "1", "mp3Url": reference["mp3Url"]}
+    assert (store.stats.uploads, store.stats.reused) == (1, 1)
+    assert stub.body_sizes[1] < stub.body_sizes[0]
+
+
+def test_router_fits_latency_budget():
+    """The most accurate model expected to finish within the budget is chosen, never below the floor."""
+    table = ThroughputTable({"tiny": 0.05, "base": 0.08, "small": 0.2, "medium": 0.4}, 10.0)
+    router = ModelRouter(60, table=table)
+    assert router.choose(100) == "medium"
+    assert router.choose(600) == "base"
+    assert router.choose(3600) == "tiny"
+    assert ModelRouter(60, "base", table=table).choose(3600) == "base"
+    assert ModelRouter(60, quality_ceiling="small", table=table).choose(100) == "small"
+
+    table.observe("medium", 100, 150)
+    assert router.choose(100) == "small"
+
+    with pytest.raises(ValueError):
+        ModelRouter(60, "medium", "base")
+
+
+def test_routing_mode():
+    """In routing mode the client picks the model from the audio duration and learns from completions."""
+    with StubBanana() as stub:
+        client = WhisperClient(
+            "key",
+            "model",
+            "small",
+            session=BananaSession(endpoint=stub.endpoint),
+            latency_budget_seconds=30,
+        )
+        client._router.table = ThroughputTable(overhead_seconds=10.0)
+        model = client.route(make_wav(60))
+        client.start_transcription(make_wav(1), whisper_model=model)
+        client.record_completion("small", 60, 70)
+
+    assert model == "small"
+    assert stub.requests[0][1]["modelInputs"]["model"] == "small"
+    assert client.route(b"", 60) == "base"
+    assert WhisperClient("key", "model", "small").route(make_wav(600)) == "small"
+
+
+def test_start_transcription_from_file(tmp_path):
+    """Files are memory-mapped and streamed."""
+    audio = bytes(range(256)) * 1000
+    path = tmp_path / "audio.wav"
+    path.write_bytes(audio)
+    with StubBanana() as stub:
+        client = WhisperClient("key", "model", session=BananaSession(endpoint=stub.endpoint))
+        with path.open("rb") as f:
+            client.start_transcription(f)
+
+    _, payload = stub.requests[0]
+    assert base64.b64decode(payload["modelInputs"]["mp3BytesString"]) == audio
+
+
+def test_streamed_body_closes_mapping(tmp_path):
+    """Closing a body unmaps the files it streamed, so they can no longer be read."""
+    path = tmp_path / "audio.wav"
+    path.write_bytes(b"abc" * 1000)
+    with path.open("rb") as f:
+        stream = StreamedBase64(f)
+        with JsonBody({"audio": stream}) as body:
+            assert b"".join(body) == b'{"audio": "' + base64.b64encode(b"abc" * 1000) + b'"}'
+    assert stream._mmap is None
+    with pytest.raises(ValueError):
+        list(stream.chunks())
+
+
+def test_streamed_upload_peak_memory():
+    """Streaming keeps peak memory far below the size of the audio; the inline path holds several copies."""
+    audio = b"\x01" * AUDIO_SIZE
+    with StubBanana() as stub:
+        stub.max_parsed_body = 1024 * 1024
+        session = BananaSession(endpoint=stub.endpoint)
+        streamed = _peak_upload_bytes(WhisperClient("key", "model", session=session), audio)
+        inline = _peak_upload_bytes(
+            WhisperClient(
+                "key", "model", session=session, streaming_threshold_bytes=AUDIO_SIZE + 1
+            ),
+            audio,
+        )
+
+    assert stub.body_sizes[0] == stub.body_sizes[1]
+    assert streamed < AUDIO_SIZE / 4
+    assert inline > AUDIO_SIZE * 2